@@ -0,0 +1,40 @@
+"""Shared helpers for the bench/ suite: a MockFactory turret and result flattening."""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+def make_turret():
+    """
+    Build the real subsystems on MockFactory pins plus the scheduler, mailbox
+    and command handler, wired the same way main.py wires them.
+    """
+    config.PIN_FACTORY = "MockFactory"
+    from hardware.pin_factory import reset_pin_factory
+    from hardware.shooter import Shooter
+    from hardware.tilt_servo import TiltServo
+    from hardware.yaw_servo import AngularServoYaw
+    from tools.command_handler import CommandHandler
+    from tools.mailbox import ControlMailbox
+    from tools.scheduler import LoopScheduler
+
+    reset_pin_factory()  # each bench gets its own set of mock pins
+    yaw, tilt, shooter = AngularServoYaw(), TiltServo(), Shooter()
+    scheduler, mailbox = LoopScheduler(), ControlMailbox()
+    handler = CommandHandler(yaw, tilt, shooter, scheduler, mailbox)
+    return yaw, tilt, shooter, scheduler, mailbox, handler
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    """Nested result dict -> {"a.b.c": number}; non-numeric leaves are dropped."""
+    out = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            out.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+    return out
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: achieved rate and jitter of main.control_loop.
+
+Runs the real control loop in real time on MockFactory pins for a few
+seconds, with a joystick-like stream of aim commands going through the
+mailbox, and reports per task the achieved Hz and the start-time jitter
+against the scheduler's deadlines.
+
+Run:
+  python bench/bench_control_loop.py [--duration 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _common import make_turret
+
+
+def run(duration: float = 3.0) -> dict:
+    import main
+
+    yaw, tilt, shooter, scheduler, mailbox, handler = make_turret()
+    stop = threading.Event()
+    state = {"i": 0}
+
+    def feed():
+        i = state["i"] = state["i"] + 1
+        mailbox.set("yaw", (i % 180) - 90.0)
+        mailbox.set("tilt", (i % 16) - 8.0)
+
+    scheduler.add("bench.feed", feed, 30)
+    timer = threading.Timer(duration, stop.set)
+    t0 = time.perf_counter()
+    timer.start()
+    main.control_loop(yaw, tilt, shooter, stop, scheduler, mailbox)
+    elapsed = time.perf_counter() - t0
+
+    tasks = {}
+    for name, s in scheduler.stats().items():
+        if name.startswith("bench."):
+            continue
+        tasks[name] = {
+            "target_hz": s["hz"],
+            "achieved_hz": round(s["runs"] / elapsed, 2),
+            "overruns": s["overruns"],
+            "jitter_ms": {k: s["jitter_ms"][k] for k in ("mean", "p99", "max")},
+            "duration_ms": {k: s["duration_ms"][k] for k in ("mean", "p99")},
+        }
+    return {"duration_s": round(elapsed, 3), "tasks": tasks}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--duration", type=float, default=3.0, help="seconds of real time")
+    args = ap.parse_args(argv)
+    results = run(args.duration)
+    print(json.dumps({"bench": "control_loop", "results": results}))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: how many turrets one control loop drives at MAIN_LOOP_HZ.
+
+For each fleet size, builds that many MockFactory turrets (each on its own
+mock pin factory), runs main.run_turrets in real time with "@all aim"
+fan-out commands streaming through the Fleet and the mailbox, and reports
+the rate the 100 Hz tasks achieved, the worst start-time jitter and the
+control thread's busy time per tick. A size passes when every task keeps
+its rate (within 2%) with no overruns and a p99 jitter under half a period.
+
+The busy time's growth per added turret (fixed costs such as the mailbox
+drain factored out) gives est_max_turrets, the size that would keep the
+loop LOAD_LIMIT busy. MockFactory writes are cheaper than pigpio
+socket calls, so run it on the Pi itself to size a real fleet.
+
+Run:
+  python bench/bench_fleet.py [--sizes 1,2,4,8,16] [--duration 2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+LOAD_LIMIT = 0.7  # share of each period the loop may be busy, the rest is headroom
+
+
+def make_fleet(n: int):
+    config.PIN_FACTORY = "MockFactory"
+    from hardware.pin_factory import reset_pin_factory
+    from tools.fleet import Fleet, TurretConfig, build_turret
+    from tools.mailbox import ControlMailbox
+    from tools.scheduler import LoopScheduler
+
+    scheduler, mailbox = LoopScheduler(), ControlMailbox()
+    turrets = {}
+    for i in range(n):
+        reset_pin_factory()  # a Pi header only has pins for three turrets
+        tid = f"t{i}"
+        turrets[tid] = build_turret(tid, TurretConfig(tid, {}), None, mailbox)
+    return Fleet(turrets, scheduler, mailbox), scheduler, mailbox
+
+
+def run_size(n: int, duration: float) -> dict:
+    import main
+
+    fleet, scheduler, mailbox = make_fleet(n)
+    stop = threading.Event()
+    state = {"i": 0}
+
+    def feed():
+        i = state["i"] = state["i"] + 1
+        if i == 1:  # first tick: the turrets are initialised, start measuring
+            state["t0"], state["c0"] = time.perf_counter(), time.process_time()
+            threading.Timer(duration, stop.set).start()
+        fleet.handle_command(f"@all aim {(i % 180) - 90.0} {(i % 16) - 8.0}")
+
+    scheduler.add("bench.feed", feed, 30)
+    main.run_turrets(list(fleet.turrets.values()), stop, scheduler, mailbox)
+    elapsed = time.perf_counter() - state["t0"]
+    cpu = time.process_time() - state["c0"]
+
+    period = 1.0 / config.MAIN_LOOP_HZ
+    worst_rate, jitter_p99, overruns, busy = 1.0, 0.0, 0, 0.0
+    for name, s in scheduler.stats().items():
+        busy += s["runs"] * s["duration_ms"]["mean"] / 1000.0
+        if name.startswith("bench."):
+            continue
+        worst_rate = min(worst_rate, s["runs"] / elapsed / s["hz"])
+        jitter_p99 = max(jitter_p99, s["jitter_ms"]["p99"])
+        overruns += s["overruns"]
+    ticks = elapsed / period
+    tick_us = busy / ticks * 1e6
+    ok = worst_rate >= 0.98 and overruns == 0 and jitter_p99 < period * 500.0
+    return {
+        "loop_hz": round(config.MAIN_LOOP_HZ * worst_rate, 2),
+        "jitter_p99_ms": round(jitter_p99, 3),
+        "overruns": overruns,
+        "tick_us": round(tick_us, 1),
+        "per_turret_us": round(tick_us / n, 1),
+        "cpu_pct": round(100.0 * cpu / elapsed, 1),
+        "ok": ok,
+    }
+
+
+def run(sizes=(1, 2, 4, 8, 16), duration: float = 2.0) -> dict:
+    results = {f"turrets_{n}": run_size(n, duration) for n in sizes}
+    passed = 0  # largest size with every smaller size passing too
+    for n in sorted(sizes):
+        if not results[f"turrets_{n}"]["ok"]:
+            break
+        passed = n
+    lo, hi = results[f"turrets_{min(sizes)}"], results[f"turrets_{max(sizes)}"]
+    if hi is lo:
+        slope, fixed = lo["per_turret_us"], 0.0
+    else:
+        slope = (hi["tick_us"] - lo["tick_us"]) / (max(sizes) - min(sizes))
+        fixed = lo["tick_us"] - slope * min(sizes)
+    budget_us = LOAD_LIMIT * 1e6 / config.MAIN_LOOP_HZ
+    results["marginal_turret_us"] = round(slope, 1)
+    results["max_turrets_at_100hz"] = passed
+    results["est_max_turrets"] = int((budget_us - fixed) / slope) if slope > 0 else 0
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--sizes", default="1,2,4,8,16", help="fleet sizes, comma separated")
+    ap.add_argument("--duration", type=float, default=2.0, help="seconds per size")
+    args = ap.parse_args(argv)
+    sizes = tuple(int(n) for n in args.sizes.split(","))
+    results = run(sizes, args.duration)
+    print(json.dumps({"bench": "fleet", "results": results}))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: idle power mode savings and wake-up latency.
+
+Runs the real control loop on MockFactory pins with an IdleController,
+measures the control thread's CPU share awake (100 Hz, nothing to do) and
+idle (throttled, servos detached), then wakes it repeatedly with a yaw
+command and reports the time from handle_command() to the new setpoint
+being applied by the control thread. camera_resume_ms is CameraIdle's
+restart of a synthetic frame source up to its first frame; a real webcam
+adds its V4L2 open time on top.
+
+Run:
+  python bench/bench_idle.py [--wakes 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from _common import make_turret
+
+
+def _cpu_pct(seconds: float) -> float:
+    t0, c0 = time.perf_counter(), time.process_time()
+    time.sleep(seconds)
+    return 100.0 * (time.process_time() - c0) / (time.perf_counter() - t0)
+
+
+def _wait(cond, timeout=5.0):
+    deadline = time.perf_counter() + timeout
+    while not cond():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("control loop did not get there")
+        time.sleep(0.0002)
+
+
+def _summary(samples) -> dict:
+    s = sorted(samples)
+    return {
+        "mean": round(sum(s) / len(s), 3),
+        "p99": round(s[min(len(s) - 1, int(len(s) * 0.99))], 3),
+        "max": round(s[-1], 3),
+    }
+
+
+def run_control(wakes: int = 20, window: float = 1.0) -> dict:
+    import main
+    from tools.fleet import Turret
+    from tools.idle import IdleController
+
+    yaw, tilt, shooter, scheduler, mailbox, handler = make_turret()
+    turrets = [Turret(None, yaw, tilt, shooter)]
+    idle = IdleController(scheduler, turrets, handler)
+    idle.after = None  # stay awake for the first window
+    handler.idle = idle
+    stop = threading.Event()
+    th = threading.Thread(
+        target=main.run_turrets,
+        args=(turrets, stop, scheduler, mailbox, idle),
+        daemon=True,
+    )
+    th.start()
+    try:
+        _wait(lambda: scheduler.stats().get("yaw", {}).get("runs", 0) > 0)
+        awake = _cpu_pct(window)
+        idle.after = 0.0  # idle as soon as the turret is at rest
+        _wait(lambda: idle.idle)
+        asleep = _cpu_pct(window)
+        latencies = []
+        for i in range(wakes):
+            _wait(lambda: idle.idle)
+            time.sleep(0.05)  # land somewhere inside a throttled period
+            angle = 1.0 if i % 2 else -1.0
+            t0 = time.perf_counter()
+            handler.handle_command(f"yaw {angle}")
+            _wait(lambda: yaw._target_angle == angle)
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+    finally:
+        stop.set()
+        th.join(timeout=2.0)
+    return {
+        "cpu_awake_pct": round(awake, 1),
+        "cpu_idle_pct": round(asleep, 1),
+        "idle_loop_rate": config.IDLE_LOOP_HZ,
+        "wake_to_setpoint_ms": _summary(latencies),
+        "resume_ms": idle.stats()["resume_ms"],
+    }
+
+
+def run_camera(wakes: int = 10) -> dict:
+    import numpy as np
+    from tools.idle import CameraIdle
+    from web.camera import FrameBroadcaster
+
+    frame = np.zeros((480, 640, 3), np.uint8)
+    camera = FrameBroadcaster(source=lambda: frame)
+    cam_idle = CameraIdle(camera, after=3600.0)  # paused by hand below
+    camera.start()
+    try:
+        camera.wait_frame(0, 2.0)
+        for _ in range(wakes):
+            camera.pause()
+            cam_idle.paused = True
+            cam_idle.resume()
+    finally:
+        camera.stop()
+    return {"camera_resume_ms": cam_idle.resume_ms.summary()}
+
+
+def run(wakes: int = 20) -> dict:
+    results = run_control(wakes)
+    results.update(run_camera(max(1, wakes // 2)))
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--wakes", type=int, default=20, help="wake-ups to measure")
+    args = ap.parse_args(argv)
+    results = run(args.wakes)
+    print(json.dumps({"bench": "idle", "results": results}))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: text, JSON and compact binary WebSocket control encodings.
+
+Measures messages per second and per-message latency of one joystick
+update (yaw + tilt) through CommandHandler on MockFactory subsystems,
+including client-side encoding and the server's reply, exactly as
+web/app.py does it:
+
+  text:   two "yaw 10" messages        -> handle_command -> json.dumps reply
+  json:   two {"cmd": ...} messages    -> handle_command -> json.dumps reply
+  binary: one AIM frame                -> handle_binary  -> ACK frame
+
+Run:
+  python bench/bench_protocol.py [--n 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _common import make_turret
+from tools import binary_protocol as proto
+from tools.ring_stats import RingStats
+
+
+def _text_update(handler, yaw, tilt):
+    for cmd, v in (("yaw", yaw), ("tilt", tilt)):
+        resp = handler.handle_command(f"{cmd} {v}")
+        json.dumps({"ok": True, "msg": resp})
+
+
+def _json_update(handler, yaw, tilt):
+    for cmd, v in (("yaw", yaw), ("tilt", tilt)):
+        resp = handler.handle_command(json.dumps({"cmd": cmd, "value": v}))
+        json.dumps({"ok": True, "msg": resp})
+
+
+def _binary_update(handler, yaw, tilt):
+    handler.handle_binary(proto.encode(proto.AIM, yaw, tilt))
+
+
+ENCODINGS = (("text", _text_update), ("json", _json_update), ("binary", _binary_update))
+
+
+def run(update, handler, n):
+    lat = RingStats(n)
+    mailbox = handler.mailbox
+    t_start = time.perf_counter()
+    for i in range(n):
+        t0 = time.perf_counter()
+        update(handler, (i % 180) - 90.0, (i % 16) - 8.0)
+        lat.add(time.perf_counter() - t0)
+        if i % 64 == 0:
+            mailbox.drain()
+    elapsed = time.perf_counter() - t_start
+    return {
+        "updates_per_s": round(n / elapsed, 1),
+        "latency_us": lat.summary(1e6, 2),
+    }
+
+
+def run_all(n: int = 20000) -> dict:
+    handler = make_turret()[-1]
+    results = {}
+    for name, update in ENCODINGS:
+        run(update, handler, min(1000, n))  # warm-up
+        results[name] = run(update, handler, n)
+    results["binary_speedup"] = round(
+        results["binary"]["updates_per_s"] / results["json"]["updates_per_s"], 2
+    )
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--n", type=int, default=20000, help="joystick updates per encoding")
+    args = ap.parse_args(argv)
+    results = run_all(args.n)
+    print(json.dumps({"bench": "protocol", "n": args.n, "results": results}))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /video throughput for N concurrent clients.
+
+Serves web/app.py with uvicorn on localhost, feeds the FrameBroadcaster
+from a synthetic frame source (a gradient with a moving bar, so the JPEGs
+have a realistic size) and opens N streaming HTTP clients. Reports, per
+client count, delivered frames per second per client, total bytes per
+second, the encoder rate and the process CPU share. With one encode per
+frame the encoder rate should stay flat as clients are added.
+
+--passthrough feeds pre-encoded JPEGs, as a webcam in MJPG mode does, so
+the server only copies bytes; compare its CPU with the encode path.
+
+--record also records the stream to a temporary directory
+(tools/video_recorder.py); capture and client rates should not move, and
+the recorder should keep up (recorded_fps = source fps, nothing dropped).
+
+Clients pin the top rung of the adaptive ladder (/video?w=&q=&fps=) so runs
+are comparable; --adaptive leaves adaptation on.
+
+Run:
+  python bench/bench_video.py [--clients 1,4,8] [--duration 3]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+
+BOUNDARY = b"--frame\r\n"
+
+
+def synthetic_source(width=640, height=480, frames=30, jpeg=False):
+    """
+    Return a callable cycling through precomputed BGR frames, or through
+    their JPEG encodings when jpeg is set (an MJPG webcam).
+    """
+    base = np.tile(np.linspace(0, 255, width, dtype=np.uint8), (height, 1))
+    ring = []
+    for k in range(frames):
+        img = np.dstack((base, base[::-1], np.roll(base, k * width // frames, axis=1)))
+        x = k * (width - 40) // max(1, frames - 1)
+        img[:, x : x + 40] = 255
+        ring.append(np.ascontiguousarray(img))
+    if jpeg:
+        import cv2
+
+        ring = [cv2.imencode(".jpg", img)[1].tobytes() for img in ring]
+    state = {"i": 0}
+
+    def source():
+        state["i"] += 1
+        return ring[state["i"] % len(ring)]
+
+    return source
+
+
+class _Client(threading.Thread):
+    """Streams /video and counts multipart boundaries and bytes."""
+
+    def __init__(self, port, stop, path="/video"):
+        super().__init__(daemon=True)
+        self.port = port
+        self.path = path
+        self.stop = stop
+        self.frames = 0
+        self.bytes = 0
+
+    def run(self):
+        conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        conn.request("GET", self.path)
+        resp = conn.getresponse()
+        tail = b""
+        try:
+            while not self.stop.is_set():
+                data = resp.read1(65536)
+                if not data:
+                    break
+                self.bytes += len(data)
+                buf = tail + data
+                self.frames += buf.count(BOUNDARY)
+                tail = buf[-(len(BOUNDARY) - 1) :]
+        finally:
+            conn.close()
+
+
+def _serve():
+    import uvicorn
+
+    import web.app as webapp
+
+    sock = webapp.listen_socket("127.0.0.1", 0)
+    server = uvicorn.Server(uvicorn.Config(webapp.app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10.0
+    while not server.started and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return server, thread, sock.getsockname()[1]
+
+
+def _measure(camera, port, n, duration, path):
+    stop = threading.Event()
+    clients = [_Client(port, stop, path) for _ in range(n)]
+    for c in clients:
+        c.start()
+    time.sleep(0.5)  # let every stream reach steady state
+    f0 = [c.frames for c in clients]
+    b0 = sum(c.bytes for c in clients)
+    e0 = camera.stats()["encodes"]
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    time.sleep(duration)
+    elapsed = time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    fps = [(c.frames - f) / elapsed for c, f in zip(clients, f0)]
+    total_bytes = sum(c.bytes for c in clients) - b0
+    encodes = camera.stats()["encodes"] - e0
+    stop.set()
+    for c in clients:
+        c.join(timeout=2.0)
+    return {
+        "fps_per_client": round(sum(fps) / n, 2),
+        "fps_min_client": round(min(fps), 2),
+        "bytes_per_s": round(total_bytes / elapsed),
+        "encode_fps": round(encodes / elapsed, 2),
+        "cpu_pct": round(100.0 * cpu / elapsed, 1),
+    }
+
+
+def run(
+    clients=(1, 4, 8),
+    duration=3.0,
+    fps=30,
+    width=640,
+    height=480,
+    adaptive=False,
+    passthrough=False,
+    record=False,
+) -> dict:
+    import tempfile
+    import config
+    import web.app as webapp
+    from web.camera import FrameBroadcaster
+
+    camera = FrameBroadcaster(
+        width=width, height=height, fps=fps, source=synthetic_source(width, height, jpeg=passthrough)
+    )
+    recorder, tmp = None, None
+    if record:
+        from tools.video_recorder import VideoRecorder
+
+        tmp = tempfile.TemporaryDirectory(prefix="bench-video-")
+        recorder = VideoRecorder(tmp.name, budget_mb=1e6)
+        recorder.start()
+    webapp.use_camera(camera, recorder)
+    t_start = time.perf_counter()
+    server, thread, port = _serve()
+    w, q, _ = config.VIDEO_LADDER[0]
+    path = "/video" if adaptive else f"/video?w={min(w, width)}&q={q}&fps={fps}"
+    try:
+        results = {"source_fps": fps}
+        for n in clients:
+            results[f"clients_{n}"] = _measure(camera, port, n, duration, path)
+        if recorder is not None:
+            recorder.stop()
+            st = recorder.stats()
+            elapsed = time.perf_counter() - t_start
+            results["recorder"] = {
+                "recorded_fps": round(st["frames"] / elapsed, 2),
+                "dropped": st["dropped"],
+                "flush_ms": st["flush_ms"],
+            }
+        return results
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5.0)
+        if recorder is not None:
+            recorder.stop()
+            tmp.cleanup()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--clients", default="1,4,8", help="comma-separated client counts")
+    ap.add_argument("--duration", type=float, default=3.0, help="seconds per client count")
+    ap.add_argument("--fps", type=int, default=30, help="synthetic source frame rate")
+    ap.add_argument("--adaptive", action="store_true", help="let each client adapt")
+    ap.add_argument("--passthrough", action="store_true", help="pre-encoded JPEG source")
+    ap.add_argument("--record", action="store_true", help="record to disk as well")
+    args = ap.parse_args(argv)
+    counts = [int(c) for c in args.clients.split(",") if c]
+    results = run(
+        counts,
+        args.duration,
+        args.fps,
+        adaptive=args.adaptive,
+        passthrough=args.passthrough,
+        record=args.record,
+    )
+    print(json.dumps({"bench": "video", "results": results}))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: WebSocket round-trip latency through web/app.py.
+
+Drives the real /ws endpoint in-process (Starlette TestClient, no network)
+with MockFactory subsystems behind it, and times send -> reply for a text
+command, a JSON command and a binary AIM frame. The numbers include the
+ASGI transport, so compare them against each other and against a baseline
+rather than against a browser on the LAN.
+
+Run:
+  python bench/bench_ws.py [--n 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from _common import make_turret
+from tools import binary_protocol as proto
+from tools.ring_stats import RingStats
+
+
+def _roundtrip(ws, kind, i):
+    yaw, tilt = (i % 180) - 90.0, (i % 16) - 8.0
+    if kind == "binary":
+        ws.send_bytes(proto.encode(proto.AIM, yaw, tilt))
+        ws.receive_bytes()
+    elif kind == "json":
+        ws.send_text(json.dumps({"cmd": "yaw", "value": yaw}))
+        ws.receive_text()
+    else:
+        ws.send_text(f"yaw {yaw}")
+        ws.receive_text()
+
+
+def run(n: int = 2000) -> dict:
+    from starlette.testclient import TestClient
+
+    import web.app as webapp
+    from web.camera import FrameBroadcaster
+
+    handler = make_turret()[-1]
+    webapp.handler = handler
+    webapp.use_camera(FrameBroadcaster(source=lambda: None))  # stub capture, no webcam
+
+    results = {}
+    with TestClient(webapp.app) as client, client.websocket_connect("/ws") as ws:
+        ws.send_text("proto binary")
+        ws.receive_text()
+        for kind in ("text", "json", "binary"):
+            for i in range(min(200, n)):  # warm-up
+                _roundtrip(ws, kind, i)
+            rtt = RingStats(n)
+            t_start = time.perf_counter()
+            for i in range(n):
+                t0 = time.perf_counter()
+                _roundtrip(ws, kind, i)
+                rtt.add(time.perf_counter() - t0)
+                if i % 64 == 0:
+                    handler.mailbox.drain()
+            elapsed = time.perf_counter() - t_start
+            results[kind] = {
+                "msgs_per_s": round(n / elapsed, 1),
+                "rtt_us": rtt.summary(1e6, 1),
+            }
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--n", type=int, default=2000, help="round trips per message kind")
+    args = ap.parse_args(argv)
+    results = run(args.n)
+    print(json.dumps({"bench": "ws", "n": args.n, "results": results}))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Run the whole bench/ suite on MockFactory and write the results as JSON.
+
+Every bench returns a nested dict; the runner flattens it to
+{"bench.path.metric": number} and, given a baseline from an earlier run,
+flags every metric that got worse by more than the tolerance. The
+direction is taken from the metric name: rates (_per_s, hz, fps) should
+not drop, latencies, jitter, durations and CPU (_ms, _us, _pct) should
+not rise. Counters, settings and single-sample maxima are reported but
+never compared.
+
+Run:
+  python bench/run.py --out bench.json                 # measure
+  python bench/run.py --save-baseline bench/baseline.json
+  python bench/run.py --baseline bench/baseline.json   # exit 1 on regression
+  python bench/run.py --only protocol,ws --quick
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import bench_control_loop
+import bench_fleet
+import bench_idle
+import bench_protocol
+import bench_video
+import bench_ws
+from _common import flatten
+
+# name -> (full run, quick run)
+BENCHES = {
+    "control_loop": (
+        lambda: bench_control_loop.run(3.0),
+        lambda: bench_control_loop.run(1.0),
+    ),
+    "fleet": (
+        lambda: bench_fleet.run((1, 2, 4, 8, 16), 2.0),
+        lambda: bench_fleet.run((1, 4), 1.0),
+    ),
+    "idle": (lambda: bench_idle.run(20), lambda: bench_idle.run(6)),
+    "protocol": (lambda: bench_protocol.run_all(20000), lambda: bench_protocol.run_all(2000)),
+    "ws": (lambda: bench_ws.run(2000), lambda: bench_ws.run(300)),
+    "video": (
+        lambda: bench_video.run((1, 4, 8), 3.0),
+        lambda: bench_video.run((1, 4), 1.0),
+    ),
+    "video_passthrough": (
+        lambda: bench_video.run((1, 4, 8), 3.0, passthrough=True),
+        lambda: bench_video.run((1, 4), 1.0, passthrough=True),
+    ),
+    "video_record": (
+        lambda: bench_video.run((1, 4), 3.0, passthrough=True, record=True),
+        lambda: bench_video.run((1,), 1.0, passthrough=True, record=True),
+    ),
+}
+
+_HIGHER = ("_per_s", "hz", "fps")
+_LOWER = ("_ms", "_us", "_pct")
+_IGNORED = (".n", ".min", ".max", "target_hz", "source_fps")  # counts, outliers, settings
+
+
+def direction(metric: str):
+    """+1 if higher is better, -1 if lower is better, None if not compared."""
+    if metric.endswith(_IGNORED):
+        return None
+    parts = metric.split(".")
+    for part in reversed(parts):
+        if part.endswith(_HIGHER):
+            return 1
+        if part.endswith(_LOWER):
+            return -1
+    return None
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    """
+    Return regressions as dicts. A metric regresses when it worsens by more
+    than tolerance (relative) and by more than min_delta (in its own unit),
+    so e.g. jitter moving from 0.2 to 0.4 ms is not reported.
+    """
+    regressions = []
+    for metric, base in sorted(baseline.items()):
+        sign = direction(metric)
+        cur = current.get(metric)
+        if sign is None or cur is None or abs(cur - base) <= min_delta:
+            continue
+        change = (cur - base) / abs(base) if base else 0.0
+        if -sign * change > tolerance:
+            regressions.append(
+                {"metric": metric, "baseline": base, "current": cur, "change": round(change, 3)}
+            )
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--only", help="comma-separated subset of: " + ",".join(BENCHES))
+    ap.add_argument("--quick", action="store_true", help="shorter runs, noisier numbers")
+    ap.add_argument("--out", help="write the results JSON to this file")
+    ap.add_argument("--baseline", help="compare against a results JSON from an earlier run")
+    ap.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    ap.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed relative worsening (0.2 = 20%%)"
+    )
+    ap.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.5,
+        help="ignore absolute changes up to this much (metric units)",
+    )
+    args = ap.parse_args(argv)
+
+    names = args.only.split(",") if args.only else list(BENCHES)
+    unknown = [n for n in names if n not in BENCHES]
+    if unknown:
+        ap.error(f"unknown bench: {', '.join(unknown)}")
+
+    raw, metrics = {}, {}
+    for name in names:
+        t0 = time.perf_counter()
+        raw[name] = BENCHES[name][1 if args.quick else 0]()
+        metrics.update(flatten(raw[name], name))
+        print(f"[bench] {name} done in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "quick": args.quick,
+        },
+        "metrics": metrics,
+        "results": raw,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["metrics"]
+        regressions = compare(metrics, baseline, args.tolerance, args.min_delta)
+        report["regressions"] = regressions
+        for r in regressions:
+            print(
+                f"[bench] REGRESSION {r['metric']}: {r['baseline']} -> {r['current']}"
+                f" ({r['change']:+.0%})",
+                file=sys.stderr,
+            )
+        status = 1 if regressions else 0
+
+    text = json.dumps(report, indent=2)
+    for path in (args.out, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+    print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
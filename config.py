@@ -16,11 +16,36 @@ TILT_SERVO_PIN = 19
 PITCH_MIN_DEG = -8.0
 PITCH_MAX_DEG = 8.0
 
+# Motion profiles (trapezoidal slew limits, stepped from periodic())
+YAW_MAX_VEL_DPS = 180.0
+YAW_MAX_ACCEL_DPS2 = 720.0
+PITCH_MAX_VEL_DPS = 60.0
+PITCH_MAX_ACCEL_DPS2 = 360.0
+MOTION_MAX_JERK = None  # deg/s^3, None = pure trapezoid
+
 # Reload Servo
 RELOAD_SERVO_PIN = 20
 RELOAD_IDLE_ANGLE = 90
 RELOAD_LOAD_ANGLE = 0
 RELOAD_HOLD_SEC = 0.2
+RELOAD_MAX_VEL_DPS = 200.0
+RELOAD_MAX_ACCEL_DPS2 = 2000.0
+RELOAD_SETTLE_MARGIN_SEC = 0.05  # servo lag on top of the profile's settle time
+RELOAD_OVERLAP_FRAC = 0.8  # start the next push once retract is this far along
+
+# Flywheel PWM control
+FLYWHEEL_RAMP_PER_SEC = 4.0  # max change in applied power per second
+FLYWHEEL_DUTY_CURVE = 1.0  # duty = power ** curve (>1 softens the low end)
+FLYWHEEL_MIN_DUTY = 0.05  # below this the motors stall; output 0 instead
+FLYWHEEL_TAU_SEC = 0.75  # first-order wheel speed response time constant
+FLYWHEEL_SPEED_TOL = 0.05  # spin-up is done within this of the target speed
+FLYWHEEL_WARM_POWER = 0.3  # standby power after a shot cycle, 0 to disable
+FLYWHEEL_WARM_HOLD_SEC = 30.0  # how long to hold warm standby once idle
+
+# Burst fire
+SHOOTER_SPINDOWN_SEC = 3.0  # keep flywheels spinning this long after the last shot
+SHOOTER_MAX_QUEUE = 20  # max queued shots
+SHOOTER_EVENT_LOG = 256  # shot events kept for throughput measurement
 
 # Flywheel Motors
 
@@ -35,3 +60,128 @@ MOTOR_B_IN4 = 27
 
 # ===== Loop timing =====
 MAIN_LOOP_HZ = 100.0  # 10ms tick
+SERVO_HZ = 50.0  # yaw/tilt servos: one update per 20ms PWM frame
+SHOOTER_HZ = 100.0
+LOOP_OVERRUN_POLICY = "skip"  # "skip" or "catchup"
+LOOP_MAX_CATCHUP = 3  # max periods a task may run late before ticks are skipped
+
+# ===== Output coalescing =====
+OUTPUT_REFRESH_HZ = 1.0  # re-send unchanged GPIO outputs at this rate (0 = never)
+
+# ===== Logging =====
+LOG_LEVEL = "INFO"  # DEBUG logs every command and WebSocket message (sampled)
+LOG_FILE = "logs/balllauncher.jsonl"  # JSON lines sink, None to disable
+LOG_MAX_BYTES = 5_000_000
+LOG_BACKUPS = 3
+LOG_SAMPLE_EVERY = 20  # keep 1 in N high-rate events (ws recv/send, commands)
+
+# ===== Flight recorder (tools/flight_recorder.py) =====
+RECORDER_ENABLED = True  # record every control tick into an in-memory ring
+RECORDER_SECONDS = 60.0  # history kept (at MAIN_LOOP_HZ)
+RECORDER_POST_SEC = 1.0  # keep recording this long after a trigger, then dump
+RECORDER_DUMP_ON_SHOT = False  # dump after every shot as well
+RECORDER_DIR = "logs/flights"
+RECORDER_KEEP = 20  # newest recordings kept on disk
+
+# ===== Motion sequences (tools/sequencer.py) =====
+SEQUENCE_MAX_SEC = 600.0  # longest program (after repeats)
+SEQUENCE_MAX_PROGRAMS = 16  # uploaded programs kept
+
+# ===== Telemetry =====
+TELEMETRY_HZ = 10.0  # snapshots pushed to subscribed WebSocket clients
+TELEMETRY_KEYFRAME_SEC = 5.0  # send a full snapshot at least this often
+
+# ===== Video stream (/video) =====
+# "auto": pass the webcam's own MJPG through when it offers it, else encode
+# "mjpg": same, but warn when passthrough is unavailable; "bgr": always encode
+CAMERA_CAPTURE = "auto"
+VIDEO_JPEG_QUALITY = 80  # shared full-size encode; MJPG passthrough serves it as is
+# adaptive ladder per client, best first: (width px, JPEG quality, fps)
+VIDEO_LADDER = (
+    (640, 80, 30),
+    (640, 65, 20),
+    (480, 60, 15),
+    (320, 55, 12),
+    (320, 40, 8),
+    (160, 35, 5),
+)
+VIDEO_MAX_KBPS = 6000  # per-client cap, None for link-limited only
+VIDEO_LINK_SHARE = 0.4  # max share of time a client stream may spend blocked on its link
+VIDEO_ADAPT_SEC = 1.0  # measurement window between ladder decisions
+# kernel send buffer per HTTP/WebSocket connection; bounds how much video can
+# queue in the kernel before backpressure reaches the adaptation (None = OS)
+WEB_SEND_BUFFER = 32 * 1024
+
+# ===== Shared-memory frame bus (tools/frame_bus.py) =====
+FRAME_BUS = None  # shared memory name, e.g. "balllauncher-frames"; None = off
+FRAME_BUS_SLOTS = 4  # ring depth; a reader's view stays valid SLOTS - 1 frames
+FRAME_BUS_JPEG_MAX = 512 * 1024  # bytes per JPEG slot
+
+# ===== Video recorder (tools/video_recorder.py) =====
+VIDEO_RECORD = False  # record from startup (toggle at runtime: "recording on|off")
+VIDEO_RECORD_DIR = "recordings"
+VIDEO_RECORD_SEGMENT_SEC = 60.0  # one .mjpg + .idx pair per segment
+VIDEO_RECORD_BUDGET_MB = 2000  # oldest segments are deleted beyond this
+VIDEO_RECORD_FPS = None  # thin out to this rate, None = every captured frame
+VIDEO_RECORD_FLUSH_SEC = 0.5  # the writer thread writes this much video per batch
+VIDEO_RECORD_QUEUE_MB = 16  # frames waiting for the writer, dropped beyond this
+
+# ===== Vision tracking (tools/tracker.py) =====
+TRACK_ENABLED = False  # start tracking at boot (toggle at runtime: "track 1|0")
+TRACK_DETECTOR = "color"  # "color" blob or "aruco" marker
+TRACK_REDUCE = 4  # process frames at 1/N resolution (1, 2, 4, 8)
+TRACK_HSV_LOW = (5, 120, 120)  # color blob range, OpenCV HSV (H 0..179);
+TRACK_HSV_HIGH = (25, 255, 255)  # low H > high H wraps around (reds)
+TRACK_MIN_AREA = 20  # blob pixels at reduced resolution
+TRACK_ARUCO_DICT = "DICT_4X4_50"
+TRACK_ARUCO_ID = None  # follow this marker id, None = largest marker
+TRACK_HFOV_DEG = 62.0  # camera field of view
+TRACK_VFOV_DEG = 48.0
+TRACK_GAIN = 0.6  # fraction of the measured angle error corrected per step
+TRACK_DEADBAND_DEG = 0.5  # ignore smaller errors
+TRACK_MAX_STEP_DEG = 10.0  # largest correction per step
+TRACK_MAX_HZ = 20.0  # corrections posted to the control thread at most this often
+TRACK_YAW_SIGN = 1  # flip if the turret turns away from the target
+TRACK_TILT_SIGN = -1  # image y grows downwards
+
+# ===== Ballistics (tools/ballistics.py, "aim_at" command) =====
+# muzzle speed (m/s) measured at flywheel powers; linear in between
+BALLISTIC_SPEED_CURVE = ((0.2, 2.5), (0.5, 6.0), (1.0, 10.0))
+BALLISTIC_TILT_OFFSET_DEG = 0.0  # launch elevation at tilt 0 (mount angle)
+BALLISTIC_DRAG = 0.05  # quadratic drag rho*Cd*A/(2m) in 1/m (tennis ball ~0.02), 0 = vacuum
+BALLISTIC_GRAVITY = 9.81
+BALLISTIC_MAX_DISTANCE_M = 8.0
+BALLISTIC_HEIGHT_RANGE_M = (-1.0, 2.0)  # target height relative to the muzzle
+BALLISTIC_GRID = (321, 121)  # lookup table cells: distance x height
+BALLISTIC_CACHE_DIR = "cache"  # tables cached here keyed by these settings; None = off
+
+# ===== Control process (tools/control_process.py) =====
+CONTROL_PROCESS = False  # run the subsystems in their own process, away from the web server
+CONTROL_SOCKET = "/tmp/balllauncher-control.sock"  # Unix socket for commands/telemetry
+CONTROL_RT_PRIORITY = None  # SCHED_FIFO priority 1..99 for the control thread (needs CAP_SYS_NICE)
+CONTROL_CPUS = None  # pin the control process to these CPUs, e.g. (3,); None = any
+CONTROL_IPC_TIMEOUT = 1.0  # seconds before a request to the control process fails
+
+# ===== Turrets (tools/fleet.py) =====
+# None: one turret wired to the settings above. Otherwise turret id -> the
+# settings that differ for that turret (pins, limits, ballistics, ...); all
+# turrets run on one control loop and the first one is the default, e.g.
+# TURRETS = {
+#     "left": {},
+#     "right": {"YAW_SERVO_PIN": 5, "TILT_SERVO_PIN": 16, "RELOAD_SERVO_PIN": 21,
+#               "MOTOR_A_IN1": 23, "MOTOR_A_IN2": 24, "MOTOR_B_IN3": 25, "MOTOR_B_IN4": 26},
+# }
+TURRETS = None
+
+# ===== Idle power mode (tools/idle.py) =====
+IDLE_AFTER_SEC = 300.0  # go idle after this long without commands, None = never
+IDLE_LOOP_HZ = 5.0  # control loop rate while idle
+IDLE_DETACH_SERVOS = True  # stop the servo PWM while idle (servos hold by friction)
+IDLE_CAMERA = True  # release the webcam while nobody watches /video
+
+# ===== Simulation (tools/sim.py) =====
+SIM_PHYSICS_HZ = 200.0
+SIM_TRACE_HZ = 100.0
+SIM_SERVO_MAX_DPS = 350.0  # physical servo slew rate of the plant model
+SIM_FLYWHEEL_TAU_SEC = 0.8  # physical flywheel time constant
+SIM_SHOT_SPEED_DROP = 0.15  # fraction of wheel speed lost per shot
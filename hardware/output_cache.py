@@ -0,0 +1,80 @@
+import weakref
+import config
+from tools import clock
+
+_outputs = weakref.WeakValueDictionary()  # name -> CoalescedOutput
+
+
+class CoalescedOutput:
+    """
+    Write-coalescing wrapper around one gpiozero output attribute
+    (e.g. AngularServo.angle or Motor.value).
+
+    Remembers the last value sent and only forwards a write when the value
+    actually changes, or when the last real write is older than the forced
+    refresh interval (config.OUTPUT_REFRESH_HZ). Every write otherwise costs a
+    gpiozero call, and with PiGPIOFactory a pigpio socket round-trip.
+    """
+
+    def __init__(self, device, attr: str, name: str, refresh_hz: float = None):
+        self.device = device
+        self.attr = attr
+        self.name = name
+        hz = config.OUTPUT_REFRESH_HZ if refresh_hz is None else refresh_hz
+        self.refresh_sec = 1.0 / hz if hz and hz > 0 else None
+        self.issued = 0
+        self.suppressed = 0
+        self._last = None
+        self._last_ts = 0.0
+        self.detached = False
+        _outputs[name] = self
+
+    def write(self, value, force: bool = False) -> bool:
+        """Send value to the device if needed; returns True if a write was issued."""
+        if self.detached:
+            self.suppressed += 1
+            return False
+        t = clock.monotonic()
+        if (
+            not force
+            and value == self._last
+            and (self.refresh_sec is None or t - self._last_ts < self.refresh_sec)
+        ):
+            self.suppressed += 1
+            return False
+        setattr(self.device, self.attr, value)
+        self._last = value
+        self._last_ts = t
+        self.issued += 1
+        return True
+
+    def detach(self):
+        """
+        Stop driving the output (a servo's PWM goes off and it holds by
+        friction); writes are dropped until attach().
+        """
+        setattr(self.device, self.attr, None)
+        self.detached = True
+        self._last = None
+
+    def attach(self):
+        """Resume writes; the next one always goes through."""
+        self.detached = False
+        self._last = None
+
+    def invalidate(self):
+        """Forget the cached value so the next write always goes through."""
+        self._last = None
+
+    def stats(self) -> dict:
+        return {"issued": self.issued, "suppressed": self.suppressed}
+
+
+def output_stats() -> dict:
+    """Write counters for every live output, plus totals."""
+    per = {name: out.stats() for name, out in sorted(_outputs.items())}
+    return {
+        "issued": sum(s["issued"] for s in per.values()),
+        "suppressed": sum(s["suppressed"] for s in per.values()),
+        "outputs": per,
+    }
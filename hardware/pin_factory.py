@@ -0,0 +1,53 @@
+"""
+Process-wide gpiozero pin factory, built on first use.
+
+All subsystems share one factory, so PiGPIOFactory opens a single pigpio
+connection instead of one per subsystem, and only the backend named in
+config.PIN_FACTORY is ever imported.
+"""
+
+import threading
+import config
+from tools import startup
+
+_lock = threading.Lock()
+_factories = {}  # backend name -> factory
+
+
+def _build(name: str):
+    match name:
+        case "RPiGPIOFactory":
+            from gpiozero.pins.rpigpio import RPiGPIOFactory
+
+            return RPiGPIOFactory()
+        case "MockFactory":
+            from gpiozero.pins.mock import MockFactory, MockPWMPin
+
+            # servos and PWM motors need PWM-capable mock pins
+            return MockFactory(pin_class=MockPWMPin)
+        case "PiGPIOFactory":
+            from gpiozero.pins.pigpio import PiGPIOFactory
+
+            return PiGPIOFactory()
+    raise ValueError(f"Unknown PIN_FACTORY {name!r}")
+
+
+def get_pin_factory(name: str = None):
+    """Return the shared factory for name (defaults to config.PIN_FACTORY)."""
+    name = name or config.PIN_FACTORY
+    with _lock:
+        factory = _factories.get(name)
+        if factory is None:
+            with startup.phase(f"pin factory {name}", "factory"):
+                factory = _factories[name] = _build(name)
+        return factory
+
+
+def reset_pin_factory():
+    """
+    Forget the shared factories so the next subsystem gets a fresh one.
+    Devices already built keep theirs; used where one process builds several
+    MockFactory turrets (simulation, benchmarks).
+    """
+    with _lock:
+        _factories.clear()
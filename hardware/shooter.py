@@ -1,8 +1,11 @@
-import time
+import math
+from collections import deque
 from enum import Enum, auto
 from subsystem_base import SubsystemBase
+from hardware.output_cache import CoalescedOutput
+from tools.motion_profile import MotionProfile
 from gpiozero import AngularServo, Motor
-import config
+from tools import clock
 
 
 class ShooterState(Enum):
@@ -11,54 +14,178 @@ class ShooterState(Enum):
     PUSHING = auto()
     AT_POSITION = auto()
     RETRACTING = auto()
+    ARMED = auto()  # flywheels kept spinning between shots, pusher at idle
 
 
 class Shooter(SubsystemBase):
-    def __init__(self):
-        super().__init__()
-        self._hold_sec = config.RELOAD_HOLD_SEC
-        self._move_to_load_est = 0.7
-        self._move_to_idle_est = 0.7
-        self._spinup_time = 2.5  # Time to spin up flywheels
+    def __init__(self, cfg=None):
+        super().__init__(cfg)
+        self._hold_sec = self.cfg.RELOAD_HOLD_SEC
+        self._move_est = 0.0  # predicted pusher settle time for the current move
+        self._spinup_time = 0.0  # dwell for the current spin-up, from the speed delta
+        self.flywheel_power = 0.0  # ramped power actually applied
+        self.flywheel_speed = 0.0  # estimated wheel speed, normalized 0..1
+        self._warm_until = 0.0
+        self._warm_armed = False  # a shot cycle ran since the last manual power
+        self._pending = 0  # queued shots not yet pushed
+        self._respin = False  # power changed mid-shot: spin up before the next push
+        self._interval = 0.0  # minimum seconds between pushes in a burst
+        self._last_push_ts = None
+        self._push_power = 0.0  # target power when the current push started
+        self.shots_fired = 0
+        self.shot_events = deque(maxlen=self.cfg.SHOOTER_EVENT_LOG)
 
     # ----- Public API -----
-    def shoot(self, speed: float) -> bool:
-        """Trigger a complete shoot cycle with given flywheel speed (0.0-1.0)"""
-        if self.state == ShooterState.IDLE:
-            self.target_flywheel_power = max(0.0, min(1.0, speed))
-            self._to_state(ShooterState.SPINNING_UP)
-            return True
-        return False
+    def shoot(self, speed: float, count: int = 1, interval: float = None) -> bool:
+        """
+        Queue count shots at the given flywheel speed (0.0-1.0).
+
+        The flywheels keep spinning between queued shots and retract overlaps
+        with the next push; they only spin down after SHOOTER_SPINDOWN_SEC
+        without a new shot. interval sets a minimum spacing between pushes.
+        """
+        count = int(count)
+        if count < 1 or self._pending + count > self.cfg.SHOOTER_MAX_QUEUE:
+            return False
+        speed = max(0.0, min(1.0, float(speed)))
+        if interval is not None:
+            self._interval = max(0.0, float(interval))
+        elif self._pending == 0:
+            self._interval = 0.0
+        respin = abs(speed - self.target_flywheel_power) > 1e-3
+        self.target_flywheel_power = speed
+        self._pending += count
+        if self.state == ShooterState.IDLE or (
+            respin and self.state in (ShooterState.ARMED, ShooterState.SPINNING_UP)
+        ):
+            self._to_state(ShooterState.SPINNING_UP)  # (re)estimate the dwell
+        elif respin:
+            self._respin = True  # a push is under way; respin before the next one
+        return True
+
+    def cancel(self) -> int:
+        """Drop queued shots that have not been pushed yet; returns how many."""
+        dropped, self._pending = self._pending, 0
+        return dropped
+
+    @property
+    def pending_shots(self) -> int:
+        return self._pending
+
+    def shot_stats(self, window: float = 60.0) -> dict:
+        """Shot counters and sustained rate over the last window seconds."""
+        now = clock.monotonic()
+        recent = [e for e in self.shot_events if now - e["ts"] <= window]
+        rate = 0.0
+        if len(recent) > 1:
+            span = recent[-1]["ts"] - recent[0]["ts"]
+            rate = (len(recent) - 1) / span * 60.0 if span > 0 else 0.0
+        return {
+            "fired": self.shots_fired,
+            "pending": self._pending,
+            "shots_per_min": round(rate, 2),
+            "last": self.shot_events[-1] if self.shot_events else None,
+        }
 
     def set_flywheel_power(self, p: float):
-        """Directly control flywheel power for manual operation"""
+        """Directly control flywheel power for manual operation; ends warm standby."""
         self.target_flywheel_power = max(0.0, min(1.0, float(p)))
+        self._warm_until = 0.0
+        self._warm_armed = False
+
+    def spinup_estimate(self, power: float) -> float:
+        """
+        Seconds for the wheels to reach power from their current estimated
+        speed: the output ramp plus the first-order motor response down to
+        FLYWHEEL_SPEED_TOL.
+        """
+        delta = abs(power - self.flywheel_speed)
+        if delta <= self.cfg.FLYWHEEL_SPEED_TOL:
+            return 0.0
+        ramp = abs(power - self.flywheel_power) / self.cfg.FLYWHEEL_RAMP_PER_SEC
+        cfg = self.cfg
+        settle = cfg.FLYWHEEL_TAU_SEC * math.log(delta / cfg.FLYWHEEL_SPEED_TOL)
+        return ramp + settle
 
     # ----- Internals -----
-    def _apply_flywheel_outputs(self):
-        duty = self.target_flywheel_power != 0 and 1.0 or 0.0
-        self._motor_a.value = duty
-        self._motor_b.value = duty
+    def _flywheel_command(self, now: float) -> float:
+        """Power the wheels should be heading to: the target, or warm standby."""
+        if self.state == ShooterState.IDLE and now < self._warm_until:
+            return max(self.target_flywheel_power, self.cfg.FLYWHEEL_WARM_POWER)
+        return self.target_flywheel_power
+
+    def _update_flywheel(self, dt: float, now: float):
+        cmd = self._flywheel_command(now)
+        step = self.cfg.FLYWHEEL_RAMP_PER_SEC * dt
+        self.flywheel_power += max(-step, min(step, cmd - self.flywheel_power))
+        if dt > 0.0:
+            k = 1.0 - math.exp(-dt / self.cfg.FLYWHEEL_TAU_SEC)
+            self.flywheel_speed += (self.flywheel_power - self.flywheel_speed) * k
+
+    def _apply_flywheel_outputs(self, force: bool = False):
+        duty = self.flywheel_power ** self.cfg.FLYWHEEL_DUTY_CURVE
+        duty = round(duty, 3) if duty >= self.cfg.FLYWHEEL_MIN_DUTY else 0.0
+        self._motor_a_out.write(duty, force)
+        self._motor_b_out.write(duty, force)
+
+    def _move_pusher(self, angle: float):
+        """Start a profiled pusher move and record its predicted settle time."""
+        self._pusher_profile.set_target(angle)
+        self._move_est = (
+            self._pusher_profile.time_to_settle() + self.cfg.RELOAD_SETTLE_MARGIN_SEC
+        )
+
+    def _push_ready(self, now: float) -> bool:
+        if self._pending <= 0:
+            return False
+        return self._last_push_ts is None or now - self._last_push_ts >= self._interval
+
+    def _next_push_state(self) -> ShooterState:
+        """PUSHING, or SPINNING_UP first if the power changed since the last spin-up."""
+        return ShooterState.SPINNING_UP if self._respin else ShooterState.PUSHING
+
+    def _retracted_enough(self) -> bool:
+        """True once the pusher has cleared the feed, so the next push may start."""
+        travel = self.cfg.RELOAD_IDLE_ANGLE - self.cfg.RELOAD_LOAD_ANGLE
+        done = self._pusher_profile.position - self.cfg.RELOAD_LOAD_ANGLE
+        return travel == 0 or done / travel >= self.cfg.RELOAD_OVERLAP_FRAC
 
     def _to_state(self, st: ShooterState):
         self.state = st
-        self._state_ts = time.monotonic()
+        self._state_ts = clock.monotonic()
         match st:
             case ShooterState.IDLE:
-                self.set_flywheel_power(0)
-                self._apply_flywheel_outputs()
-                self._pusher.angle = config.RELOAD_IDLE_ANGLE
+                self.target_flywheel_power = 0.0
+                self._respin = False
+                if self._warm_armed:  # only at the end of a shot cycle
+                    self._warm_until = self._state_ts + self.cfg.FLYWHEEL_WARM_HOLD_SEC
+                    self._warm_armed = False
+                self._move_pusher(self.cfg.RELOAD_IDLE_ANGLE)
             case ShooterState.SPINNING_UP:
-                self._pusher.angle = config.RELOAD_IDLE_ANGLE
-                self._apply_flywheel_outputs()
+                self._respin = False
+                self._move_pusher(self.cfg.RELOAD_IDLE_ANGLE)
+                self._spinup_time = self.spinup_estimate(self.target_flywheel_power)
             case ShooterState.PUSHING:
-                self._pusher.angle = config.RELOAD_LOAD_ANGLE
+                self._pending = max(0, self._pending - 1)
+                self._last_push_ts = self._state_ts
+                self._push_power = self.target_flywheel_power
+                self._move_pusher(self.cfg.RELOAD_LOAD_ANGLE)
             case ShooterState.AT_POSITION:
-                pass
+                self.shots_fired += 1
+                # a shot already under way after "flywheel 0" does not re-arm it
+                self._warm_armed = self.target_flywheel_power > 0.0
+                self.shot_events.append(
+                    {
+                        "n": self.shots_fired,
+                        "ts": self._state_ts,
+                        "push_ts": self._last_push_ts,
+                        "power": self._push_power,
+                    }
+                )
             case ShooterState.RETRACTING:
-                self.set_flywheel_power(0)
-                self._apply_flywheel_outputs()
-                self._pusher.angle = config.RELOAD_IDLE_ANGLE
+                self._move_pusher(self.cfg.RELOAD_IDLE_ANGLE)
+            case ShooterState.ARMED:
+                pass
             case _:
                 pass
 
@@ -66,64 +193,108 @@ class Shooter(SubsystemBase):
     def initialize(self):
         # Initialize flywheel motors
         self._motor_a = Motor(
-            forward=config.MOTOR_A_IN1,
-            backward=config.MOTOR_A_IN2,
-            pwm=False,
+            forward=self.cfg.MOTOR_A_IN1,
+            backward=self.cfg.MOTOR_A_IN2,
+            pwm=True,
             pin_factory=self.pin_factory,
         )
         self._motor_b = Motor(
-            forward=config.MOTOR_B_IN3,
-            backward=config.MOTOR_B_IN4,
-            pwm=False,
+            forward=self.cfg.MOTOR_B_IN3,
+            backward=self.cfg.MOTOR_B_IN4,
+            pwm=True,
             pin_factory=self.pin_factory,
         )
 
         # Initialize pusher servo
         self._pusher = AngularServo(
-            config.RELOAD_SERVO_PIN,
-            min_angle=config.RELOAD_LOAD_ANGLE,
-            max_angle=config.RELOAD_IDLE_ANGLE,
+            self.cfg.RELOAD_SERVO_PIN,
+            min_angle=self.cfg.RELOAD_LOAD_ANGLE,
+            max_angle=self.cfg.RELOAD_IDLE_ANGLE,
             min_pulse_width=0.0004,
             max_pulse_width=0.00212,
             frame_width=0.02,
-            initial_angle=config.RELOAD_IDLE_ANGLE,
+            initial_angle=self.cfg.RELOAD_IDLE_ANGLE,
             pin_factory=self.pin_factory,
         )
 
+        # Coalesce repeated writes to the same value
+        self._motor_a_out = CoalescedOutput(
+            self._motor_a,
+            "value",
+            f"flywheel_a:GPIO{self.cfg.MOTOR_A_IN1}/GPIO{self.cfg.MOTOR_A_IN2}",
+        )
+        self._motor_b_out = CoalescedOutput(
+            self._motor_b,
+            "value",
+            f"flywheel_b:GPIO{self.cfg.MOTOR_B_IN3}/GPIO{self.cfg.MOTOR_B_IN4}",
+        )
+        self._pusher_out = CoalescedOutput(
+            self._pusher, "angle", f"pusher:GPIO{self.cfg.RELOAD_SERVO_PIN}"
+        )
+        self._pusher_profile = MotionProfile(
+            self.cfg.RELOAD_MAX_VEL_DPS,
+            self.cfg.RELOAD_MAX_ACCEL_DPS2,
+            position=self.cfg.RELOAD_IDLE_ANGLE,
+        )
+
         # Initialize state
         self.target_flywheel_power = 0.0
         self._to_state(ShooterState.IDLE)
 
     def periodic(self):
-        # Always update flywheel outputs
+        now = clock.monotonic()
+
+        # Always update flywheel and pusher outputs
+        self._update_flywheel(self.periodic_dt, now)
         self._apply_flywheel_outputs()
+        self._pusher_out.write(self._pusher_profile.step(self.periodic_dt))
 
         # Handle state machine
-        now = time.monotonic()
         elapsed = now - self._state_ts
 
         match self.state:
             case ShooterState.SPINNING_UP:
                 if elapsed >= self._spinup_time:
-                    self._to_state(ShooterState.PUSHING)
+                    if self._push_ready(now):
+                        self._to_state(ShooterState.PUSHING)
+                    else:
+                        self._to_state(ShooterState.ARMED)
             case ShooterState.PUSHING:
-                if elapsed >= self._move_to_load_est:
+                if elapsed >= self._move_est:
                     self._to_state(ShooterState.AT_POSITION)
             case ShooterState.AT_POSITION:
                 if elapsed >= self._hold_sec:
                     self._to_state(ShooterState.RETRACTING)
             case ShooterState.RETRACTING:
-                if elapsed >= self._move_to_idle_est:
+                if self._push_ready(now) and self._retracted_enough():
+                    self._to_state(self._next_push_state())
+                elif elapsed >= self._move_est:
+                    if self._pending or self.cfg.SHOOTER_SPINDOWN_SEC > 0:
+                        self._to_state(ShooterState.ARMED)
+                    else:
+                        self._to_state(ShooterState.IDLE)
+            case ShooterState.ARMED:
+                if self._push_ready(now):
+                    self._to_state(self._next_push_state())
+                elif not self._pending and elapsed >= self.cfg.SHOOTER_SPINDOWN_SEC:
                     self._to_state(ShooterState.IDLE)
             case ShooterState.IDLE:
                 pass
             case _:
                 pass
 
+    def detach(self):
+        # the wheels are at rest before idle mode: only the pusher servo pulses
+        self._pusher_out.detach()
+
+    def attach(self):
+        self._pusher_out.attach()
+
     def shutdown(self):
         try:
             self.target_flywheel_power = 0.0
-            self._apply_flywheel_outputs()
+            self.flywheel_power = 0.0
+            self._apply_flywheel_outputs(force=True)
         finally:
             self._motor_a.close()
             self._motor_b.close()
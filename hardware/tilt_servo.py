@@ -1,6 +1,7 @@
 from subsystem_base import SubsystemBase
+from hardware.output_cache import CoalescedOutput
+from tools.motion_profile import MotionProfile
 from gpiozero import AngularServo
-import config
 
 
 class TiltServo(SubsystemBase):
@@ -8,30 +9,51 @@ class TiltServo(SubsystemBase):
     Pitch (tilt) servo subsystem using gpiozero.Servo.
 
     Attributes:
-        current_angle (deg): Estimated current pitch.
+        current_angle (deg): Current pitch, following a slew-limited profile.
         target_angle (deg): Desired pitch setpoint.
     """
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, cfg=None):
+        super().__init__(cfg)
 
     def set_target_angle(self, deg: float):
-        self.target_angle = max(config.PITCH_MIN_DEG, min(config.PITCH_MAX_DEG, deg))
+        cfg = self.cfg
+        self.target_angle = max(cfg.PITCH_MIN_DEG, min(cfg.PITCH_MAX_DEG, deg))
+
+    def time_to_settle(self) -> float:
+        """Predicted seconds until current_angle reaches target_angle."""
+        self._profile.set_target(self.target_angle)
+        return self._profile.time_to_settle()
 
     def initialize(self):
         self._servo = AngularServo(
-            config.TILT_SERVO_PIN,
-            min_angle=config.PITCH_MAX_DEG,
-            max_angle=config.PITCH_MIN_DEG,
+            self.cfg.TILT_SERVO_PIN,
+            min_angle=self.cfg.PITCH_MAX_DEG,
+            max_angle=self.cfg.PITCH_MIN_DEG,
             initial_angle=0.0,
             pin_factory=self.pin_factory,
         )
+        self._out = CoalescedOutput(
+            self._servo, "angle", f"tilt:GPIO{self.cfg.TILT_SERVO_PIN}"
+        )
+        self._profile = MotionProfile(
+            self.cfg.PITCH_MAX_VEL_DPS,
+            self.cfg.PITCH_MAX_ACCEL_DPS2,
+            self.cfg.MOTION_MAX_JERK,
+        )
         self.current_angle = 0.0
         self.target_angle = 0.0
 
     def periodic(self):
-        self._servo.angle = self.target_angle
-        self.current_angle = self.target_angle
+        self._profile.set_target(self.target_angle)
+        self.current_angle = self._profile.step(self.periodic_dt)
+        self._out.write(self.current_angle)
+
+    def detach(self):
+        self._out.detach()
+
+    def attach(self):
+        self._out.attach()
 
     def shutdown(self):
         self._servo.close()
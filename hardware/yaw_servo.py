@@ -1,33 +1,60 @@
 from gpiozero import AngularServo
 from subsystem_base import SubsystemBase
-import config
+from hardware.output_cache import CoalescedOutput
+from tools.motion_profile import MotionProfile
 
 
 class AngularServoYaw(SubsystemBase):
-    def __init__(self):
-        super().__init__()
+    def __init__(self, cfg=None):
+        super().__init__(cfg)
 
     def initialize(self):
         self.servo = AngularServo(
-            pin=config.YAW_SERVO_PIN,
-            min_angle=config.YAW_MIN_DEG,
-            max_angle=config.YAW_MAX_DEG,
+            pin=self.cfg.YAW_SERVO_PIN,
+            min_angle=self.cfg.YAW_MIN_DEG,
+            max_angle=self.cfg.YAW_MAX_DEG,
             min_pulse_width=0.0005,
             max_pulse_width=0.0025,
             frame_width=0.02,
             pin_factory=self.pin_factory,
         )
 
+        self._out = CoalescedOutput(
+            self.servo, "angle", f"yaw:GPIO{self.cfg.YAW_SERVO_PIN}"
+        )
+
+        self._profile = MotionProfile(
+            self.cfg.YAW_MAX_VEL_DPS,
+            self.cfg.YAW_MAX_ACCEL_DPS2,
+            self.cfg.MOTION_MAX_JERK,
+        )
+
         self._target_angle = 0.0
         self.current_angle = 0.0
-        self.servo.angle = 0.0
+        self._out.write(0.0)
 
     def periodic(self):
-        self.current_angle = self._target_angle
-        self.servo.angle = self.current_angle
+        self._profile.set_target(self._target_angle)
+        self.current_angle = self._profile.step(self.periodic_dt)
+        self._out.write(self.current_angle)
+
+    @property
+    def target_angle(self) -> float:
+        return self._target_angle
 
     def set_target_angle(self, angle):
-        self._target_angle = max(config.YAW_MIN_DEG, min(config.YAW_MAX_DEG, angle))
+        self._target_angle = max(self.cfg.YAW_MIN_DEG, min(self.cfg.YAW_MAX_DEG, angle))
+
+    def detach(self):
+        self._out.detach()
+
+    def attach(self):
+        self._out.attach()
+
+    def time_to_settle(self) -> float:
+        """Predicted seconds until current_angle reaches the target."""
+        self._profile.set_target(self._target_angle)
+        return self._profile.time_to_settle()
 
     def shutdown(self):
         try:
@@ -1,49 +1,127 @@
-import threading, time, uvicorn, config
-from hardware.yaw_servo import AngularServoYaw
-from hardware.tilt_servo import TiltServo
-from hardware.shooter import Shooter
-from tools.command_handler import CommandHandler
-from web.app import app
+from tools import startup  # first import: starts the boot clock
 
+with startup.phase("import core", "import"):
+    import threading, config
+    from tools.log import get_logger, setup_logging
+    from tools.mailbox import ControlMailbox
+    from tools.scheduler import LoopScheduler
+with startup.phase("import hardware", "import"):
+    from tools.fleet import Turret, build
+# web.app (FastAPI) and uvicorn are imported only once the control loop runs
 
-def control_loop(yaw, tilt, shooter, stop_event):
+log = get_logger("main")
+
+
+def control_loop(
+    yaw,
+    tilt,
+    shooter,
+    stop_event,
+    scheduler=None,
+    mailbox=None,
+    recorder=None,
+    sequencer=None,
+):
+    turret = Turret(None, yaw, tilt, shooter, recorder=recorder, sequencer=sequencer)
+    run_turrets([turret], stop_event, scheduler, mailbox)
+
+
+def run_turrets(turrets, stop_event, scheduler=None, mailbox=None, idle=None):
+    """Initialise every turret and tick all of them from one scheduler."""
     # init
-    yaw.initialize()
-    tilt.initialize()
-    shooter.initialize()
-    print("Control loop started.")
+    for t in turrets:
+        t.yaw.initialize()
+        t.tilt.initialize()
+        t.shooter.initialize()
+    sched = scheduler or LoopScheduler()
+    hz = config.MAIN_LOOP_HZ
+    if idle is not None:
+        # first: a waking tick restores the outputs before the command is applied
+        sched.add("idle", idle.tick, hz)
+    if mailbox is not None:
+        # drain web commands first so each tick acts on the newest setpoints
+        sched.add("commands", mailbox.drain, hz)
+    for t in turrets:
+        p = f"{t.id}." if t.id else ""
+        if t.sequencer is not None:
+            # program setpoints for this tick, ahead of the servos that follow them
+            sched.add(f"{p}sequence", t.sequencer.tick, hz)
+        sched.add(f"{p}yaw", t.yaw.periodic, config.SERVO_HZ)
+        sched.add(f"{p}tilt", t.tilt.periodic, config.SERVO_HZ)
+        sched.add(f"{p}shooter", t.shooter.periodic, config.SHOOTER_HZ)
+    recorders = [t for t in turrets if t.recorder is not None]
+    for t in recorders:
+        # last tasks of the tick: record the state the tick ended with
+        sched.add(f"{t.id}.recorder" if t.id else "recorder", t.recorder.sample, hz)
+    log.info("Control loop started (%d turrets).", len(turrets))
+    startup.ready("control loop")
     # main loop
     try:
-        while not stop_event.is_set():
-            yaw.periodic()
-            tilt.periodic()
-            shooter.periodic()
-            time.sleep(1.0 / config.MAIN_LOOP_HZ)
+        sched.run(stop_event)
+    except Exception:
+        log.exception("Control loop failed")
+        for t in recorders:
+            t.recorder.dump_now("error")
+        raise
     finally:
-        print("Shutting down subsystems...")
-        yaw.shutdown()
-        tilt.shutdown()
-        shooter.shutdown()
-        print("All subsystems shut down.")
+        log.info("Shutting down subsystems...")
+        for t in turrets:
+            t.yaw.shutdown()
+            t.tilt.shutdown()
+            t.shooter.shutdown()
+        log.info("All subsystems shut down.")
 
 
-if __name__ == "__main__":
-    yaw = AngularServoYaw()
-    tilt = TiltServo()
-    shooter = Shooter()
-    handler = CommandHandler(yaw, tilt, shooter)
-    from web import app as webapp
-
-    webapp.handler = handler
+def start_control_thread():
+    """Build the turret(s) here and run them on a control thread."""
+    scheduler = LoopScheduler()
+    mailbox = ControlMailbox()
+    handler, turrets = build(scheduler, mailbox)
     stop_event = threading.Event()
     th = threading.Thread(
-        target=control_loop, args=(yaw, tilt, shooter, stop_event), daemon=True
+        target=run_turrets,
+        args=(turrets, stop_event, scheduler, mailbox, handler.idle),
+        daemon=True,
     )
     th.start()
+    with startup.phase("ballistics table"):
+        for t in turrets:
+            t.load_ballistics()
+    return handler, stop_event, th
+
+
+if __name__ == "__main__":
+    setup_logging()
+    control = None
+    if config.CONTROL_PROCESS:
+        from tools.control_process import ControlProcess
+
+        control = ControlProcess()
+        with startup.phase("start control process"):
+            handler = control.start()
+        startup.ready("control process")
+    else:
+        handler, stop_event, th = start_control_thread()
+    with startup.phase("import web", "import"):
+        import uvicorn
+        from web import app as webapp
+
+    webapp.handler = handler
+    if control is None:
+        from tools.tracker import Tracker
+
+        handler.tracker = Tracker(webapp.camera, handler.yaw, handler.tilt, handler.mailbox)
+        if config.TRACK_ENABLED:
+            handler.tracker.start()
     try:
-        uvicorn.run("web.app:app", host="0.0.0.0", port=8000, reload=False)
+        server = uvicorn.Server(uvicorn.Config(webapp.app, reload=False))
+        server.run(sockets=[webapp.listen_socket("0.0.0.0", 8000)])
     except KeyboardInterrupt:
         pass
     finally:
-        stop_event.set()
-        th.join()
+        handler.tracker.stop()
+        if control is not None:
+            control.stop()
+        else:
+            stop_event.set()
+            th.join()
@@ -1,25 +1,76 @@
+import functools
 from abc import ABC, abstractmethod
 from time import perf_counter as now
 import config
-from gpiozero.pins.rpigpio import RPiGPIOFactory
-from gpiozero.pins.mock import MockFactory
-from gpiozero.pins.pigpio import PiGPIOFactory
+from hardware.pin_factory import get_pin_factory
+from tools import clock
+from tools.ring_stats import RingStats
+
+
+class PeriodicTiming:
+    """Wall time and inter-call dt of periodic(), kept in fixed-size rings."""
+
+    def __init__(self, budget: float, size: int = 512):
+        self.budget = budget
+        self.calls = 0
+        self.overruns = 0
+        self.last = 0.0  # duration of the latest call (s)
+        self.duration = RingStats(size)
+        self.dt = RingStats(size)
+
+    def record(self, duration: float, dt: float):
+        self.calls += 1
+        self.last = duration
+        self.duration.add(duration)
+        if dt > 0.0:
+            self.dt.add(dt)
+        if duration > self.budget:
+            self.overruns += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "overruns": self.overruns,
+            "budget_ms": round(self.budget * 1000.0, 3),
+            "duration_ms": self.duration.summary(1000.0),
+            "dt_ms": self.dt.summary(1000.0),
+        }
+
+
+def _timed(periodic):
+    @functools.wraps(periodic)
+    def wrapper(self):
+        self.periodic_dt = self._dt()
+        t0 = now()
+        try:
+            return periodic(self)
+        finally:
+            self.timing.record(now() - t0, self.periodic_dt)
+
+    wrapper._timed = True
+    return wrapper
 
 
 class SubsystemBase(ABC):
-    def __init__(self):
+    def __init_subclass__(cls, **kwargs):
+        # Instrument every concrete periodic() so subsystems get timing for free
+        super().__init_subclass__(**kwargs)
+        fn = cls.__dict__.get("periodic")
+        if fn is not None and not getattr(fn, "_timed", False):
+            cls.periodic = _timed(fn)
+
+    def __init__(self, cfg=None):
+        # settings of this turret: the config module, or a TurretConfig section
+        self.cfg = config if cfg is None else cfg
         self._initialized = False
         self._last_ts = None
-        match config.PIN_FACTORY:
-            case "RPiGPIOFactory":
-                self.pin_factory = RPiGPIOFactory()
-            case "MockFactory":
-                self.pin_factory = MockFactory()
-            case "PiGPIOFactory":
-                self.pin_factory = PiGPIOFactory()
+        self.periodic_dt = 0.0
+        self.timing = PeriodicTiming(1.0 / config.MAIN_LOOP_HZ)
+        # one lazily built factory per process, shared by all subsystems
+        self.pin_factory = get_pin_factory()
 
     def _dt(self):
-        t = now()
+        t = clock.monotonic()
         if self._last_ts is None:
             self._last_ts = t
             return 0.0
@@ -27,6 +78,15 @@ class SubsystemBase(ABC):
         self._last_ts = t
         return dt
 
+    def timing_stats(self) -> dict:
+        return self.timing.stats()
+
+    def detach(self):
+        """Idle mode: stop driving outputs that can be released; state is kept."""
+
+    def attach(self):
+        """Leave idle mode: outputs are driven again from the next periodic()."""
+
     @abstractmethod
     def initialize(self):
         pass
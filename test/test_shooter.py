@@ -7,6 +7,9 @@ Interactive test for Shooter subsystem (Flywheel + Reload Servo).
 
 Commands:
   shoot <speed>    : trigger complete shoot cycle with flywheel speed (0..1)
+  burst <speed> <count> [interval]
+                   : queue count shots, flywheels kept spinning in between
+  cancel           : drop queued shots
   power <0..1>     : set flywheel power (normalized 0..1)
   push             : manually move pusher to load position
   retract          : manually move pusher to idle position
@@ -24,22 +27,15 @@ import time
 import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from hardware.shooter import Shooter, ShooterState
+from tools.scheduler import LoopScheduler
 
 
 def periodic_thread(subsys: Shooter, stop_evt: threading.Event, hz: float = 100.0):
-    tick = 1.0 / max(1e-3, hz)
-    next_ts = time.monotonic()
-    while not stop_evt.is_set():
-        try:
-            subsys.periodic()
-        except Exception as e:
-            print(f"[periodic] error: {e}", file=sys.stderr)
-        next_ts += tick
-        sleep_left = next_ts - time.monotonic()
-        if sleep_left > 0:
-            time.sleep(sleep_left)
-        else:
-            next_ts = time.monotonic()
+    sched = LoopScheduler(
+        on_error=lambda name, e: print(f"[periodic] error: {e}", file=sys.stderr)
+    )
+    sched.add("periodic", subsys.periodic, hz)
+    sched.run(stop_evt)
 
 
 def print_help():
@@ -89,6 +85,22 @@ def main():
                     print(f"[cmd] Started shoot cycle with speed {speed:.2f}")
                 else:
                     print(f"[cmd] Cannot shoot - current state: {shooter.state.name}")
+            elif cmd == "burst":
+                if len(toks) < 3:
+                    print("Usage: burst <speed 0..1> <count> [interval]")
+                    continue
+                try:
+                    speed, count = float(toks[1]), int(toks[2])
+                    interval = float(toks[3]) if len(toks) > 3 else None
+                except ValueError:
+                    print("Invalid number")
+                    continue
+                if shooter.shoot(speed, count=count, interval=interval):
+                    print(f"[cmd] Queued {count} shots at speed {speed:.2f}")
+                else:
+                    print(f"[cmd] Burst rejected - queued: {shooter.pending_shots}")
+            elif cmd == "cancel":
+                print(f"[cmd] Cancelled {shooter.cancel()} queued shots")
             elif cmd == "power":
                 if len(toks) < 2:
                     print("Usage: power <0..1>")
@@ -115,7 +127,9 @@ def main():
             elif cmd == "status":
                 print(
                     f"state={shooter.state.name}, flywheel_power={shooter.target_flywheel_power:.2f}"
+                    f" (applied={shooter.flywheel_power:.2f}, speed~{shooter.flywheel_speed:.2f})"
                 )
+                print(f"shots={shooter.shot_stats()}")
             else:
                 print("Unknown command. Type 'help' for usage.")
 
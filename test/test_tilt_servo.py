@@ -26,22 +26,15 @@ import threading
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from hardware.tilt_servo import TiltServo
+from tools.scheduler import LoopScheduler
 
 
 def periodic_thread(subsys: TiltServo, stop_evt: threading.Event, hz: float = 100.0):
-    tick = 1.0 / max(1e-3, hz)
-    next_ts = time.monotonic()
-    while not stop_evt.is_set():
-        try:
-            subsys.periodic()
-        except Exception as e:
-            print(f"[periodic] error: {e}", file=sys.stderr)
-        next_ts += tick
-        sleep_left = next_ts - time.monotonic()
-        if sleep_left > 0:
-            time.sleep(sleep_left)
-        else:
-            next_ts = time.monotonic()
+    sched = LoopScheduler(
+        on_error=lambda name, e: print(f"[periodic] error: {e}", file=sys.stderr)
+    )
+    sched.add("periodic", subsys.periodic, hz)
+    sched.run(stop_evt)
 
 
 def print_help():
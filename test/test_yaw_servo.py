@@ -14,21 +14,20 @@ Run:
 
 import sys
 import threading
-import time
 import config
 from hardware.yaw_servo import AngularServoYaw
+from tools.scheduler import LoopScheduler
 
 
 def periodic_thread(
     subsys: AngularServoYaw, stop_evt: threading.Event, hz: float = 100.0
 ):
     """Background thread for periodic updates"""
-    tick = 1.0 / max(1e-3, hz)
     subsys.initialize()
     try:
-        while not stop_evt.is_set():
-            subsys.periodic()
-            time.sleep(tick)
+        sched = LoopScheduler()
+        sched.add("periodic", subsys.periodic, hz)
+        sched.run(stop_evt)
     except Exception as e:
         print(f"[periodic] Error: {e}", file=sys.stderr)
     finally:
@@ -59,7 +58,7 @@ def main():
                 elif cmd == "help":
                     print(__doc__)
                 elif cmd == "status":
-                    print(f"Current angle: {yaw._current_angle:.1f}°")
+                    print(f"Current angle: {yaw.current_angle:.1f}°")
                     print(f"Target angle: {yaw._target_angle:.1f}°")
                 elif cmd.startswith("angle "):
                     parts = cmd.split()
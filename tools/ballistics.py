@@ -0,0 +1,233 @@
+"""
+Ballistic aiming: (distance, height) of a target -> (tilt, flywheel power).
+
+Muzzle speed comes from the flywheel power (BALLISTIC_SPEED_CURVE) and the
+launch elevation from the tilt angle (plus BALLISTIC_TILT_OFFSET_DEG). A
+point mass with quadratic drag is integrated for every (tilt, power) pair on
+a fine grid at once with NumPy, and the result is inverted into a dense
+table over (distance, target height). Where several tilts reach a target the
+one needing the least power wins (shortest spin-up, least spread).
+
+Building takes up to a few seconds, so the table is saved to
+BALLISTIC_CACHE_DIR under a hash of every setting it depends on; an aim
+request is then a bilinear lookup in four table cells. Targets outside the
+table, or next to a cell no tilt within PITCH_MIN_DEG..PITCH_MAX_DEG can
+reach, are reported as unreachable.
+
+Inspect a table:
+  python tools/ballistics.py [--distance 3 --height 0.5]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from tools.log import get_logger
+
+log = get_logger("ballistics")
+
+_VERSION = 1  # bump when the model changes: invalidates cached tables
+_TILT_STEP_DEG = 0.25
+_POWER_STEPS = 101
+_DT = 0.002  # integration step (s)
+
+
+def _settings(cfg=None) -> dict:
+    cfg = cfg or config
+    return {
+        "version": _VERSION,
+        "speed_curve": [list(p) for p in cfg.BALLISTIC_SPEED_CURVE],
+        "tilt_offset": cfg.BALLISTIC_TILT_OFFSET_DEG,
+        "drag": cfg.BALLISTIC_DRAG,
+        "g": cfg.BALLISTIC_GRAVITY,
+        "max_distance": cfg.BALLISTIC_MAX_DISTANCE_M,
+        "height_range": list(cfg.BALLISTIC_HEIGHT_RANGE_M),
+        "grid": list(cfg.BALLISTIC_GRID),
+        "pitch": [cfg.PITCH_MIN_DEG, cfg.PITCH_MAX_DEG],
+        "tilt_step": _TILT_STEP_DEG,
+        "power_steps": _POWER_STEPS,
+        "dt": _DT,
+    }
+
+
+def _trajectories(tilts, powers, xs, floor, s):
+    """
+    Height and time of flight where each (tilt, power) trajectory crosses
+    each distance in xs; NaN where it falls below floor first.
+    """
+    curve = np.array(s["speed_curve"], dtype=np.float64)
+    speed = np.interp(powers, curve[:, 0], curve[:, 1])
+    elev = np.radians(tilts + s["tilt_offset"])[:, None]
+    vx = np.cos(elev) * speed[None, :]
+    vy = np.sin(elev) * speed[None, :]
+    x = np.zeros_like(vx)
+    y = np.zeros_like(vx)
+    shape = vx.shape + (len(xs),)
+    ys = np.full(shape, np.nan, dtype=np.float32)
+    ts = np.full(shape, np.nan, dtype=np.float32)
+    k = np.zeros(vx.shape, dtype=np.int64)  # next distance index per trajectory
+    live = np.ones(vx.shape, dtype=bool)
+    ii, jj = np.indices(vx.shape)
+    drag, g, dt, t = s["drag"], s["g"], _DT, 0.0
+    x_end = xs[-1]
+    while live.any():
+        v = np.hypot(vx, vy)
+        vx = vx - drag * v * vx * dt
+        vy = vy - (g + drag * v * vy) * dt
+        x0, y0 = x, y
+        x, y = x + vx * dt, y + vy * dt
+        t += dt
+        # record every grid distance crossed in this step (usually none or one)
+        while True:
+            kc = np.minimum(k, len(xs) - 1)
+            cross = live & (k < len(xs)) & (x >= xs[kc])
+            if not cross.any():
+                break
+            i, j, kk = ii[cross], jj[cross], k[cross]
+            f = (xs[kk] - x0[cross]) / np.maximum(x[cross] - x0[cross], 1e-12)
+            ys[i, j, kk] = y0[cross] + f * (y[cross] - y0[cross])
+            ts[i, j, kk] = t - dt + f * dt
+            k[cross] += 1
+        live &= (y >= floor) & (x < x_end) & (vx > 1e-3)
+    return ys, ts
+
+
+def build(s=None):
+    """Compute the (distance, height) -> tilt/power/time-of-flight table."""
+    s = s or _settings()
+    nd, nh = s["grid"]
+    ds = np.linspace(0.0, s["max_distance"], nd)
+    hs = np.linspace(*s["height_range"], nh)
+    tilts = np.arange(s["pitch"][0], s["pitch"][1] + 1e-9, s["tilt_step"])
+    p_lo, p_hi = s["speed_curve"][0][0], s["speed_curve"][-1][0]
+    powers = np.linspace(p_lo, p_hi, s["power_steps"])
+    ys, ts = _trajectories(tilts, powers, ds, hs[0], s)
+
+    # per (tilt, distance) column, height grows with power: invert height ->
+    # power with one searchsorted over all columns laid end to end
+    na, npw = len(tilts), len(powers)
+    short = hs[0] - 1.0  # stands in for "fell below the floor first"
+    yc = np.maximum.accumulate(
+        np.nan_to_num(ys.transpose(0, 2, 1).astype(np.float64), nan=short), axis=2
+    )  # (tilt, distance, power)
+    tc = ts.transpose(0, 2, 1)
+    span = max(1.0, float(yc.max()) - short) * 2.0
+    col = np.arange(na * nd, dtype=np.float64).reshape(na, nd, 1) * span
+    idx = np.searchsorted((yc + col).ravel(), (hs + col).ravel())
+    cnt = idx.reshape(na, nd, nh) - np.arange(na * nd).reshape(na, nd, 1) * npw
+    lo = np.clip(cnt - 1, 0, npw - 2)
+    y0 = np.take_along_axis(yc, lo, 2)
+    y1 = np.take_along_axis(yc, lo + 1, 2)
+    hit = (cnt > 0) & (cnt < npw) & (y0 > short)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        f = np.clip((hs - y0) / (y1 - y0), 0.0, 1.0)
+    need = np.where(hit, powers[lo] + f * (powers[1] - powers[0]), np.inf)
+    t0, t1 = np.take_along_axis(tc, lo, 2), np.take_along_axis(tc, lo + 1, 2)
+    tof = np.where(hit, t0 + f * (t1 - t0), np.nan)
+    best = np.argmin(need, axis=0)
+    power = np.take_along_axis(need, best[None], 0)[0]
+    reach = np.isfinite(power)
+    return {
+        "distance": ds,
+        "height": hs,
+        "tilt": np.where(reach, tilts[best], np.nan).astype(np.float32),
+        "power": np.where(reach, power, np.nan).astype(np.float32),
+        "tof": np.take_along_axis(tof, best[None], 0)[0].astype(np.float32),
+    }
+
+
+class BallisticTable:
+    def __init__(self, arrays, key=""):
+        self.key = key
+        self.distance = arrays["distance"]
+        self.height = arrays["height"]
+        # (tilt, power, tof) per cell, stacked for a single gather per lookup
+        self._cells = np.stack(
+            (arrays["tilt"], arrays["power"], arrays["tof"]), axis=-1
+        ).astype(np.float64)
+        self._d0, self._h0 = float(self.distance[0]), float(self.height[0])
+        self._dd = float(self.distance[1] - self.distance[0])
+        self._dh = float(self.height[1] - self.height[0])
+        self._n = (len(self.distance), len(self.height))
+
+    @classmethod
+    def load(cls, cache_dir=None, cfg=None):
+        """
+        Load the table for the current config (or a turret's cfg) from the
+        cache, building it if needed.
+        """
+        s = _settings(cfg)
+        key = hashlib.sha1(json.dumps(s, sort_keys=True).encode()).hexdigest()[:12]
+        cache_dir = config.BALLISTIC_CACHE_DIR if cache_dir is None else cache_dir
+        path = os.path.join(cache_dir, f"ballistics-{key}.npz") if cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as f:
+                    return cls({k: f[k] for k in f.files}, key)
+            except (OSError, ValueError, KeyError) as e:
+                log.warning("cached table %s unreadable (%s), rebuilding", path, e)
+        t0 = time.perf_counter()
+        arrays = build(s)
+        log.info(
+            "Built %dx%d ballistic table in %.0f ms",
+            *s["grid"],
+            (time.perf_counter() - t0) * 1000.0,
+        )
+        if path:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = path + ".tmp.npz"
+            np.savez_compressed(tmp, **arrays)
+            os.replace(tmp, path)
+        return cls(arrays, key)
+
+    def solve(self, distance: float, height: float = 0.0):
+        """(tilt_deg, power, time_of_flight_s) for the target, or None if unreachable."""
+        fd = (distance - self._d0) / self._dd
+        fh = (height - self._h0) / self._dh
+        i, j = int(fd), int(fh)
+        if fd < 0 or fh < 0 or i >= self._n[0] - 1 or j >= self._n[1] - 1:
+            return None
+        u, v = fd - i, fh - j
+        c = self._cells[i : i + 2, j : j + 2]
+        out = (
+            (1 - u) * ((1 - v) * c[0, 0] + v * c[0, 1])
+            + u * ((1 - v) * c[1, 0] + v * c[1, 1])
+        )
+        if not np.isfinite(out).all():
+            return None  # on the edge of the reachable region
+        return float(out[0]), float(out[1]), float(out[2])
+
+    def stats(self) -> dict:
+        reach = np.isfinite(self._cells[..., 1])
+        return {
+            "key": self.key,
+            "cells": int(reach.size),
+            "reachable": round(float(reach.mean()), 3),
+            "max_distance_m": round(
+                float(self.distance[reach.any(axis=1)].max(initial=0.0)), 2
+            ),
+        }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build or query the ballistic table")
+    ap.add_argument("--distance", type=float, help="target distance (m)")
+    ap.add_argument("--height", type=float, default=0.0, help="target height above the muzzle (m)")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    table = BallisticTable.load()
+    out = {"load_ms": round((time.perf_counter() - t0) * 1000.0, 1), **table.stats()}
+    if args.distance is not None:
+        out["solution"] = table.solve(args.distance, args.height)
+    print(json.dumps(out))
+
+
+if __name__ == "__main__":
+    main()
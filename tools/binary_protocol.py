@@ -0,0 +1,90 @@
+"""
+Compact binary WebSocket control frames.
+
+Every frame is a little-endian opcode byte followed by fixed fields:
+
+  YAW      B f          yaw angle (deg)
+  TILT     B f          tilt angle (deg)
+  AIM      B f f        yaw, tilt (deg) in one frame
+  SHOOT    B f          flywheel power 0..1
+  FLYWHEEL B f          flywheel power 0..1
+  BURST    B f H f      power, count, interval (s, <0 = none)
+  CANCEL   B
+  RELOAD   B
+  STATUS   B
+
+Replies to binary frames are ACK frames (B B: opcode, ok) except STATUS,
+which is answered with the usual JSON text.
+
+With several turrets (tools/fleet.py) any frame can be addressed:
+
+  TURRET   B B <frame>  turret index in config.TURRETS order (ALL_TURRETS =
+                        every turret in the same tick), then the frame itself
+
+The reply is the enclosed frame's. Unaddressed frames go to the first turret.
+"""
+
+import struct
+
+YAW = 0x01
+TILT = 0x02
+AIM = 0x03
+SHOOT = 0x04
+FLYWHEEL = 0x05
+BURST = 0x06
+CANCEL = 0x07
+RELOAD = 0x08
+STATUS = 0x09
+TURRET = 0x0A  # variable length prefix, not in FRAMES
+ALL_TURRETS = 0xFF
+
+FRAMES = {
+    YAW: struct.Struct("<Bf"),
+    TILT: struct.Struct("<Bf"),
+    AIM: struct.Struct("<Bff"),
+    SHOOT: struct.Struct("<Bf"),
+    FLYWHEEL: struct.Struct("<Bf"),
+    BURST: struct.Struct("<BfHf"),
+    CANCEL: struct.Struct("<B"),
+    RELOAD: struct.Struct("<B"),
+    STATUS: struct.Struct("<B"),
+}
+
+ACK = struct.Struct("<BB")
+
+# Value sent with "proto" to switch a connection to binary frames
+PROTO_BINARY = "binary"
+PROTO_TEXT = "text"
+
+
+def encode(opcode: int, *fields) -> bytes:
+    return FRAMES[opcode].pack(opcode, *fields)
+
+
+def address(index: int, frame: bytes) -> bytes:
+    """Prefix frame with a TURRET header for turret index (or ALL_TURRETS)."""
+    return bytes((TURRET, index)) + frame
+
+
+def opcode(data: bytes) -> int:
+    """Opcode of a frame, looking through a TURRET prefix (0 if there is none)."""
+    if len(data) > 2 and data[0] == TURRET:
+        return data[2]
+    return data[0] if data else 0
+
+
+def decode(data: bytes):
+    """Return (opcode, fields tuple); raises ValueError on a malformed frame."""
+    if not data:
+        raise ValueError("empty frame")
+    frame = FRAMES.get(data[0])
+    if frame is None:
+        raise ValueError(f"unknown opcode 0x{data[0]:02x}")
+    if len(data) != frame.size:
+        raise ValueError(f"bad length {len(data)} for opcode 0x{data[0]:02x}")
+    values = frame.unpack(data)
+    return values[0], values[1:]
+
+
+def ack(opcode: int, ok: bool) -> bytes:
+    return ACK.pack(opcode, 1 if ok else 0)
@@ -0,0 +1,69 @@
+"""
+Injectable time source for the control code.
+
+Subsystems and the scheduler read time through this module instead of the
+time module, so a simulation can swap in a VirtualClock and run the whole
+control loop faster than real time.
+"""
+
+import time
+
+
+class RealClock:
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout: float) -> bool:
+        """Block until event is set or timeout elapses; returns event.is_set()."""
+        return event.wait(timeout)
+
+
+class VirtualClock:
+    """Clock that only moves when slept on: sleeping advances time instantly."""
+
+    def __init__(self, start: float = 0.0):
+        self.now = float(start)
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def wait(self, event, timeout: float) -> bool:
+        if not event.is_set():
+            self.advance(timeout)
+        return event.is_set()
+
+
+_clock = RealClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Install clock for all subsequent monotonic()/sleep()/wait() calls."""
+    global _clock
+    _clock = clock
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def sleep(seconds: float):
+    _clock.sleep(seconds)
+
+
+def wait(event, timeout: float) -> bool:
+    return _clock.wait(event, timeout)
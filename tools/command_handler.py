@@ -1,17 +1,84 @@
 import json
-import time
+from logging import DEBUG
 import config
+from hardware.output_cache import output_stats
+from tools import binary_protocol as proto
+from tools.log import get_logger
 
+log = get_logger("cmd")
 
-def _ts():
-    return time.strftime("%H:%M:%S")
+# Commands that only enqueue into the control mailbox (or read a counter), so
+# they are cheap enough to run on the web server's event loop. Everything else
+# (track, program, play, aim_at, status, ...) may block and goes to a thread.
+INLINE_COMMANDS = frozenset(
+    (
+        "yaw",
+        "tilt",
+        "aim",
+        "shoot",
+        "burst",
+        "cancel",
+        "flywheel",
+        "reload",
+        "record",
+        "pause",
+        "resume",
+        "abort",
+        "wake",
+        "turrets",
+    )
+)
+
+# Binary frames that only enqueue; STATUS builds the full status reply
+INLINE_OPCODES = frozenset(op for op in proto.FRAMES if op != proto.STATUS)
+
+
+def command_name(command: str) -> str:
+    """Lower-case command name of a text or JSON command; '@<turret> ' is skipped."""
+    text = command.strip()
+    if text.startswith("{"):
+        try:
+            return str(json.loads(text).get("cmd", "") or "").lower()
+        except (ValueError, AttributeError):
+            return ""
+    if text.startswith("@"):
+        text = text.partition(" ")[2]
+    return text.split(" ", 1)[0].lower()
 
 
 class CommandHandler:
-    def __init__(self, yaw_servo, tilt_servo, shooter):
+    def __init__(
+        self, yaw_servo, tilt_servo, shooter, scheduler=None, mailbox=None, name=None
+    ):
+        self.name = name  # turret id when several turrets share the mailbox
+        self.cfg = yaw_servo.cfg  # this turret's limits
         self.yaw = yaw_servo
         self.tilt = tilt_servo
         self.shooter = shooter
+        self.scheduler = scheduler
+        self.tracker = None  # injected in main.py when vision tracking is available
+        self.ballistics = None  # BallisticTable, injected in main.py for "aim_at"
+        self.recorder = None  # FlightRecorder, injected in main.py
+        self.sequencer = None  # Sequencer, injected in main.py
+        self.idle = None  # IdleController, injected in main.py
+        self._last_program = None  # "play" without a name plays this one
+        # With a mailbox, commands are queued and applied by the control thread
+        self.mailbox = mailbox
+        self._slot = {k: f"{name}.{k}" if name else k for k in ("yaw", "tilt")}
+        if mailbox is not None:
+            mailbox.slot(self._slot["yaw"], self.yaw.set_target_angle)
+            mailbox.slot(self._slot["tilt"], self.tilt.set_target_angle)
+        # Dispatch tables are built once instead of per command
+        self._handlers = self._build_handlers()
+        self._binary = self._build_binary_handlers()
+
+    def is_inline(self, command: str) -> bool:
+        """True when command only enqueues, so it can run on the event loop."""
+        return self.mailbox is not None and command_name(command) in INLINE_COMMANDS
+
+    def is_inline_binary(self, data: bytes) -> bool:
+        """is_inline() for a binary frame."""
+        return self.mailbox is not None and proto.opcode(data) in INLINE_OPCODES
 
     def handle_command(self, command: str):
         command = command.strip()
@@ -20,50 +87,244 @@ class CommandHandler:
                 obj = json.loads(command)
                 cmd = (obj.get("cmd", "") or "").lower()
                 val = obj.get("value", None)
-                print(f"[{_ts()}] [CMD] raw={obj}")
-                return self._process_command(cmd, val)
+                if log.isEnabledFor(DEBUG):
+                    log.debug("raw=%s", obj, extra={"sample": "cmd"})
+                return self._process_command(cmd, val, obj)
             parts = command.split()
             if not parts:
                 return "ERR: empty"
             cmd, val = parts[0].lower(), float(parts[1]) if len(parts) > 1 else None
-            print(f"[{_ts()}] [CMD] raw={{'cmd': '{cmd}', 'value': {val}}}")
-            return self._process_command(cmd, val)
+            if log.isEnabledFor(DEBUG):
+                log.debug("raw=%s %s", cmd, val, extra={"sample": "cmd"})
+            return self._process_command(cmd, val, self._text_args(cmd, parts[2:]))
         except Exception as e:
             err = f"ERR: {e}"
-            print(f"[{_ts()}] [CMD] error={err}")
+            log.warning("error=%s", err)
             return err
+        finally:
+            if self.idle is not None:
+                self.idle.touch()  # after queuing, so the waking tick drains it
+
+    def handle_binary(self, data: bytes):
+        """
+        Handle one compact binary frame (see tools/binary_protocol.py).
+        Returns an ACK frame, or the JSON text reply for STATUS.
+        """
+        op = data[0] if data else 0
+        entry = self._binary[op]
+        if entry is None or len(data) != entry[0].size:
+            return proto.ack(op, False)
+        frame, fn = entry
+        try:
+            resp = fn(*frame.unpack(data)[1:])
+        except Exception as e:
+            log.warning("binary error=%s", e)
+            return proto.ack(op, False)
+        finally:
+            if self.idle is not None:
+                self.idle.touch()
+        if op == proto.STATUS:
+            return resp
+        return proto.ack(op, resp.startswith("OK"))
+
+    @staticmethod
+    def _text_args(cmd, rest):
+        """Positional extras of text commands, e.g. 'burst <power> <count> <interval>'."""
+        names = {
+            "burst": ("count", "interval"),
+            "aim": ("tilt",),
+            "aim_at": ("height", "bearing"),
+        }.get(cmd, ())
+        return dict(zip(names, rest))
 
-    def _process_command(self, cmd, val):
-        handlers = {
-            "yaw": lambda v: self._set_angle(
-                self.yaw, v, config.YAW_MIN_DEG, config.YAW_MAX_DEG, "yaw"
+    def _build_handlers(self):
+        """Command name -> fn(value, args) for text/JSON commands."""
+        return {
+            "yaw": lambda v, _: self._set_angle(
+                self.yaw, v, self.cfg.YAW_MIN_DEG, self.cfg.YAW_MAX_DEG, "yaw"
+            ),
+            "tilt": lambda v, _: self._set_angle(
+                self.tilt, v, self.cfg.PITCH_MIN_DEG, self.cfg.PITCH_MAX_DEG, "tilt"
+            ),
+            "aim": lambda v, a: self._aim(a.get("yaw", v), a.get("tilt")),
+            "aim_at": lambda v, a: self._aim_at(
+                a.get("distance", v), a.get("height", 0.0), a.get("bearing", 0.0)
             ),
-            "tilt": lambda v: self._set_angle(
-                self.tilt, v, config.PITCH_MIN_DEG, config.PITCH_MAX_DEG, "tilt"
+            "shoot": lambda v, _: self._set_power(
+                self.shooter.shoot, v, "shoot power"
             ),
-            "shoot": lambda v: self._set_power(self.shooter.shoot, v, "shoot power"),
-            "flywheel": lambda v: self._set_power(
+            "burst": lambda v, a: self._burst(v, a),
+            "cancel": lambda _, __: self._cancel(),
+            "flywheel": lambda v, _: self._set_power(
                 self.shooter.set_flywheel_power, v, "flywheel power"
             ),
-            "reload": lambda _: self._reload(),
-            "status": lambda _: self._status(),
+            "reload": lambda _, __: self._reload(),
+            "track": lambda v, _: self._track(v),
+            "record": lambda _, __: self._record(),
+            "program": lambda _, a: self._program(a),
+            "play": lambda v, _: self._sequence("play", v),
+            "pause": lambda _, __: self._sequence("pause"),
+            "resume": lambda _, __: self._sequence("resume"),
+            "abort": lambda _, __: self._sequence("abort"),
+            "sequence": lambda _, __: self._sequence("status"),
+            "status": lambda _, __: self._status(),
+            "wake": lambda _, __: "OK: awake",  # activity only, see tools/idle.py
         }
-        return handlers.get(cmd, lambda _: f"ERR: unknown cmd '{cmd}'")(val)
+
+    def _build_binary_handlers(self):
+        """Opcode-indexed table of (struct, fn(*fields)) for binary frames."""
+        h = self._handlers
+        table = [None] * 256
+        for op, fn in {
+            proto.YAW: lambda y: h["yaw"](y, None),
+            proto.TILT: lambda t: h["tilt"](t, None),
+            proto.AIM: lambda y, t: self._aim(y, t),
+            proto.SHOOT: lambda p: h["shoot"](p, None),
+            proto.FLYWHEEL: lambda p: h["flywheel"](p, None),
+            proto.BURST: lambda p, n, dt: self._burst(
+                p, {"count": n, "interval": dt if dt >= 0 else None}
+            ),
+            proto.CANCEL: lambda: self._cancel(),
+            proto.RELOAD: lambda: self._reload(),
+            proto.STATUS: lambda: self._status(),
+        }.items():
+            table[op] = (proto.FRAMES[op], fn)
+        return table
+
+    def _process_command(self, cmd, val, args=None):
+        fn = self._handlers.get(cmd)
+        if fn is None:
+            return f"ERR: unknown cmd '{cmd}'"
+        return fn(val, args or {})
+
+    def _aim(self, yaw, tilt):
+        if yaw is None or tilt is None:
+            return "ERR: aim needs yaw and tilt"
+        cfg = self.cfg
+        y = self._set_angle(self.yaw, yaw, cfg.YAW_MIN_DEG, cfg.YAW_MAX_DEG, "yaw")
+        t = self._set_angle(
+            self.tilt, tilt, cfg.PITCH_MIN_DEG, cfg.PITCH_MAX_DEG, "tilt"
+        )
+        return f"OK: aim {y[4:]} {t[4:]}"
+
+    def _aim_at(self, distance, height, bearing):
+        """Point at a target and spin the flywheels to the power that reaches it."""
+        if self.ballistics is None:
+            return "ERR: ballistics not available"
+        if distance is None:
+            return "ERR: aim_at needs distance"
+        distance, height, bearing = float(distance), float(height), float(bearing)
+        cfg = self.cfg
+        if not cfg.YAW_MIN_DEG <= bearing <= cfg.YAW_MAX_DEG:
+            return f"ERR: unreachable: bearing {bearing:.1f} outside yaw limits"
+        sol = self.ballistics.solve(distance, height)
+        if sol is None:
+            return f"ERR: unreachable: distance={distance:.2f} height={height:.2f}"
+        tilt, power, tof = sol
+        self._set_angle(self.yaw, bearing, cfg.YAW_MIN_DEG, cfg.YAW_MAX_DEG, "yaw")
+        self._set_angle(self.tilt, tilt, cfg.PITCH_MIN_DEG, cfg.PITCH_MAX_DEG, "tilt")
+        self._set_power(self.shooter.set_flywheel_power, power, "flywheel power")
+        return f"OK: aim_at yaw={bearing:.2f} tilt={tilt:.2f} power={power:.3f} tof={tof:.2f}"
 
     def _set_angle(self, device, value, min_val, max_val, name):
         if value is None:
             return f"ERR: {name} needs value"
         value = max(min_val, min(max_val, float(value)))
-        device.set_target_angle(value)
+        if self.mailbox is not None:
+            self.mailbox.set(self._slot[name], value)
+        else:
+            device.set_target_angle(value)
         return f"OK: {name}={value:.2f}"
 
     def _set_power(self, action, value, name):
         if value is None:
             return f"ERR: {name} needs power 0..1"
         value = max(0.0, min(1.0, float(value)))
-        action(value)
+        self._submit(action, value)
         return f"OK: {name}={value:.2f}"
 
+    def _submit(self, fn, *args, **kwargs):
+        """Run fn on the control thread via the mailbox, or directly without one."""
+        if self.mailbox is not None:
+            self.mailbox.post(fn, *args, **kwargs)
+            return None
+        return fn(*args, **kwargs)
+
+    def _burst(self, value, args):
+        if value is None:
+            return "ERR: burst needs power 0..1"
+        power = max(0.0, min(1.0, float(value)))
+        count = int(float(args.get("count", 1)))
+        interval = args.get("interval")
+        interval = float(interval) if interval is not None else None
+        if count < 1 or self.shooter.pending_shots + count > self.cfg.SHOOTER_MAX_QUEUE:
+            return f"ERR: burst rejected (queue={self.shooter.pending_shots})"
+        self._submit(self.shooter.shoot, power, count=count, interval=interval)
+        return f"OK: burst power={power:.2f} count={count}"
+
+    def _cancel(self):
+        dropped = self._submit(self.shooter.cancel)
+        if dropped is None:
+            return "OK: cancel queued"
+        return f"OK: cancelled {dropped} shots"
+
+    def _track(self, value):
+        if self.tracker is None:
+            return "ERR: tracking not available"
+        if value is None:
+            return f"OK: track={int(self.tracker.active)}"
+        if value in (True, "on") or (not isinstance(value, str) and float(value)):
+            self.tracker.start()
+        else:
+            self.tracker.stop()
+        return f"OK: track={int(self.tracker.active)}"
+
+    def _record(self):
+        """Dump the flight recorder once RECORDER_POST_SEC more has been recorded."""
+        if self.recorder is None:
+            return "ERR: flight recorder not enabled"
+        if not self.recorder.trigger("manual"):
+            return "OK: record dump already pending"
+        return f"OK: record dump in {config.RECORDER_POST_SEC:.1f}s"
+
+    def _program(self, args):
+        """Compile an uploaded program (JSON only) and keep it for "play"."""
+        if self.sequencer is None:
+            return "ERR: sequencer not available"
+        from tools.sequencer import compile_program
+
+        name = str(args.get("name") or "program")
+        # moves start from the current setpoints (0 before the loop initialises)
+        start = (
+            getattr(self.yaw, "_target_angle", 0.0),
+            getattr(self.tilt, "target_angle", 0.0),
+        )
+        prog = compile_program(
+            args.get("steps"),
+            name,
+            repeat=args.get("repeat", 1),
+            start=start,
+            cfg=self.cfg,
+        )
+        self.sequencer.load(prog)
+        self._last_program = name
+        return json.dumps({"ok": True, "program": name, **prog.info})
+
+    def _sequence(self, action, value=None):
+        seq = self.sequencer
+        if seq is None:
+            return "ERR: sequencer not available"
+        if action == "status":
+            return json.dumps({"ok": True, "sequence": seq.stats()})
+        if action == "play":
+            name = value if isinstance(value, str) else self._last_program
+            if name not in seq.programs:
+                return f"ERR: no program '{name}'"
+            self._submit(seq.play, name)
+            return f"OK: play {name}"
+        self._submit(getattr(seq, action))
+        return f"OK: {action}"
+
     def _reload(self):
         pass
         return "OK: reload"
@@ -71,7 +332,63 @@ class CommandHandler:
     def _status(self):
         payload = {
             "ok": True,
-            "state": self.shooter.state,
+            "state": self.shooter.state.name,
+            "shots": self.shooter.shot_stats(),
+            "timing": self.timing_stats(),
+            "outputs": self.output_stats(),
         }
-        print(f"[{_ts()}] [CMD] status={payload}")
+        if self.tracker is not None:
+            payload["tracking"] = self.tracker.stats()
+        if self.recorder is not None:
+            payload["recorder"] = self.recorder.stats()
+        if self.sequencer is not None:
+            payload["sequence"] = self.sequencer.stats()
+        if self.idle is not None:
+            payload["idle"] = self.idle.stats()
         return json.dumps(payload)
+
+    def snapshot(self) -> dict:
+        """Flat, rounded state sample for the telemetry stream."""
+        sh = self.shooter
+        snap = {
+            "yaw.current": round(self.yaw.current_angle, 2),
+            "yaw.target": round(self.yaw._target_angle, 2),
+            "tilt.current": round(self.tilt.current_angle, 2),
+            "tilt.target": round(self.tilt.target_angle, 2),
+            "shooter.state": sh.state.name,
+            "shooter.power": round(sh.target_flywheel_power, 2),
+            "shooter.applied": round(sh.flywheel_power, 2),
+            "shooter.speed": round(sh.flywheel_speed, 2),
+            "shooter.pending": sh.pending_shots,
+            "shooter.fired": sh.shots_fired,
+        }
+        if self.sequencer is not None:
+            snap["seq.state"] = self.sequencer.state
+            snap["seq.tick"] = self.sequencer.position
+        if self.idle is not None:
+            snap["idle"] = self.idle.idle
+        for name, sub in (("yaw", self.yaw), ("tilt", self.tilt), ("shooter", sh)):
+            duration = sub.timing.duration.summary(1000.0)
+            snap[f"{name}.periodic_max_ms"] = round(duration["max"], 2)
+        if self.scheduler is not None:
+            for name, st in self.scheduler.stats().items():
+                snap[f"loop.{name}.jitter_p99_ms"] = round(st["jitter_ms"]["p99"], 2)
+                snap[f"loop.{name}.overruns"] = st["overruns"]
+        return snap
+
+    def timing_stats(self):
+        """periodic() timing per subsystem, plus scheduler stats when available."""
+        stats = {
+            "yaw": self.yaw.timing_stats(),
+            "tilt": self.tilt.timing_stats(),
+            "shooter": self.shooter.timing_stats(),
+        }
+        if self.scheduler is not None:
+            stats["loop"] = self.scheduler.stats()
+        if self.mailbox is not None:
+            stats["mailbox"] = self.mailbox.stats()
+        return stats
+
+    def output_stats(self):
+        """Output coalescing counters of this process's subsystems."""
+        return output_stats()
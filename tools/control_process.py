@@ -0,0 +1,357 @@
+"""
+Control loop in a dedicated process, isolated from the web server.
+
+With config.CONTROL_PROCESS the subsystems, scheduler, mailbox and
+CommandHandler (or the Fleet of tools/fleet.py) live in a child process, so
+the web server's GIL, garbage collector and request bursts cannot stall a
+control tick. The child can pin
+itself to CONTROL_CPUS and run its control thread under SCHED_FIFO at
+CONTROL_RT_PRIORITY; both are best effort and only logged when the OS
+refuses (no CAP_SYS_NICE, CPU not present).
+
+The web process talks to it over a Unix SEQPACKET socket (CONTROL_SOCKET):
+one datagram per request and per reply, a one-byte kind then the payload:
+
+  c<text/JSON command>   ->  t<reply text>
+  b<binary frame>        ->  b<ACK frame> | t<STATUS JSON>
+  q<query name>          ->  j<JSON>      (snapshot, timing, outputs, tracking)
+
+RemoteHandler is the web-side stand-in for CommandHandler. Commands still
+only enqueue into the child's mailbox, so a request is one socket round
+trip (tens of microseconds), but it is a blocking one shared by every client
+under a lock: the web server makes every call from a worker thread, never on
+the event loop.
+
+Shutdown matches the threaded setup: the parent sets a shared stop event,
+the child's control loop returns and shuts the subsystems down, and the
+parent joins the process. The child ignores SIGINT (Ctrl-C reaches the whole
+process group) and stops by itself if the parent disappears.
+"""
+
+import gc
+import json
+import os
+import signal
+import socket
+import threading
+import time
+import config
+from tools import binary_protocol as proto
+from tools.log import get_logger
+
+log = get_logger("ctrl")
+
+
+def _config_overrides() -> dict:
+    """Module-level settings of config, so runtime changes reach the child."""
+    return {k: v for k, v in vars(config).items() if k.isupper()}
+
+
+def _apply_affinity():
+    cpus = config.CONTROL_CPUS
+    if not cpus:
+        return
+    try:
+        os.sched_setaffinity(0, set(cpus))
+        log.info("Pinned to CPUs %s", sorted(cpus))
+    except (AttributeError, OSError) as e:
+        log.warning("CPU affinity %s not applied: %s", tuple(cpus), e)
+
+
+def _apply_rt_priority():
+    """SCHED_FIFO for the calling thread only (Linux schedules threads)."""
+    prio = config.CONTROL_RT_PRIORITY
+    if not prio:
+        return
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(int(prio)))
+        log.info("Control thread running SCHED_FIFO priority %d", prio)
+    except (AttributeError, OSError) as e:
+        log.warning("SCHED_FIFO priority %s not applied: %s", prio, e)
+
+
+class _BusSource:
+    """Tracker frames from the web process's frame bus, attached on first use."""
+
+    def __init__(self, name):
+        self.name = name
+        self.reader = None
+
+    def next_frame(self, after_seq=0, timeout=1.0, reduce=1):
+        if self.reader is None:
+            from tools.frame_bus import FrameBusReader
+
+            try:
+                self.reader = FrameBusReader(self.name)
+            except (FileNotFoundError, ValueError):
+                time.sleep(timeout)  # camera not started yet
+                return None
+        return self.reader.next_frame(after_seq, timeout, reduce)
+
+
+def _query(handler, name):
+    if name == "snapshot":
+        return handler.snapshot()
+    if name == "timing":
+        return handler.timing_stats()
+    if name == "outputs":
+        return handler.output_stats()
+    if name == "tracking":
+        return handler.tracker.stats() if handler.tracker is not None else None
+    raise ValueError(f"unknown query '{name}'")
+
+
+def _serve_conn(conn, handler):
+    with conn:
+        while True:
+            try:
+                msg = conn.recv(65536)
+            except OSError:
+                return
+            if not msg:
+                return
+            kind, body = msg[:1], msg[1:]
+            try:
+                if kind == b"c":
+                    reply = b"t" + handler.handle_command(body.decode()).encode()
+                elif kind == b"b":
+                    resp = handler.handle_binary(body)
+                    reply = b"b" + resp if isinstance(resp, bytes) else b"t" + resp.encode()
+                elif kind == b"q":
+                    reply = b"j" + json.dumps(_query(handler, body.decode())).encode()
+                else:
+                    reply = b"t" + f"ERR: bad request kind {kind!r}".encode()
+            except Exception as e:
+                log.warning("request failed: %s", e)
+                reply = b"t" + f"ERR: {e}".encode()
+            try:
+                conn.sendall(reply)
+            except OSError:
+                return
+
+
+def _serve(listener, handler, stop_event):
+    listener.settimeout(0.5)
+    while not stop_event.is_set():
+        try:
+            conn, _ = listener.accept()
+        except socket.timeout:
+            continue
+        except OSError:
+            return
+        threading.Thread(
+            target=_serve_conn, args=(conn, handler), name="ctrl-conn", daemon=True
+        ).start()
+
+
+def _watch_parent(parent, stop_event):
+    while not stop_event.wait(0.5):
+        if os.getppid() != parent:
+            log.warning("Parent process gone, stopping")
+            stop_event.set()
+
+
+def _child_main(stop_event, ready, overrides, parent):
+    """Entry point of the control process."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent decides when to stop
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    from tools.log import setup_logging
+
+    root, ext = os.path.splitext(config.LOG_FILE) if config.LOG_FILE else (None, "")
+    setup_logging(log_file=f"{root}.control{ext}" if root else "")
+    _apply_affinity()  # before any thread starts: new threads inherit it
+
+    from main import run_turrets
+    from tools.fleet import build
+    from tools.mailbox import ControlMailbox
+    from tools.scheduler import LoopScheduler
+
+    scheduler, mailbox = LoopScheduler(), ControlMailbox()
+    handler, turrets = build(scheduler, mailbox)
+    for t in turrets:
+        t.load_ballistics()
+    if config.FRAME_BUS:
+        from tools.tracker import Tracker
+
+        handler.tracker = Tracker(
+            _BusSource(config.FRAME_BUS), handler.yaw, handler.tilt, mailbox
+        )
+        if config.TRACK_ENABLED:
+            handler.tracker.start()
+
+    path = config.CONTROL_SOCKET
+    if os.path.exists(path):
+        os.unlink(path)  # left behind by a crashed run
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    listener.bind(path)
+    listener.listen(8)
+    threading.Thread(
+        target=_serve, args=(listener, handler, stop_event), name="ctrl-ipc", daemon=True
+    ).start()
+    threading.Thread(
+        target=_watch_parent, args=(parent, stop_event), name="ctrl-watch", daemon=True
+    ).start()
+
+    # helper threads keep the default policy; only the control thread is real-time
+    _apply_rt_priority()
+    gc.collect()
+    gc.freeze()  # long-lived setup objects are never rescanned by the collector
+    ready.set()
+    try:
+        run_turrets(turrets, stop_event, scheduler, mailbox, handler.idle)
+    finally:
+        if handler.tracker is not None:
+            handler.tracker.stop()
+        listener.close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class _RemoteTracker:
+    def __init__(self, remote):
+        self._remote = remote
+
+    def stats(self):
+        return self._remote._query("tracking")
+
+    @property
+    def active(self) -> bool:
+        return bool((self.stats() or {}).get("active"))
+
+    def stop(self):
+        pass  # the tracker lives and stops in the control process
+
+
+class RemoteHandler:
+    """CommandHandler stand-in in the web process, backed by the control socket."""
+
+    def __init__(self, path=None, timeout=None):
+        self.path = path or config.CONTROL_SOCKET
+        self.timeout = config.CONTROL_IPC_TIMEOUT if timeout is None else timeout
+        self.tracker = _RemoteTracker(self)
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        return sock
+
+    def _call(self, kind: bytes, payload: bytes = b""):
+        """One request/reply; (kind, body) or None when the control process is unreachable."""
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._sock = self._connect()
+                self._sock.sendall(kind + payload)
+                reply = self._sock.recv(1 << 20)
+                if not reply:
+                    raise ConnectionResetError("control process closed the socket")
+            except OSError as e:
+                # drop the connection: a late reply must not answer the next request
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                log.warning("control process unreachable: %s", e)
+                return None
+        return reply[:1], reply[1:]
+
+    def _query(self, name):
+        got = self._call(b"q", name.encode())
+        if got is None or got[0] != b"j":
+            return None
+        return json.loads(got[1])
+
+    def is_inline(self, command: str) -> bool:
+        """
+        Never: every call blocks on the socket under one lock for up to
+        CONTROL_IPC_TIMEOUT, which would stall every client and the video.
+        """
+        return False
+
+    def is_inline_binary(self, data: bytes) -> bool:
+        """Never, like is_inline(): STATUS included, every frame is a round trip."""
+        return False
+
+    def handle_command(self, command: str):
+        got = self._call(b"c", command.encode())
+        if got is None:
+            return "ERR: control process unavailable"
+        return got[1].decode()
+
+    def handle_binary(self, data: bytes):
+        got = self._call(b"b", data)
+        if got is None:
+            return proto.ack(data[0] if data else 0, False)
+        kind, body = got
+        return body if kind == b"b" else body.decode()
+
+    def snapshot(self) -> dict:
+        snap = self._query("snapshot")
+        if snap is None:
+            raise RuntimeError("control process unavailable")
+        return snap
+
+    def timing_stats(self):
+        return self._query("timing")
+
+    def output_stats(self):
+        return self._query("outputs")
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+
+class ControlProcess:
+    """Start, connect to and stop the control process."""
+
+    def __init__(self):
+        import multiprocessing
+
+        # spawn, not fork: the parent already runs the logging thread
+        self._ctx = multiprocessing.get_context("spawn")
+        self.stop_event = self._ctx.Event()
+        self._ready = self._ctx.Event()
+        self.process = None
+        self.handler = None
+
+    def start(self, timeout: float = 15.0) -> RemoteHandler:
+        """Spawn the child and return a RemoteHandler once it accepts requests."""
+        self.process = self._ctx.Process(
+            target=_child_main,
+            args=(self.stop_event, self._ready, _config_overrides(), os.getpid()),
+            name="control",
+            daemon=True,
+        )
+        self.process.start()
+        deadline = time.monotonic() + timeout
+        while not self._ready.wait(0.05):
+            if not self.process.is_alive():
+                raise RuntimeError(f"control process exited ({self.process.exitcode})")
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError("control process did not start in time")
+        self.handler = RemoteHandler()
+        log.info("Control process %d ready", self.process.pid)
+        return self.handler
+
+    def stop(self, timeout: float = 5.0):
+        """Same order as the threaded setup: set stop_event, then join."""
+        if self.process is None:
+            return
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            log.warning("Control process did not stop, terminating")
+            self.process.terminate()
+            self.process.join(1.0)
+        if self.handler is not None:
+            self.handler.close()
+        self.process = None
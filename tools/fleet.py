@@ -0,0 +1,273 @@
+"""
+Several turrets driven by one control process.
+
+config.TURRETS maps a turret id to a section of settings that differ from
+the module-level ones (pins, limits, ballistics, ...). Every turret gets its
+own subsystems, CommandHandler, Sequencer and FlightRecorder; all of them
+share one LoopScheduler and one ControlMailbox (slot names are prefixed with
+the turret id), so a single control thread ticks every turret.
+
+Fleet stands in for CommandHandler towards the web layer and routes by id:
+
+  @left yaw 30                     text: "@<id> " prefix
+  {"turret": "left", "cmd": "yaw", "value": 30}
+  @all shoot 0.6                   fan-out: every turret, same tick
+  {"turret": "all", "cmd": "aim", "yaw": 0, "tilt": 4}
+  turrets                          ids and shooter states
+
+Unaddressed commands, binary frames without a TURRET prefix and the vision
+tracker go to the first turret, so single-turret clients keep working.
+A fan-out runs each turret's handler inside mailbox.batch(): the replies are
+synchronous as usual, and everything the handlers queue is applied by one
+drain(), i.e. in the same control tick.
+"""
+
+import json
+from contextlib import nullcontext
+import config
+from hardware.shooter import Shooter
+from hardware.tilt_servo import TiltServo
+from hardware.yaw_servo import AngularServoYaw
+from tools import binary_protocol as proto
+from tools import startup
+from tools.command_handler import (
+    INLINE_COMMANDS,
+    INLINE_OPCODES,
+    CommandHandler,
+    command_name,
+)
+from tools.log import get_logger
+from tools.sequencer import Sequencer
+
+log = get_logger("fleet")
+
+ALL = ("all", "*")
+
+
+class TurretConfig:
+    """
+    The config settings as seen by one turret: a snapshot of config's
+    module-level values with the turret's section on top. Plain instance
+    attributes, so per-tick lookups cost the same as config.X.
+    """
+
+    def __init__(self, turret_id, section):
+        unknown = sorted(
+            k for k in section if not k.isupper() or not hasattr(config, k)
+        )
+        if unknown:
+            raise ValueError(f"turret '{turret_id}': unknown settings {unknown}")
+        self.turret_id = turret_id
+        vars(self).update({k: v for k, v in vars(config).items() if k.isupper()})
+        vars(self).update(section)
+
+
+class Turret:
+    """One launcher: its subsystems, handler and the helpers ticked with it."""
+
+    def __init__(
+        self, turret_id, yaw, tilt, shooter, handler=None, recorder=None, sequencer=None
+    ):
+        self.id = turret_id  # None for the single, unnamed turret
+        self.yaw = yaw
+        self.tilt = tilt
+        self.shooter = shooter
+        self.handler = handler
+        self.recorder = recorder
+        self.sequencer = sequencer
+
+    def load_ballistics(self):
+        from tools.ballistics import BallisticTable
+
+        self.handler.ballistics = BallisticTable.load(cfg=self.yaw.cfg)
+
+
+def build_turret(turret_id=None, cfg=None, scheduler=None, mailbox=None) -> Turret:
+    """Subsystems, handler, sequencer and recorder of one turret, wired like main.py."""
+    label = f" {turret_id}" if turret_id else ""
+    with startup.phase(f"init yaw{label}"):
+        yaw = AngularServoYaw(cfg)
+    with startup.phase(f"init tilt{label}"):
+        tilt = TiltServo(cfg)
+    with startup.phase(f"init shooter{label}"):
+        shooter = Shooter(cfg)
+    handler = CommandHandler(yaw, tilt, shooter, scheduler, mailbox, name=turret_id)
+    handler.sequencer = Sequencer(yaw, tilt, shooter)
+    if config.RECORDER_ENABLED:
+        from tools.flight_recorder import FlightRecorder
+
+        handler.recorder = FlightRecorder(yaw, tilt, shooter, name=turret_id)
+    return Turret(
+        turret_id, yaw, tilt, shooter, handler, handler.recorder, handler.sequencer
+    )
+
+
+def build(scheduler, mailbox):
+    """
+    (handler, turrets) for the configured setup: a plain CommandHandler for
+    one turret, a Fleet when config.TURRETS defines several. With
+    config.IDLE_AFTER_SEC, handler.idle is the IdleController of them all.
+    """
+    if not config.TURRETS:
+        turret = build_turret(scheduler=scheduler, mailbox=mailbox)
+        _add_idle(turret.handler, [turret], scheduler)
+        return turret.handler, [turret]
+    turrets = {}
+    for tid, section in config.TURRETS.items():
+        tid = str(tid)
+        if tid in ALL or not tid or any(c in tid for c in " .@"):
+            raise ValueError(f"bad turret id '{tid}'")
+        # handlers get no scheduler: the fleet reports loop stats once
+        cfg = TurretConfig(tid, section or {})
+        turrets[tid] = build_turret(tid, cfg, None, mailbox)
+    fleet = Fleet(turrets, scheduler, mailbox)
+    _add_idle(fleet, list(turrets.values()), scheduler)
+    return fleet, list(turrets.values())
+
+
+def _add_idle(handler, turrets, scheduler):
+    if config.IDLE_AFTER_SEC is None:
+        return
+    from tools.idle import IdleController
+
+    handler.idle = IdleController(scheduler, turrets, handler)
+    for t in turrets:
+        t.handler.idle = handler.idle
+
+
+class Fleet:
+    """CommandHandler stand-in that routes commands to turrets by id."""
+
+    def __init__(self, turrets: dict, scheduler=None, mailbox=None):
+        if not turrets:
+            raise ValueError("Fleet needs at least one turret")
+        self.scheduler = scheduler
+        self.mailbox = mailbox
+        self.turrets = dict(turrets)  # id -> Turret, in config order
+        self._order = list(self.turrets.values())  # binary TURRET index -> turret
+        self.default = self._order[0]
+        self.idle = None  # IdleController shared by the turrets, see build()
+        log.info("Fleet of %d turrets: %s", len(self._order), ", ".join(self.turrets))
+
+    # the default turret faces the camera: main.py builds the tracker from these
+    @property
+    def yaw(self):
+        return self.default.yaw
+
+    @property
+    def tilt(self):
+        return self.default.tilt
+
+    @property
+    def tracker(self):
+        return self.default.handler.tracker
+
+    @tracker.setter
+    def tracker(self, tracker):
+        self.default.handler.tracker = tracker
+
+    def is_inline(self, command: str) -> bool:
+        return self.mailbox is not None and command_name(command) in INLINE_COMMANDS
+
+    def is_inline_binary(self, data: bytes) -> bool:
+        return self.mailbox is not None and proto.opcode(data) in INLINE_OPCODES
+
+    def handle_command(self, command: str):
+        text = command.strip()
+        try:
+            # whichever turret the request names, the reply lists all of them
+            if command_name(text) == "turrets":
+                return self._list()
+            if text.startswith("{"):
+                target = json.loads(text).get("turret")
+                if target is not None:
+                    return self._route(str(target), text)
+            elif text.startswith("@"):
+                target, _, rest = text[1:].partition(" ")
+                return self._route(target, rest)
+        except Exception as e:
+            log.warning("error=%s", e)
+            return f"ERR: {e}"
+        return self.default.handler.handle_command(text)
+
+    def _route(self, target, command):
+        if target in ALL:
+            return self._fan_out(command)
+        turret = self.turrets.get(target)
+        if turret is None:
+            return f"ERR: unknown turret '{target}'"
+        return turret.handler.handle_command(command)
+
+    def _batch(self):
+        return self.mailbox.batch() if self.mailbox is not None else nullcontext()
+
+    def _fan_out(self, command):
+        """Run command on every turret; whatever they queue lands in one tick."""
+        with self._batch():
+            replies = {
+                tid: t.handler.handle_command(command)
+                for tid, t in self.turrets.items()
+            }
+        return json.dumps(
+            {
+                "ok": not any(r.startswith("ERR") for r in replies.values()),
+                "turrets": {
+                    tid: json.loads(r) if r.startswith("{") else r
+                    for tid, r in replies.items()
+                },
+            }
+        )
+
+    def _list(self):
+        turrets = []
+        for tid, t in self.turrets.items():
+            # no state until the control loop has initialised the shooter
+            state = getattr(t.shooter, "state", None)
+            turrets.append({"id": tid, "state": state.name if state else None})
+        return json.dumps({"ok": True, "default": self.default.id, "turrets": turrets})
+
+    def handle_binary(self, data: bytes):
+        """Frames without a TURRET prefix go to the default turret."""
+        if not data or data[0] != proto.TURRET:
+            return self.default.handler.handle_binary(data)
+        if len(data) < 3:
+            return proto.ack(proto.TURRET, False)
+        index, inner = data[1], data[2:]
+        if index != proto.ALL_TURRETS:
+            if index >= len(self._order):
+                return proto.ack(inner[0], False)
+            return self._order[index].handler.handle_binary(inner)
+        with self._batch():
+            replies = [t.handler.handle_binary(inner) for t in self._order]
+        if isinstance(replies[0], str):  # STATUS
+            merged = {t.id: json.loads(r) for t, r in zip(self._order, replies)}
+            return json.dumps({"ok": True, "turrets": merged})
+        return proto.ack(inner[0], all(r[1] for r in replies))
+
+    def snapshot(self) -> dict:
+        """Keys prefixed with the turret id; the default turret's also unprefixed."""
+        snap = {}
+        for tid, t in self.turrets.items():
+            sub = t.handler.snapshot()
+            snap.update({f"{tid}.{k}": v for k, v in sub.items()})
+            if t is self.default:
+                snap.update(sub)
+        if self.scheduler is not None:
+            for name, st in self.scheduler.stats().items():
+                snap[f"loop.{name}.jitter_p99_ms"] = round(st["jitter_ms"]["p99"], 2)
+                snap[f"loop.{name}.overruns"] = st["overruns"]
+        return snap
+
+    def timing_stats(self):
+        stats = {}
+        for tid, t in self.turrets.items():
+            stats[tid] = t.handler.timing_stats()
+            stats[tid].pop("mailbox", None)
+        if self.scheduler is not None:
+            stats["loop"] = self.scheduler.stats()
+        if self.mailbox is not None:
+            stats["mailbox"] = self.mailbox.stats()
+        return stats
+
+    def output_stats(self):
+        return self.default.handler.output_stats()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Always-on flight recorder for the control loop.
+
+sample() runs as the last scheduler task of every tick and writes one row
+into preallocated array("d") column rings (RECORDER_SECONDS of history at
+MAIN_LOOP_HZ): time, yaw/tilt target and current angle, shooter state,
+flywheel power/applied/speed, queued and fired shots and the periodic()
+duration of each subsystem. Nothing is allocated per tick.
+
+A trigger (the "record" command, a shot when RECORDER_DUMP_ON_SHOT is set,
+or an exception escaping the control loop) dumps the window to a compressed
+columnar .npz in RECORDER_DIR. Command and shot triggers keep recording for
+RECORDER_POST_SEC first, so the file shows what happened after the event;
+the rows are copied on the control thread (a memcpy per column) and
+compressed and written on a background thread.
+
+Offline:
+  python tools/flight_recorder.py logs/flights/flight-....npz
+  flight = load(path); flight["yaw_current"], flight.meta, flight.to_dataframe()
+"""
+
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from array import array
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from tools import clock
+from tools.log import get_logger
+
+log = get_logger("recorder")
+
+COLUMNS = (
+    "t",
+    "yaw_target",
+    "yaw_current",
+    "tilt_target",
+    "tilt_current",
+    "shooter_state",
+    "flywheel_power",
+    "flywheel_applied",
+    "flywheel_speed",
+    "pending_shots",
+    "shots_fired",
+    "yaw_periodic_ms",
+    "tilt_periodic_ms",
+    "shooter_periodic_ms",
+)
+
+
+class FlightRecorder:
+    def __init__(self, yaw, tilt, shooter, seconds=None, hz=None, name=None):
+        self.name = name  # turret id, part of the file name
+        self.yaw = yaw
+        self.tilt = tilt
+        self.shooter = shooter
+        self.hz = hz or config.MAIN_LOOP_HZ
+        seconds = config.RECORDER_SECONDS if seconds is None else seconds
+        self.size = max(2, int(seconds * self.hz))
+        self._cols = [array("d", bytes(8 * self.size)) for _ in COLUMNS]
+        self._idx = 0
+        self.count = 0  # rows ever written
+        self._trigger = None  # (reason, due time)
+        self._shots = None
+        self.dumps = 0
+        self.last_dump = None
+
+    def sample(self):
+        """Control thread, once per tick: append one row."""
+        yaw, tilt, sh = self.yaw, self.tilt, self.shooter
+        now = clock.monotonic()
+        i = self._idx
+        (
+            c_t,
+            c_yt,
+            c_yc,
+            c_tt,
+            c_tc,
+            c_st,
+            c_fp,
+            c_fa,
+            c_fs,
+            c_pe,
+            c_sf,
+            c_yd,
+            c_td,
+            c_sd,
+        ) = self._cols
+        c_t[i] = now
+        c_yt[i] = yaw._target_angle
+        c_yc[i] = yaw.current_angle
+        c_tt[i] = tilt.target_angle
+        c_tc[i] = tilt.current_angle
+        c_st[i] = sh.state.value
+        c_fp[i] = sh.target_flywheel_power
+        c_fa[i] = sh.flywheel_power
+        c_fs[i] = sh.flywheel_speed
+        c_pe[i] = sh.pending_shots
+        c_sf[i] = sh.shots_fired
+        c_yd[i] = yaw.timing.last * 1000.0
+        c_td[i] = tilt.timing.last * 1000.0
+        c_sd[i] = sh.timing.last * 1000.0
+        self._idx = (i + 1) % self.size
+        self.count += 1
+
+        if config.RECORDER_DUMP_ON_SHOT and sh.shots_fired != self._shots:
+            if self._shots is not None:
+                self.trigger("shot")
+            self._shots = sh.shots_fired
+        if self._trigger is not None and now >= self._trigger[1]:
+            reason = self._trigger[0]
+            self._trigger = None
+            columns = self._window()
+            threading.Thread(
+                target=self._write, args=(columns, reason), name="recorder", daemon=True
+            ).start()
+
+    def trigger(self, reason: str = "manual", post: float = None) -> bool:
+        """Dump after post seconds (RECORDER_POST_SEC); any thread. False if one is pending."""
+        if self._trigger is not None:
+            return False
+        post = config.RECORDER_POST_SEC if post is None else post
+        self._trigger = (reason, clock.monotonic() + post)
+        return True
+
+    def dump_now(self, reason: str = "error"):
+        """Copy and write synchronously, e.g. from the control thread as it dies."""
+        return self._write(self._window(), reason)
+
+    def _window(self) -> dict:
+        """Oldest-first copy of the recorded rows, one NumPy array per column."""
+        n = min(self.count, self.size)
+        out = {}
+        for name, col in zip(COLUMNS, self._cols):
+            a = np.frombuffer(col, dtype=np.float64)
+            if n < self.size:
+                out[name] = a[:n].copy()
+            else:
+                out[name] = np.concatenate((a[self._idx :], a[: self._idx]))
+        return out
+
+    def _write(self, columns: dict, reason: str):
+        os.makedirs(config.RECORDER_DIR, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f".{int(time.time() * 1000) % 1000:03d}"
+        tag = f"{self.name}-{reason}" if self.name else reason
+        path = os.path.join(config.RECORDER_DIR, f"flight-{stamp}-{tag}.npz")
+        from hardware.shooter import ShooterState
+
+        meta = {
+            "reason": reason,
+            "turret": self.name,
+            "hz": self.hz,
+            "rows": len(columns["t"]),
+            # wall clock = t + wall_offset
+            "wall_offset": time.time() - clock.monotonic(),
+            "states": {s.value: s.name for s in ShooterState},
+        }
+        try:
+            np.savez_compressed(
+                path,
+                meta=np.array(json.dumps(meta)),
+                **{
+                    k: v.astype(np.uint8) if k == "shooter_state" else v
+                    for k, v in columns.items()
+                },
+            )
+        except OSError as e:
+            log.warning("dump %s failed: %s", path, e)
+            return None
+        self.dumps += 1
+        self.last_dump = path
+        log.info("Flight recorded to %s (%d rows, %s)", path, meta["rows"], reason)
+        self._prune()
+        return path
+
+    @staticmethod
+    def _prune():
+        files = sorted(glob.glob(os.path.join(config.RECORDER_DIR, "flight-*.npz")))
+        for old in files[: max(0, len(files) - config.RECORDER_KEEP)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "rows": self.count,
+            "window_s": round(min(self.count, self.size) / self.hz, 1),
+            "pending": self._trigger[0] if self._trigger is not None else None,
+            "dumps": self.dumps,
+            "last_dump": self.last_dump,
+        }
+
+
+class Flight:
+    """A loaded recording: columns by name plus the dump metadata."""
+
+    def __init__(self, columns: dict, meta: dict):
+        self.columns = columns
+        self.meta = meta
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return len(self.columns["t"])
+
+    def state_names(self):
+        """Shooter state per row as names."""
+        states = {int(k): v for k, v in self.meta["states"].items()}
+        return [states.get(int(s), "?") for s in self.columns["shooter_state"]]
+
+    def to_dataframe(self):
+        import pandas as pd  # optional, for notebooks
+
+        df = pd.DataFrame(self.columns)
+        df["shooter_state"] = self.state_names()
+        return df
+
+    def summary(self) -> dict:
+        t = self.columns["t"]
+        st = self.columns["shooter_state"]
+        names = self.state_names()
+        changes = np.flatnonzero(np.diff(st)) + 1
+        return {
+            "reason": self.meta["reason"],
+            "rows": len(self),
+            "duration_s": round(float(t[-1] - t[0]), 3) if len(t) else 0.0,
+            "shots": int(self.columns["shots_fired"][-1] - self.columns["shots_fired"][0])
+            if len(t)
+            else 0,
+            "periodic_max_ms": {
+                k: round(float(self.columns[f"{k}_periodic_ms"].max(initial=0.0)), 3)
+                for k in ("yaw", "tilt", "shooter")
+            },
+            "transitions": [
+                (round(float(t[i] - t[0]), 3), names[i]) for i in changes[:50]
+            ],
+        }
+
+
+def load(path) -> Flight:
+    with np.load(path) as f:
+        meta = json.loads(str(f["meta"]))
+        columns = {k: f[k] for k in COLUMNS if k in f.files}
+    return Flight(columns, meta)
+
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Summarise a flight recording")
+    ap.add_argument("path", nargs="?", help="recording (.npz); default: newest")
+    args = ap.parse_args(argv)
+    path = args.path
+    if path is None:
+        files = sorted(glob.glob(os.path.join(config.RECORDER_DIR, "flight-*.npz")))
+        if not files:
+            ap.error(f"no recordings in {config.RECORDER_DIR}")
+        path = files[-1]
+    print(json.dumps({"path": path, **load(path).summary()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Shared-memory frame bus: camera frames for other processes, without pickling.
+
+The capture side (FrameBroadcaster, when config.FRAME_BUS names a bus)
+writes every frame into a ring of slots in one multiprocessing.shared_memory
+block: the JPEG bytes and, when the frame was captured as BGR, the pixels.
+Readers in any process attach by name and get NumPy views straight into
+the shared block, so a tracker or recorder process costs no copies and runs
+outside the GIL the control thread shares with the web server.
+
+Each slot carries a generation counter used as a seqlock: odd while the
+writer is filling it. A reader checks it before and after use (valid())
+to detect a slot that was overwritten under it; with FRAME_BUS_SLOTS slots
+a view stays valid for slots - 1 frame periods.
+
+Watch a running bus:
+  python tools/frame_bus.py [--name balllauncher-frames] [--seconds 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+_MAGIC = 0x46425553  # "FBUS"
+_HEADER = np.dtype(
+    [
+        ("magic", "<u4"),
+        ("slots", "<u4"),
+        ("jpeg_cap", "<u8"),
+        ("raw_cap", "<u8"),
+        ("seq", "<u8"),  # newest complete frame
+    ]
+)
+_SLOT = np.dtype(
+    [
+        ("gen", "<u8"),  # seqlock: odd while being written
+        ("seq", "<u8"),
+        ("stamp", "<f8"),  # time.monotonic() at capture (system-wide on Linux)
+        ("jpeg_len", "<u8"),
+        ("h", "<u4"),
+        ("w", "<u4"),
+        ("c", "<u4"),
+        ("_pad", "<u4"),
+    ]
+)
+
+_owned = set()  # names of buses created by this process
+
+
+def _untrack(shm):
+    # Before Python 3.13 every attaching process registers the block with its
+    # resource tracker, which unlinks it when that process exits.
+    if shm._name.lstrip("/") in _owned:
+        return  # the writer in this process keeps (and drops) the registration
+    try:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+
+
+class _Layout:
+    """NumPy views over the header, slot table and slot payloads of a block."""
+
+    def __init__(self, shm):
+        self.shm = shm
+        buf = shm.buf
+        self.header = np.ndarray((), _HEADER, buffer=buf)
+        if int(self.header["magic"]) not in (0, _MAGIC):
+            raise ValueError(f"shared memory {shm.name!r} is not a frame bus")
+
+    def map(self):
+        h = self.header
+        slots, jcap, rcap = int(h["slots"]), int(h["jpeg_cap"]), int(h["raw_cap"])
+        off = _HEADER.itemsize
+        self.slots = np.ndarray((slots,), _SLOT, buffer=self.shm.buf, offset=off)
+        off += slots * _SLOT.itemsize
+        off = (off + 63) & ~63
+        self.jpeg = np.ndarray((slots, jcap), np.uint8, buffer=self.shm.buf, offset=off)
+        off += slots * jcap
+        self.raw = np.ndarray((slots, rcap), np.uint8, buffer=self.shm.buf, offset=off)
+
+    @staticmethod
+    def size(slots, jpeg_cap, raw_cap):
+        off = _HEADER.itemsize + slots * _SLOT.itemsize
+        return ((off + 63) & ~63) + slots * (jpeg_cap + raw_cap)
+
+
+class FrameBus:
+    """Writer side; owns (creates and unlinks) the shared block."""
+
+    def __init__(self, name=None, width=640, height=480, slots=None, jpeg_cap=None):
+        name = name or config.FRAME_BUS
+        slots = slots or config.FRAME_BUS_SLOTS
+        jpeg_cap = jpeg_cap or config.FRAME_BUS_JPEG_MAX
+        raw_cap = width * height * 3
+        size = _Layout.size(slots, jpeg_cap, raw_cap)
+        try:
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        except FileExistsError:
+            # left behind by a crashed run: take it over
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.name = name
+        _owned.add(name)
+        self._lay = _Layout(self.shm)
+        h = self._lay.header
+        h["slots"], h["jpeg_cap"], h["raw_cap"], h["seq"] = slots, jpeg_cap, raw_cap, 0
+        self._lay.map()
+        h["magic"] = _MAGIC
+        self.written = 0
+        self.oversize = 0
+
+    def publish(self, seq, stamp, jpeg=None, frame=None):
+        """Write one frame; frame (HxWxC uint8) is optional, jpeg bytes too."""
+        lay = self._lay
+        i = seq % len(lay.slots)
+        slot = lay.slots[i]
+        slot["gen"] += 1  # odd: readers skip / invalidate this slot
+        n = len(jpeg) if jpeg is not None else 0
+        if n > lay.jpeg.shape[1]:
+            self.oversize += 1
+            n = 0
+        if n:
+            lay.jpeg[i, :n] = np.frombuffer(jpeg, np.uint8)
+        shape = (0, 0, 0)
+        if frame is not None and frame.size <= lay.raw.shape[1]:
+            shape = frame.shape if frame.ndim == 3 else frame.shape + (1,)
+            lay.raw[i, : frame.size].reshape(frame.shape)[...] = frame
+        slot["seq"], slot["stamp"], slot["jpeg_len"] = seq, stamp, n
+        slot["h"], slot["w"], slot["c"] = shape
+        slot["gen"] += 1
+        lay.header["seq"] = seq
+        self.written += 1
+
+    def close(self):
+        if self.shm is None:
+            return
+        self._lay = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        _owned.discard(self.name)
+        self.shm = None
+
+
+class BusFrame:
+    """One frame as seen by a reader: zero-copy views plus a validity token."""
+
+    __slots__ = ("seq", "stamp", "jpeg", "pixels", "_slot", "_gen")
+
+    def __init__(self, seq, stamp, jpeg, pixels, slot, gen):
+        self.seq, self.stamp, self.jpeg, self.pixels = seq, stamp, jpeg, pixels
+        self._slot, self._gen = slot, gen
+
+    def valid(self) -> bool:
+        """False once the writer has started overwriting this slot."""
+        return int(self._slot["gen"]) == self._gen
+
+
+class FrameBusReader:
+    """Reader side; attach by name from any process."""
+
+    def __init__(self, name=None, poll=0.002):
+        self.shm = shared_memory.SharedMemory(name or config.FRAME_BUS)
+        _untrack(self.shm)
+        self._lay = _Layout(self.shm)
+        if int(self._lay.header["magic"]) != _MAGIC:
+            self._lay = None  # drop the header view before closing the block
+            self.shm.close()
+            raise ValueError(f"frame bus {self.shm.name!r} is not initialised yet")
+        self._lay.map()
+        self.poll = poll
+        self.torn = 0  # reads that raced the writer and were retried
+
+    def latest(self):
+        """Newest complete frame as a BusFrame, or None before the first one."""
+        lay = self._lay
+        for _ in range(4):
+            seq = int(lay.header["seq"])
+            if not seq:
+                return None
+            i = seq % len(lay.slots)
+            slot = lay.slots[i]
+            gen = int(slot["gen"])
+            if gen & 1 or int(slot["seq"]) != seq:
+                self.torn += 1
+                continue
+            n = int(slot["jpeg_len"])
+            h, w, c = int(slot["h"]), int(slot["w"]), int(slot["c"])
+            jpeg = lay.jpeg[i, :n] if n else None
+            pixels = lay.raw[i, : h * w * c].reshape(h, w, c) if h else None
+            frame = BusFrame(seq, float(slot["stamp"]), jpeg, pixels, slot, gen)
+            if frame.valid():
+                return frame
+            self.torn += 1
+        return None
+
+    def next_frame(self, after_seq=0, timeout=1.0, reduce=1):
+        """
+        Same contract as FrameBroadcaster.next_frame(): (seq, stamp, BGR frame)
+        of the newest frame after after_seq, or None on timeout. Pixels are a
+        (strided, for reduce > 1) view into shared memory; JPEG-only frames
+        are decoded, at reduced scale when asked.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            f = self.latest()
+            if f is not None and f.seq > after_seq:
+                break
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.poll)
+        if f.pixels is not None:
+            px = f.pixels[::reduce, ::reduce] if reduce > 1 else f.pixels
+            return f.seq, f.stamp, px
+        if f.jpeg is None:
+            return None
+        import cv2
+
+        flag = {
+            1: cv2.IMREAD_COLOR,
+            2: cv2.IMREAD_REDUCED_COLOR_2,
+            4: cv2.IMREAD_REDUCED_COLOR_4,
+        }.get(reduce, cv2.IMREAD_REDUCED_COLOR_8)
+        px = cv2.imdecode(f.jpeg, flag)
+        return (f.seq, f.stamp, px) if px is not None and f.valid() else None
+
+    def close(self):
+        self._lay = None
+        self.shm.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Watch a shared-memory frame bus")
+    ap.add_argument("--name", default=config.FRAME_BUS or "balllauncher-frames")
+    ap.add_argument("--seconds", type=float, default=5.0)
+    args = ap.parse_args(argv)
+    reader = FrameBusReader(args.name)
+    seq, frames, lag = 0, 0, []
+    t_end = time.monotonic() + args.seconds
+    while time.monotonic() < t_end:
+        got = reader.next_frame(seq, 1.0)
+        if got is None:
+            continue
+        seq = got[0]
+        frames += 1
+        lag.append((time.monotonic() - got[1]) * 1000.0)
+    reader.close()
+    print(
+        json.dumps(
+            {
+                "bus": args.name,
+                "fps": round(frames / args.seconds, 2),
+                "lag_ms_mean": round(sum(lag) / len(lag), 3) if lag else None,
+                "lag_ms_max": round(max(lag), 3) if lag else None,
+                "torn_reads": reader.torn,
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Idle power mode: slow down and let go of the hardware when nobody uses it.
+
+IdleController runs as the first task of the control loop. Once there has
+been no command for IDLE_AFTER_SEC and every turret is at rest (shooter
+IDLE with the wheels stopped, servos on target, no program playing, no
+tracking), it throttles the scheduler to IDLE_LOOP_HZ and detaches the
+servo outputs (IDLE_DETACH_SERVOS): no more PWM pulses, the servos hold by
+friction and the profiles keep their state. Any command calls touch(),
+which kicks the throttled scheduler out of its sleep; the control thread
+then restores the full rate and re-attaches the outputs before the command
+is drained. The time from touch() to that point is the resume latency.
+
+CameraIdle does the same for the webcam in the web process: with no /video
+viewers, no WebSocket traffic, no tracking and no video recording for
+IDLE_AFTER_SEC it releases the camera (IDLE_CAMERA), and the first viewer
+or command restarts capture; the resume latency runs to the first new frame.
+While viewers are watching it sends "wake" to the control side so the
+turret stays ready.
+"""
+
+import threading
+import time
+import config
+from tools import clock
+from tools.log import get_logger
+from tools.ring_stats import RingStats
+
+log = get_logger("idle")
+
+
+class IdleController:
+    def __init__(self, scheduler, turrets, handler=None, after=None, idle_hz=None):
+        self.scheduler = scheduler
+        self.turrets = list(turrets)
+        self.handler = handler  # for handler.tracker, injected after start-up
+        self.after = config.IDLE_AFTER_SEC if after is None else after
+        self.idle_hz = idle_hz or config.IDLE_LOOP_HZ
+        self.idle = False
+        self._last = clock.monotonic()  # last activity
+        self._touches = 0
+        self._slept_at = 0  # _touches when idle mode began
+        self._wake_from = None  # first touch() while idle
+        self.idles = 0
+        self.idle_s = 0.0  # total time spent idle
+        self._idle_since = 0.0
+        self.resume_ms = RingStats(64)
+
+    def touch(self):
+        """Any thread: there was activity (a command)."""
+        t = clock.monotonic()
+        self._last = t
+        self._touches += 1
+        if self.idle:
+            if self._wake_from is None:
+                self._wake_from = t
+            self.scheduler.kick()
+
+    def _busy(self) -> bool:
+        tracker = getattr(self.handler, "tracker", None)
+        if tracker is not None and tracker.active:
+            return True
+        for t in self.turrets:
+            sh = t.shooter
+            if sh.state.name != "IDLE" or sh.pending_shots or sh.flywheel_power > 0.0:
+                return True
+            if sh.flywheel_speed > 0.01:
+                return True  # still spinning down
+            if t.sequencer is not None and t.sequencer.state == "playing":
+                return True
+            if abs(t.yaw.current_angle - t.yaw.target_angle) > 0.01:
+                return True
+            if abs(t.tilt.current_angle - t.tilt.target_angle) > 0.01:
+                return True
+        return False
+
+    def tick(self):
+        """Scheduler task, first of the tick."""
+        now = clock.monotonic()
+        if self.idle:
+            if self._touches != self._slept_at:
+                self._resume(now)
+            return
+        touches = self._touches  # before _last: a later touch() must still wake us
+        quiet = self.after is not None and now - self._last >= self.after
+        if quiet and not self._busy():
+            self._sleep(now, touches)
+
+    def _sleep(self, now, touches):
+        if config.IDLE_DETACH_SERVOS:
+            for t in self.turrets:
+                t.yaw.detach()
+                t.tilt.detach()
+                t.shooter.detach()
+        self.scheduler.throttle(self.idle_hz)  # clears a pending kick
+        self._slept_at = touches
+        self._wake_from = None
+        self._idle_since = now
+        self.idles += 1
+        self.idle = True  # touch() kicks from here on
+        if self._touches != touches:
+            self.scheduler.kick()  # a command arrived since tick() looked
+        log.info(
+            "Idle after %.0fs without commands: loop at %g Hz%s",
+            now - self._last,
+            self.idle_hz,
+            ", servos detached" if config.IDLE_DETACH_SERVOS else "",
+        )
+
+    def _resume(self, now):
+        self.scheduler.throttle(None)
+        if config.IDLE_DETACH_SERVOS:
+            for t in self.turrets:
+                t.yaw.attach()
+                t.tilt.attach()
+                t.shooter.attach()
+        self.idle = False
+        self.idle_s += now - self._idle_since
+        start = self._wake_from if self._wake_from is not None else now
+        ms = (now - start) * 1000.0
+        self.resume_ms.add(ms)
+        idle_for = now - self._idle_since
+        log.info("Awake after %.0fs idle (resumed in %.2f ms)", idle_for, ms)
+
+    def stats(self) -> dict:
+        now = clock.monotonic()
+        return {
+            "idle": self.idle,
+            "quiet_s": round(now - self._last, 1),
+            "idles": self.idles,
+            "idle_s": round(self.idle_s + (now - self._idle_since) * self.idle, 1),
+            "resume_ms": self.resume_ms.summary(),
+        }
+
+
+class CameraIdle:
+    """Pauses the FrameBroadcaster while nobody watches or commands (web process)."""
+
+    def __init__(self, camera, get_handler=None, after=None):
+        self.camera = camera
+        # web.app.handler is injected after the app is built
+        self.get_handler = get_handler or (lambda: None)
+        self.after = config.IDLE_AFTER_SEC if after is None else after
+        self.paused = False
+        self._resuming = False
+        self.viewers = 0
+        self._last = time.monotonic()
+        self._last_wake_sent = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.pauses = 0
+        self.resume_ms = RingStats(64)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="camera-idle", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def touch(self):
+        """Event loop: a WebSocket message; restart capture in the background."""
+        self._last = time.monotonic()
+        if self.paused and not self._resuming:
+            self._resuming = True
+            threading.Thread(
+                target=self.resume, name="camera-resume", daemon=True
+            ).start()
+
+    def acquire(self):
+        """A /video viewer starts (worker thread): capture is running on return."""
+        with self._lock:
+            self.viewers += 1
+        self._last = time.monotonic()
+        self.resume()
+        self._wake_control()
+
+    def release(self):
+        with self._lock:
+            self.viewers -= 1
+        self._last = time.monotonic()
+
+    def resume(self):
+        """Restart capture if paused and wait for its first frame."""
+        with self._lock:
+            if not self.paused:
+                self._resuming = False
+                return
+            t0 = time.monotonic()
+            seq = self.camera.latest_seq()
+            self.camera.start()
+            self.paused = False
+            got = self.camera.wait_frame(seq, 5.0)
+            self._resuming = False
+        ms = (time.monotonic() - t0) * 1000.0
+        self.resume_ms.add(ms)
+        log.info("Camera resumed in %.0f ms%s", ms, "" if got else " (no frame yet)")
+
+    def _tracking(self) -> bool:
+        tracker = getattr(self.get_handler(), "tracker", None)
+        return bool(tracker is not None and tracker.active)
+
+    def _recording(self) -> bool:
+        recorder = getattr(self.camera, "recorder", None)
+        return bool(recorder is not None and recorder.active)
+
+    def _wake_control(self):
+        handler = self.get_handler()
+        if handler is not None:
+            self._last_wake_sent = time.monotonic()
+            handler.handle_command("wake")
+
+    def _run(self):
+        while not self._stop.wait(0.5):
+            now = time.monotonic()
+            if self.viewers > 0:
+                # watching counts as activity for the control loop too
+                after = self.after
+                if after is not None and now - self._last_wake_sent >= after / 4:
+                    self._wake_control()
+                continue
+            if self.paused or self.after is None or now - self._last < self.after:
+                continue
+            if self._recording() or self._tracking():
+                continue
+            with self._lock:
+                if self.viewers > 0 or self.paused:
+                    continue
+                self.camera.pause()
+                self.paused = True
+                self.pauses += 1
+            quiet = now - self._last
+            log.info("Camera paused after %.0fs without viewers or commands", quiet)
+
+    def stats(self) -> dict:
+        return {
+            "paused": self.paused,
+            "viewers": self.viewers,
+            "quiet_s": round(time.monotonic() - self._last, 1),
+            "pauses": self.pauses,
+            "resume_ms": self.resume_ms.summary(),
+        }
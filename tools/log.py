@@ -0,0 +1,131 @@
+"""
+Queue-based logging for the control process.
+
+Callers only pay for building a LogRecord and a queue put; formatting and
+I/O happen on a background QueueListener thread. Filtered-out levels cost a
+cached isEnabledFor() check, so hot paths should log at DEBUG with lazy
+%-style arguments:
+
+    log = get_logger("ws")
+    log.debug("recv %s", msg, extra={"sample": "ws.recv"})
+
+Records carrying a "sample" key are rate-limited to one in
+config.LOG_SAMPLE_EVERY per key. Besides the console, records are written as
+JSON lines to config.LOG_FILE with size-based rotation.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+import config
+
+ROOT = "balllauncher"
+
+_listener = None
+_handler = None
+
+# LogRecord attributes that are not user-supplied "extra" fields
+_STD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+class SampleFilter(logging.Filter):
+    """Pass 1 in every_n records per 'sample' key; unsampled records always pass."""
+
+    def __init__(self, every_n: int):
+        super().__init__()
+        self.every_n = max(1, int(every_n))
+        self._counts = {}
+
+    def filter(self, record):
+        key = getattr(record, "sample", None)
+        if key is None or self.every_n == 1:
+            return True
+        n = self._counts.get(key, 0)
+        self._counts[key] = n + 1
+        if n % self.every_n:
+            return False
+        record.sampled = self.every_n
+        return True
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Matches the historical '[HH:MM:SS] [TAG] message' console output."""
+
+    def format(self, record):
+        tag = record.name.rsplit(".", 1)[-1].upper()
+        ts = time.strftime("%H:%M:%S", time.localtime(record.created))
+        out = f"[{ts}] [{tag}] {record.getMessage()}"
+        if record.exc_info:
+            out += "\n" + self.formatException(record.exc_info)
+        return out
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus any extra fields."""
+
+    def format(self, record):
+        obj = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k, v in vars(record).items():
+            if k not in _STD_ATTRS:
+                obj[k] = v
+        if record.exc_info:
+            obj["exc"] = self.formatException(record.exc_info)
+        return json.dumps(obj, default=str)
+
+
+def setup_logging(level=None, log_file=None):
+    """Install the queue handler and start the writer thread (idempotent)."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    level = level or config.LOG_LEVEL
+    log_file = config.LOG_FILE if log_file is None else log_file
+
+    console = logging.StreamHandler()
+    console.setFormatter(ConsoleFormatter())
+    handlers = [console]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        sink = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=config.LOG_MAX_BYTES,
+            backupCount=config.LOG_BACKUPS,
+            encoding="utf-8",
+        )
+        sink.setFormatter(JsonLinesFormatter())
+        handlers.append(sink)
+
+    q = queue.SimpleQueue()
+    _handler = logging.handlers.QueueHandler(q)
+    _handler.addFilter(SampleFilter(config.LOG_SAMPLE_EVERY))
+    root = logging.getLogger(ROOT)
+    root.setLevel(level)
+    root.addHandler(_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(q, *handlers)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger(ROOT).removeHandler(_handler)
+    _listener.stop()
+    _listener = _handler = None
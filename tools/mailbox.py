@@ -0,0 +1,132 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class LatestSlot:
+    """
+    Single-value mailbox: producers overwrite, the consumer takes the newest
+    value at most once. Producers (the event loop, worker threads, the
+    tracker) serialise on a lock so sequence numbers are unique and published
+    in order; take() is a single reference read, atomic under the GIL, so the
+    control thread never waits.
+    """
+
+    def __init__(self):
+        self._item = None  # (seq, value)
+        self._seq = 0
+        self._taken = 0
+        self._lock = threading.Lock()
+
+    def put(self, value):
+        with self._lock:
+            self._seq += 1
+            self._item = (self._seq, value)
+
+    def take(self):
+        """Return (value, n_coalesced) if a new value arrived, else None."""
+        item = self._item
+        if item is None or item[0] == self._taken:
+            return None
+        seq, value = item
+        skipped = seq - self._taken - 1
+        self._taken = seq
+        return value, skipped
+
+
+class ControlMailbox:
+    """
+    Command channel from the web server to the control thread.
+
+    Setpoints (yaw/tilt) go into one LatestSlot per axis, so a burst of
+    joystick samples collapses to the newest value. Discrete commands (shoot,
+    flywheel, ...) go into a FIFO. The control loop calls drain() once per
+    tick, so subsystem state is only ever mutated from the control thread.
+
+    Several turrets share one mailbox (slot names are prefixed with the
+    turret id); batch() groups one thread's set()/post() calls into a single
+    queue entry so a fan-out command reaches every turret in the same tick.
+    """
+
+    def __init__(self, maxlen: int = 256):
+        self._slots = {}
+        self._queue = deque(maxlen=maxlen)
+        self.posted = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.dropped = 0
+        self._local = threading.local()  # per producer thread: open batch or None
+
+    def slot(self, name: str, apply):
+        """Register a latest-value slot; apply(value) runs on the control thread."""
+        self._slots[name] = (LatestSlot(), apply)
+
+    def set(self, name: str, value):
+        batch = getattr(self._local, "batch", None)
+        slot, apply = self._slots[name]
+        if batch is not None:
+            batch.append((_apply_unless_newer, (slot, slot._seq, apply, value), {}))
+            return
+        slot.put(value)
+        self.posted += 1
+
+    def post(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) to run on the control thread."""
+        batch = getattr(self._local, "batch", None)
+        if batch is not None:
+            batch.append((fn, args, kwargs))
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped += 1  # deque drops the oldest entry
+        self._queue.append((fn, args, kwargs))
+        self.posted += 1
+
+    @contextmanager
+    def batch(self):
+        """
+        Collect the calling thread's set()/post() calls and queue them as one
+        entry, applied in order within a single drain(). A batched setpoint is
+        skipped if its slot received a newer set() in the meantime. Nothing is
+        queued if the block raises.
+        """
+        self._local.batch = items = []
+        try:
+            yield
+        finally:
+            self._local.batch = None
+        if items:
+            self.post(_apply_all, items)
+
+    def drain(self):
+        """Apply the newest setpoints and every queued command (control thread)."""
+        for slot, apply in self._slots.values():
+            got = slot.take()
+            if got is not None:
+                value, skipped = got
+                apply(value)
+                self.coalesced += skipped
+                self.applied += 1
+        q = self._queue
+        while q:
+            fn, args, kwargs = q.popleft()
+            fn(*args, **kwargs)
+            self.applied += 1
+
+    def stats(self) -> dict:
+        return {
+            "posted": self.posted,
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "queued": len(self._queue),
+        }
+
+
+def _apply_unless_newer(slot, seq, apply, value):
+    if slot._seq == seq:
+        apply(value)
+
+
+def _apply_all(items):
+    for fn, args, kwargs in items:
+        fn(*args, **kwargs)
@@ -0,0 +1,119 @@
+import math
+
+
+class MotionProfile:
+    """
+    Online trapezoidal motion profile for one axis.
+
+    step(dt) advances the position toward the target without exceeding
+    max_vel or max_accel, braking early enough to stop on the target. The
+    target may change at any time; the profile re-plans from the current
+    position and velocity. Optionally max_jerk limits how fast the
+    acceleration itself can change (an S-curve-like smoothing of the ramps).
+    """
+
+    def __init__(
+        self,
+        max_vel: float,
+        max_accel: float,
+        max_jerk: float = None,
+        position: float = 0.0,
+        tolerance: float = 0.05,
+        max_dt: float = 0.1,
+    ):
+        self.max_vel = float(max_vel)
+        self.max_accel = float(max_accel)
+        self.max_jerk = max_jerk
+        self.tolerance = tolerance
+        self.max_dt = max_dt  # clamp long stalls so the axis never jumps
+        self.position = float(position)
+        self.velocity = 0.0
+        self.accel = 0.0
+        self.target = float(position)
+
+    def set_target(self, target: float):
+        self.target = float(target)
+
+    def reset(self, position: float):
+        self.position = self.target = float(position)
+        self.velocity = self.accel = 0.0
+
+    @property
+    def settled(self) -> bool:
+        return (
+            abs(self.target - self.position) <= self.tolerance
+            and abs(self.velocity) <= self.max_accel * 1e-3
+        )
+
+    def step(self, dt: float) -> float:
+        """Advance the profile by dt seconds and return the new position."""
+        if dt <= 0.0:
+            return self.position
+        dt = min(dt, self.max_dt)
+        err = self.target - self.position
+        if abs(err) <= self.tolerance and abs(self.velocity) <= self.max_accel * dt:
+            self.position = self.target
+            self.velocity = self.accel = 0.0
+            return self.position
+
+        # Fastest velocity from which we can still stop at the target
+        direction = 1.0 if err > 0 else -1.0
+        v_stop = math.sqrt(2.0 * self.max_accel * abs(err))
+        v_want = direction * min(self.max_vel, v_stop)
+        accel = (v_want - self.velocity) / dt
+        accel = max(-self.max_accel, min(self.max_accel, accel))
+        if self.max_jerk:
+            dj = self.max_jerk * dt
+            accel = max(self.accel - dj, min(self.accel + dj, accel))
+        self.accel = accel
+
+        v_new = self.velocity + accel * dt
+        self.position += 0.5 * (self.velocity + v_new) * dt
+        self.velocity = v_new
+
+        # Never overshoot the target
+        if (self.target - self.position) * direction < 0.0:
+            self.position = self.target
+            self.velocity = self.accel = 0.0
+        return self.position
+
+    def time_to_settle(self) -> float:
+        """Predicted seconds until the axis reaches the target and stops."""
+        err = self.target - self.position
+        dist = abs(err)
+        if dist <= self.tolerance and abs(self.velocity) <= self.max_accel * 1e-3:
+            return 0.0
+        a, vmax = self.max_accel, self.max_vel
+        # Velocity along the direction of travel (negative: moving away)
+        v0 = self.velocity if err >= 0 else -self.velocity
+        extra = 0.0
+        if v0 < 0.0:
+            # Stop first, then travel the (now longer) distance from rest
+            extra = -v0 / a
+            dist += v0 * v0 / (2.0 * a)
+            v0 = 0.0
+        elif v0 * v0 / (2.0 * a) > dist:
+            # Too fast to stop in time: overshoot, then come back
+            t_stop = v0 / a
+            back = v0 * v0 / (2.0 * a) - dist
+            return t_stop + MotionProfile._rest_to_rest(back, vmax, a)
+        # Accelerate from v0 to vpeak, cruise, brake to 0
+        vpeak = min(vmax, math.sqrt(a * dist + 0.5 * v0 * v0))
+        t_acc = (vpeak - v0) / a
+        t_dec = vpeak / a
+        d_ramp = (vpeak * vpeak - v0 * v0) / (2.0 * a) + vpeak * vpeak / (2.0 * a)
+        t_cruise = max(0.0, dist - d_ramp) / vmax if vpeak >= vmax else 0.0
+        return extra + t_acc + t_cruise + t_dec
+
+    @staticmethod
+    def _rest_to_rest(dist: float, vmax: float, a: float) -> float:
+        if dist <= 0.0:
+            return 0.0
+        if dist >= vmax * vmax / a:
+            return 2.0 * vmax / a + (dist - vmax * vmax / a) / vmax
+        return 2.0 * math.sqrt(dist / a)
+
+    @staticmethod
+    def move_time(dist: float, max_vel: float, max_accel: float) -> float:
+        """Rest-to-rest travel time over dist for the given limits."""
+        return MotionProfile._rest_to_rest(abs(dist), max_vel, max_accel)
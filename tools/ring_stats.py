@@ -0,0 +1,44 @@
+from array import array
+
+
+class RingStats:
+    """
+    Fixed-size ring of float samples with cheap min/mean/p99/max summaries.
+
+    The backing store is preallocated, so add() never allocates; percentiles
+    are only computed (by sorting the window) when summary() is called.
+    """
+
+    def __init__(self, size: int = 512):
+        self._buf = array("d", bytes(8 * max(1, size)))
+        self._idx = 0
+        self.count = 0  # total samples ever added
+
+    def add(self, x: float):
+        self._buf[self._idx] = x
+        self._idx = (self._idx + 1) % len(self._buf)
+        self.count += 1
+
+    def reset(self):
+        self._idx = 0
+        self.count = 0
+
+    def values(self):
+        n = min(self.count, len(self._buf))
+        if n < len(self._buf):
+            return self._buf[:n].tolist()
+        return (self._buf[self._idx :] + self._buf[: self._idx]).tolist()
+
+    def summary(self, scale: float = 1.0, digits: int = 3) -> dict:
+        vals = self.values()
+        if not vals:
+            return {"n": 0, "min": 0.0, "mean": 0.0, "p99": 0.0, "max": 0.0}
+        vals.sort()
+        p99 = vals[min(len(vals) - 1, int(round(0.99 * (len(vals) - 1))))]
+        return {
+            "n": self.count,
+            "min": round(vals[0] * scale, digits),
+            "mean": round(sum(vals) / len(vals) * scale, digits),
+            "p99": round(p99 * scale, digits),
+            "max": round(vals[-1] * scale, digits),
+        }
@@ -0,0 +1,137 @@
+import threading
+import config
+from tools import clock
+from tools.ring_stats import RingStats
+
+
+class _Task:
+    def __init__(self, name, fn, hz):
+        self.name = name
+        self.fn = fn
+        self.hz = float(hz)
+        self.period = 1.0 / max(1e-3, self.hz)
+        self.deadline = 0.0
+        self.runs = 0
+        self.overruns = 0  # ticks that finished after the next deadline
+        self.skipped = 0  # ticks dropped by the "skip" policy
+        self.jitter = RingStats()  # start time - deadline (s)
+        self.duration = RingStats()  # wall time of fn() (s)
+
+    def stats(self):
+        return {
+            "hz": self.hz,
+            "runs": self.runs,
+            "overruns": self.overruns,
+            "skipped": self.skipped,
+            "jitter_ms": self.jitter.summary(1000.0),
+            "duration_ms": self.duration.summary(1000.0),
+        }
+
+
+class LoopScheduler:
+    """
+    Deadline-based periodic scheduler.
+
+    Each task ticks on absolute deadlines (start + k * period), so the time
+    spent inside the tasks does not stretch the period and the rate does not
+    drift. When a task falls behind, the overrun policy decides what happens:
+
+      "catchup": run the missed ticks back-to-back, up to max_catchup periods
+                 behind, then resynchronise.
+      "skip":    drop the missed ticks and resume on the next future deadline.
+
+    throttle() caps every task's rate (idle mode); while throttled the loop
+    sleeps on a kick event, so kick() from any thread ends the sleep at once.
+    """
+
+    def __init__(self, overrun=None, max_catchup=None, on_error=None):
+        self.overrun = overrun or config.LOOP_OVERRUN_POLICY
+        self.max_catchup = (
+            config.LOOP_MAX_CATCHUP if max_catchup is None else max_catchup
+        )
+        self.on_error = on_error
+        self._tasks = []
+        self._throttle_hz = None
+        self._kick = threading.Event()
+
+    def add(self, name: str, fn, hz: float = None):
+        """Register fn() to be called at hz (defaults to MAIN_LOOP_HZ)."""
+        self._tasks.append(_Task(name, fn, hz or config.MAIN_LOOP_HZ))
+        return self
+
+    def throttle(self, hz: float = None):
+        """
+        Cap every task at hz; None restores the registered rates and makes
+        every task due now. Control thread only.
+        """
+        self._throttle_hz = hz
+        self._kick.clear()
+        now = clock.monotonic()
+        for task in self._tasks:
+            rate = task.hz if hz is None else min(task.hz, hz)
+            task.period = 1.0 / max(1e-3, rate)
+            if hz is None:
+                task.deadline = now
+
+    def kick(self):
+        """Any thread: end a throttled sleep early and run every task now."""
+        self._kick.set()
+
+    def run(self, stop_event):
+        """Run all tasks until stop_event is set."""
+        t0 = clock.monotonic()
+        for task in self._tasks:
+            task.deadline = t0
+        while not stop_event.is_set():
+            self.run_once(stop_event)
+
+    def run_once(self, stop_event=None):
+        """Sleep until the earliest deadline, then run every task that is due."""
+        if not self._tasks:
+            return
+        due = min(t.deadline for t in self._tasks)
+        wait = due - clock.monotonic()
+        if wait > 0 and self._throttle_hz is not None:
+            # stop_event is still seen within one throttled period
+            if clock.wait(self._kick, wait):
+                self._kick.clear()
+                now = clock.monotonic()
+                for task in self._tasks:
+                    task.deadline = min(task.deadline, now)
+            if stop_event is not None and stop_event.is_set():
+                return
+        elif wait > 0:
+            if stop_event is not None:
+                if clock.wait(stop_event, wait):
+                    return
+            else:
+                clock.sleep(wait)
+        for task in self._tasks:
+            if clock.monotonic() >= task.deadline:
+                self._run_task(task)
+
+    def _run_task(self, task):
+        start = clock.monotonic()
+        task.jitter.add(start - task.deadline)
+        try:
+            task.fn()
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(task.name, e)
+        end = clock.monotonic()
+        task.duration.add(end - start)
+        task.runs += 1
+        task.deadline += task.period
+        if end <= task.deadline:
+            return
+        task.overruns += 1
+        behind = int((end - task.deadline) // task.period)
+        if self.overrun == "catchup" and behind < self.max_catchup:
+            return  # deadline already passed: the next run_once runs it immediately
+        # skip (or too far behind to catch up): jump to the next future deadline
+        task.skipped += behind + 1
+        task.deadline += (behind + 1) * task.period
+
+    def stats(self) -> dict:
+        return {t.name: t.stats() for t in self._tasks}
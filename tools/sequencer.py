@@ -0,0 +1,267 @@
+"""
+Motion sequences: programs uploaded once, played back on the control tick.
+
+A program is a list of steps, uploaded as one JSON command:
+
+  {"cmd": "program", "name": "sweep", "repeat": 2, "steps": [
+      {"yaw": -40, "tilt": 2, "move": 0.5},       move there over 0.5 s
+      {"flywheel": 0.6},                          start spinning up
+      {"dwell": 1.0},                             hold
+      {"shoot": 0.6, "count": 3, "interval": 0.4},
+      {"yaw": 40, "move": 3.0, "dwell": 0.2}]}    sweep, then hold 0.2 s
+
+compile_program() turns it into dense NumPy arrays with one yaw and one tilt
+setpoint per control tick (piecewise linear between waypoints, evaluated for
+the whole timeline at once) plus a short, tick-sorted table of shooter events.
+Sequencer.tick() runs as a scheduler task and only indexes those arrays:
+the tick index comes from the time since play started, so a late tick never
+stretches the program, and events whose tick has passed fire on the next
+tick instead of being lost. Playback can be paused, resumed and aborted and
+reports its progress.
+"""
+
+import numpy as np
+import config
+from tools import clock
+from tools.log import get_logger
+
+log = get_logger("seq")
+
+SHOOT, FLYWHEEL = 0, 1
+_EVENT = np.dtype(
+    [("tick", "<i8"), ("kind", "i1"), ("power", "<f8"), ("count", "<i8"), ("interval", "<f8")]
+)
+_STEP_KEYS = {"yaw", "tilt", "move", "dwell", "shoot", "count", "interval", "flywheel"}
+
+
+class Program:
+    """A compiled program: per-tick setpoints and a tick-sorted event table."""
+
+    def __init__(self, name, hz, yaw, tilt, events, info):
+        self.name = name
+        self.hz = hz
+        self.yaw = yaw
+        self.tilt = tilt
+        self.events = events
+        self.info = info
+
+    @property
+    def ticks(self) -> int:
+        return len(self.yaw)
+
+
+def _piecewise(grid, kt, kv):
+    """Linear between knots; at a repeated knot time the last knot wins (a jump)."""
+    idx = np.searchsorted(kt, grid, side="right") - 1
+    nxt = np.minimum(idx + 1, len(kt) - 1)
+    span = kt[nxt] - kt[idx]
+    f = np.divide(grid - kt[idx], span, out=np.zeros_like(grid), where=span > 0)
+    return kv[idx] + f * (kv[nxt] - kv[idx])
+
+
+def compile_program(
+    steps, name="program", hz=None, repeat=1, start=(0.0, 0.0), cfg=None
+) -> Program:
+    """
+    Compile steps into a Program. start is the (yaw, tilt) the first move
+    begins from (the turret's setpoints at upload time); limits come from
+    cfg (a turret's settings, default config). Raises ValueError for
+    malformed or over-long programs.
+    """
+    cfg = cfg or config
+    hz = float(hz or config.MAIN_LOOP_HZ)
+    if not steps:
+        raise ValueError("program has no steps")
+    # knots of the piecewise-linear setpoint timeline
+    t, yaw, tilt = 0.0, float(start[0]), float(start[1])
+    knots = [(0.0, yaw, tilt)]
+    events = []  # (time, kind, power, count, interval)
+    for n, step in enumerate(steps):
+        if not isinstance(step, dict):
+            raise ValueError(f"step {n}: expected an object")
+        unknown = set(step) - _STEP_KEYS
+        if unknown:
+            raise ValueError(f"step {n}: unknown keys {sorted(unknown)}")
+        if "yaw" in step or "tilt" in step:
+            move = float(step.get("move", 0.0))
+            if move < 0:
+                raise ValueError(f"step {n}: negative move time")
+            yaw = float(step.get("yaw", yaw))
+            tilt = float(step.get("tilt", tilt))
+            t += move
+            knots.append((t, yaw, tilt))
+        if "flywheel" in step:
+            events.append((t, FLYWHEEL, float(step["flywheel"]), 0, -1.0))
+        if "shoot" in step:
+            count = int(step.get("count", 1))
+            if count < 1:
+                raise ValueError(f"step {n}: count must be >= 1")
+            interval = float(step.get("interval", -1.0))
+            events.append((t, SHOOT, float(step["shoot"]), count, interval))
+        dwell = float(step.get("dwell", 0.0))
+        if dwell < 0:
+            raise ValueError(f"step {n}: negative dwell")
+        if dwell:
+            t += dwell
+            knots.append((t, yaw, tilt))
+    repeat = max(1, int(repeat))
+    if t * repeat > config.SEQUENCE_MAX_SEC:
+        raise ValueError(f"program runs {t * repeat:.1f}s > SEQUENCE_MAX_SEC")
+
+    # one pass: ticks 0..t*hz inclusive, so the last waypoint gets its own tick
+    k = np.array(knots, dtype=np.float64)
+    period = int(round(t * hz)) + 1
+    grid = np.arange(period) / hz
+    y = _piecewise(grid, k[:, 0], k[:, 1])
+    p = _piecewise(grid, k[:, 0], k[:, 2])
+    lo_y, hi_y = cfg.YAW_MIN_DEG, cfg.YAW_MAX_DEG
+    lo_p, hi_p = cfg.PITCH_MIN_DEG, cfg.PITCH_MAX_DEG
+    clamped = int(((y < lo_y) | (y > hi_y) | (p < lo_p) | (p > hi_p)).sum())
+    y, p = np.clip(y, lo_y, hi_y), np.clip(p, lo_p, hi_p)
+    # between passes, ramp back to the first setpoint at the slew limits
+    # rather than jumping there in one tick
+    back = 0
+    if repeat > 1:
+        dy, dp = y[0] - y[-1], p[0] - p[-1]
+        secs = max(abs(dy) / cfg.YAW_MAX_VEL_DPS, abs(dp) / cfg.PITCH_MAX_VEL_DPS)
+        back = max(0, int(np.ceil(secs * hz - 1e-9)) - 1)
+        total = t * repeat + (repeat - 1) * back / hz
+        if total > config.SEQUENCE_MAX_SEC:
+            raise ValueError(f"program runs {total:.1f}s > SEQUENCE_MAX_SEC")
+    if back:
+        f = np.arange(1, back + 1) / (back + 1)
+        y = np.concatenate((y, y[-1] + f * dy))
+        p = np.concatenate((p, p[-1] + f * dp))
+    stride = len(y)  # one pass plus its return ramp
+    y = np.tile(y, repeat)[: stride * repeat - back]
+    p = np.tile(p, repeat)[: stride * repeat - back]
+
+    one = np.zeros(len(events), dtype=_EVENT)
+    if events:
+        ev = np.array(events, dtype=np.float64)
+        one["tick"] = np.minimum(np.round(ev[:, 0] * hz), period - 1)
+        one["kind"], one["power"] = ev[:, 1], ev[:, 2]
+        one["count"], one["interval"] = ev[:, 3], ev[:, 4]
+    ev = np.tile(one, repeat)
+    ev["tick"] += np.repeat(np.arange(repeat) * stride, len(one))
+    ev = ev[np.argsort(ev["tick"], kind="stable")]
+
+    yaw_rate = float((np.abs(np.diff(y)) * hz).max(initial=0.0))
+    tilt_rate = float((np.abs(np.diff(p)) * hz).max(initial=0.0))
+    info = {
+        "ticks": len(y),
+        "duration_s": round(len(y) / hz, 3),
+        "shots": int(ev["count"][ev["kind"] == SHOOT].sum()),
+        "clamped_ticks": clamped,
+        "return_ticks": back,
+        # faster than the motion profiles allow: the turret will lag the program
+        "yaw_rate_max_dps": round(yaw_rate, 1),
+        "tilt_rate_max_dps": round(tilt_rate, 1),
+        "within_slew_limits": yaw_rate <= cfg.YAW_MAX_VEL_DPS + 1e-6
+        and tilt_rate <= cfg.PITCH_MAX_VEL_DPS + 1e-6,
+    }
+    return Program(name, hz, y, p, ev, info)
+
+
+class Sequencer:
+    """Plays compiled programs; every method except load() runs on the control thread."""
+
+    def __init__(self, yaw, tilt, shooter):
+        self.yaw = yaw
+        self.tilt = tilt
+        self.shooter = shooter
+        self.programs = {}
+        self.state = "idle"  # idle | playing | paused | done | aborted
+        self._prog = None
+        self._t0 = 0.0
+        self._paused_at = 0.0
+        self._ev = 0  # next event
+        self._last = -1  # last tick applied
+        self.late_ticks = 0  # ticks skipped because the loop ran late
+        self.events_fired = 0
+
+    @property
+    def position(self) -> int:
+        """Ticks of the current program applied so far."""
+        return self._last + 1
+
+    def load(self, program: Program):
+        """Store a compiled program (replaces one with the same name)."""
+        full = len(self.programs) >= config.SEQUENCE_MAX_PROGRAMS
+        if program.name not in self.programs and full:
+            raise ValueError("too many programs, see SEQUENCE_MAX_PROGRAMS")
+        self.programs[program.name] = program
+
+    def play(self, name):
+        prog = self.programs.get(name)
+        if prog is None:
+            log.warning("play: no program '%s'", name)
+            return
+        self._prog = prog
+        self._t0 = clock.monotonic()
+        self._ev, self._last = 0, -1
+        self.late_ticks = self.events_fired = 0
+        self.state = "playing"
+        log.info("Playing '%s' (%d ticks, %.1fs)", name, prog.ticks, prog.ticks / prog.hz)
+
+    def pause(self):
+        if self.state == "playing":
+            self._paused_at = clock.monotonic()
+            self.state = "paused"
+
+    def resume(self):
+        if self.state == "paused":
+            self._t0 += clock.monotonic() - self._paused_at
+            self.state = "playing"
+
+    def abort(self):
+        """Stop playback and drop queued shots; the turret holds its last setpoints."""
+        if self.state in ("playing", "paused"):
+            self.state = "aborted"
+            self.shooter.cancel()
+            log.info("Aborted '%s' at tick %d", self._prog.name, self._last)
+
+    def tick(self):
+        """Scheduler task: apply this tick's setpoints and any due events."""
+        if self.state != "playing":
+            return
+        prog = self._prog
+        # ticks land about one period apart from play(): round, so jitter either
+        # side of a period boundary neither repeats nor skips a setpoint
+        i = min(int(round((clock.monotonic() - self._t0) * prog.hz)), prog.ticks - 1)
+        if i <= self._last:
+            return
+        if i > self._last + 1:
+            self.late_ticks += i - self._last - 1
+        self._last = i
+        self.yaw.set_target_angle(float(prog.yaw[i]))
+        self.tilt.set_target_angle(float(prog.tilt[i]))
+        events = prog.events
+        while self._ev < len(events) and events["tick"][self._ev] <= i:
+            e = events[self._ev]
+            if e["kind"] == SHOOT:
+                self.shooter.shoot(
+                    float(e["power"]),
+                    count=int(e["count"]),
+                    interval=float(e["interval"]) if e["interval"] >= 0 else None,
+                )
+            else:
+                self.shooter.set_flywheel_power(float(e["power"]))
+            self._ev += 1
+            self.events_fired += 1
+        if i == prog.ticks - 1:
+            self.state = "done"
+            log.info("Finished '%s' (%d late ticks)", prog.name, self.late_ticks)
+
+    def stats(self) -> dict:
+        prog = self._prog
+        return {
+            "state": self.state,
+            "program": prog.name if prog else None,
+            "tick": self.position,
+            "ticks": prog.ticks if prog else 0,
+            "progress": round(self.position / prog.ticks, 3) if prog else 0.0,
+            "events_fired": self.events_fired,
+            "late_ticks": self.late_ticks,
+            "programs": sorted(self.programs),
+        }
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Hardware-free simulation of the turret in virtual time.
+
+Runs main.control_loop on MockFactory pins with a VirtualClock, so a 4 s
+shot cycle takes milliseconds and no Pi is needed. Simple plant models stand
+in for the mechanics: servo horns slew toward the commanded pulse at a
+finite rate, and the flywheels follow the motor duty with first-order
+inertia and lose speed on every shot. Every trace row is derived from
+virtual time only, so runs are reproducible.
+
+Commands are injected through CommandHandler (and so the mailbox), exactly
+like WebSocket commands, at given virtual times.
+
+Run:
+  python tools/sim.py --duration 10 --cmd "0:burst 0.8 3" --trace trace.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from tools import clock
+from tools.clock import VirtualClock
+
+
+class ServoPlant:
+    """Physical servo horn following the commanded angle at a finite slew rate."""
+
+    def __init__(self, servo, max_dps: float):
+        self.servo = servo
+        self.max_dps = max_dps
+        self.angle = servo.angle or 0.0
+
+    def step(self, dt: float):
+        cmd = self.servo.angle
+        if cmd is None:  # detached: the horn stays where it is
+            return
+        step = self.max_dps * dt
+        self.angle += max(-step, min(step, cmd - self.angle))
+
+
+class FlywheelPlant:
+    """Flywheel speed (0..1) with first-order inertia and a speed drop per shot."""
+
+    def __init__(self, motor, tau: float, shot_drop: float):
+        self.motor = motor
+        self.tau = tau
+        self.shot_drop = shot_drop
+        self.speed = 0.0
+
+    def step(self, dt: float):
+        duty = self.motor.value or 0.0
+        self.speed += (duty - self.speed) * (1.0 - math.exp(-dt / self.tau))
+
+    def shot(self):
+        self.speed *= 1.0 - self.shot_drop
+
+
+class Simulation:
+    """
+    One simulated turret: subsystems, mailbox, command handler and scheduler,
+    all driven by a VirtualClock.
+    """
+
+    def __init__(self, script=(), trace_hz: float = None):
+        config.PIN_FACTORY = "MockFactory"
+        self.clock = VirtualClock()
+        clock.set_clock(self.clock)
+
+        from hardware.pin_factory import reset_pin_factory
+        from hardware.shooter import Shooter
+        from hardware.tilt_servo import TiltServo
+        from hardware.yaw_servo import AngularServoYaw
+        from tools.command_handler import CommandHandler
+        from tools.mailbox import ControlMailbox
+        from tools.scheduler import LoopScheduler
+
+        reset_pin_factory()  # fresh mock pins per simulated turret
+        self.yaw = AngularServoYaw()
+        self.tilt = TiltServo()
+        self.shooter = Shooter()
+        self.scheduler = LoopScheduler()
+        self.mailbox = ControlMailbox()
+        self.handler = CommandHandler(
+            self.yaw, self.tilt, self.shooter, self.scheduler, self.mailbox
+        )
+        self.script = sorted(script, key=lambda e: e[0])
+        self.trace_hz = trace_hz or config.SIM_TRACE_HZ
+        self.trace = []
+        self.replies = []
+        self.plants = None
+
+    def _build_plants(self):
+        sh = self.shooter
+        self.plants = {
+            "yaw": ServoPlant(self.yaw.servo, config.SIM_SERVO_MAX_DPS),
+            "tilt": ServoPlant(self.tilt._servo, config.SIM_SERVO_MAX_DPS),
+            "pusher": ServoPlant(sh._pusher, config.SIM_SERVO_MAX_DPS),
+            "flywheel_a": FlywheelPlant(
+                sh._motor_a, config.SIM_FLYWHEEL_TAU_SEC, config.SIM_SHOT_SPEED_DROP
+            ),
+            "flywheel_b": FlywheelPlant(
+                sh._motor_b, config.SIM_FLYWHEEL_TAU_SEC, config.SIM_SHOT_SPEED_DROP
+            ),
+        }
+        self._shots_seen = 0
+
+    def _physics(self):
+        if self.plants is None:
+            self._build_plants()
+            self._last_phys = self.clock.now
+        dt = self.clock.now - self._last_phys
+        self._last_phys = self.clock.now
+        for plant in self.plants.values():
+            plant.step(dt)
+        if self.shooter.shots_fired > self._shots_seen:
+            self._shots_seen = self.shooter.shots_fired
+            self.plants["flywheel_a"].shot()
+            self.plants["flywheel_b"].shot()
+
+    def _inject(self):
+        t = self.clock.now - self._t0
+        while self._next < len(self.script) and self.script[self._next][0] <= t:
+            cmd = self.script[self._next][1]
+            self.replies.append((round(t, 4), cmd, self.handler.handle_command(cmd)))
+            self._next += 1
+        if t >= self._duration:
+            self._stop.set()
+
+    def _record(self):
+        if self.plants is None:
+            return
+        sh, p = self.shooter, self.plants
+        self.trace.append(
+            {
+                "t": round(self.clock.now - self._t0, 4),
+                "yaw.target": round(self.yaw._target_angle, 4),
+                "yaw.est": round(self.yaw.current_angle, 4),
+                "yaw.actual": round(p["yaw"].angle, 4),
+                "tilt.target": round(self.tilt.target_angle, 4),
+                "tilt.est": round(self.tilt.current_angle, 4),
+                "tilt.actual": round(p["tilt"].angle, 4),
+                "pusher.est": round(sh._pusher_profile.position, 4),
+                "pusher.actual": round(p["pusher"].angle, 4),
+                "shooter.state": sh.state.name,
+                "flywheel.duty": round(sh._motor_a.value or 0.0, 4),
+                "flywheel.est": round(sh.flywheel_speed, 4),
+                "flywheel.actual": round(p["flywheel_a"].speed, 4),
+                "shots": sh.shots_fired,
+            }
+        )
+
+    def run(self, duration: float):
+        """Run duration virtual seconds; returns the trace rows."""
+        import main
+
+        self._duration = duration
+        self._t0 = self.clock.now
+        self._next = 0
+        self._stop = threading.Event()
+        self.scheduler.add("sim.inject", self._inject, config.MAIN_LOOP_HZ)
+        self.scheduler.add("sim.physics", self._physics, config.SIM_PHYSICS_HZ)
+        self.scheduler.add("sim.trace", self._record, self.trace_hz)
+        main.control_loop(
+            self.yaw,
+            self.tilt,
+            self.shooter,
+            self._stop,
+            self.scheduler,
+            self.mailbox,
+        )
+        return self.trace
+
+    def summary(self) -> dict:
+        shots = self.shooter.shot_stats(window=float("inf"))
+        return {
+            "virtual_s": round(self.clock.now - self._t0, 3),
+            "shots_fired": shots["fired"],
+            "shots_per_min": shots["shots_per_min"],
+            "trace_rows": len(self.trace),
+        }
+
+    def write_trace(self, path: str):
+        if not self.trace:
+            return
+        with open(path, "w", newline="") as f:
+            w = csv.DictWriter(f, fieldnames=list(self.trace[0]))
+            w.writeheader()
+            w.writerows(self.trace)
+
+
+def _parse_cmd(spec: str):
+    t, _, cmd = spec.partition(":")
+    return float(t), cmd.strip()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless fast-forward turret simulation")
+    ap.add_argument("--duration", type=float, default=10.0, help="virtual seconds")
+    ap.add_argument(
+        "--cmd",
+        action="append",
+        default=[],
+        metavar="T:COMMAND",
+        help='command at virtual time T, e.g. "0.5:burst 0.8 3" (repeatable)',
+    )
+    ap.add_argument("--trace", help="write the per-tick trace to this CSV file")
+    args = ap.parse_args(argv)
+
+    sim = Simulation([_parse_cmd(c) for c in args.cmd])
+    t0 = time.perf_counter()
+    sim.run(args.duration)
+    wall = time.perf_counter() - t0
+    out = sim.summary()
+    out["wall_s"] = round(wall, 3)
+    out["speedup"] = round(out["virtual_s"] / wall, 1) if wall > 0 else None
+    if args.trace:
+        sim.write_trace(args.trace)
+        out["trace"] = args.trace
+    print(json.dumps(out))
+    return sim
+
+
+if __name__ == "__main__":
+    main()
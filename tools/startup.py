@@ -0,0 +1,72 @@
+"""
+Cold-boot timing for the control process.
+
+main.py imports this module first and wraps its import and init steps in
+phase(); milestones such as "control loop running" and "web server up" are
+recorded with ready(). report() returns everything in milliseconds, so
+boot-to-ready time can be tracked release to release (it is also served
+under /stats).
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+_T0 = time.perf_counter()
+_phases = []  # (name, kind, ms)
+_ready = {}  # milestone -> ms since _T0
+
+
+@contextmanager
+def phase(name: str, kind: str = "init"):
+    """Time one startup step; kind is "import", "init" or "factory" (nested in init)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, kind, (time.perf_counter() - t0) * 1000.0))
+
+
+def ready(milestone: str):
+    """Record the first time milestone is reached."""
+    _ready.setdefault(milestone, (time.perf_counter() - _T0) * 1000.0)
+
+
+def _process_age_ms():
+    """Time since the interpreter process was created (Linux only), else None."""
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+        start_ticks = int(fields[19])  # field 22: starttime, in clock ticks after boot
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        return round((uptime - start_ticks / os.sysconf("SC_CLK_TCK")) * 1000.0, 1)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def report() -> dict:
+    # before_main_ms covers interpreter start-up up to the import of this module
+    age = _process_age_ms()
+    since_t0 = (time.perf_counter() - _T0) * 1000.0
+    return {
+        "before_main_ms": round(max(0.0, age - since_t0), 1) if age is not None else None,
+        "phases": [
+            {"name": n, "kind": k, "ms": round(ms, 1)} for n, k, ms in _phases
+        ],
+        "import_ms": round(sum(ms for _, k, ms in _phases if k == "import"), 1),
+        "init_ms": round(sum(ms for _, k, ms in _phases if k == "init"), 1),
+        "ready_ms": {m: round(ms, 1) for m, ms in _ready.items()},
+    }
+
+
+def log_report(log):
+    r = report()
+    slowest = sorted(r["phases"], key=lambda p: p["ms"], reverse=True)[:5]
+    log.info(
+        "Startup: imports %.0f ms, init %.0f ms, ready %s; slowest: %s",
+        r["import_ms"],
+        r["init_ms"],
+        ", ".join(f"{m} @ {ms:.0f} ms" for m, ms in r["ready_ms"].items()),
+        ", ".join(f"{p['name']} {p['ms']:.0f} ms" for p in slowest),
+    )
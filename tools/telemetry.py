@@ -0,0 +1,113 @@
+import asyncio
+import time
+import config
+from tools.log import get_logger
+
+log = get_logger("telemetry")
+
+
+class TelemetrySubscriber:
+    """
+    One client's view of the telemetry stream.
+
+    Holds at most one pending snapshot: when the client falls behind, the
+    stale snapshot is replaced by the newest one. Deltas are computed
+    against what this client was actually sent, so dropping snapshots never
+    corrupts its view.
+    """
+
+    def __init__(self, keyframe_sec: float):
+        self._queue = asyncio.Queue(maxsize=1)
+        self._sent = None
+        self._last_key = 0.0
+        self.keyframe_sec = keyframe_sec
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, item):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    async def next_message(self) -> dict:
+        """Wait for the next snapshot and return it delta-encoded for this client."""
+        seq, ts, snap = await self._queue.get()
+        now = time.monotonic()
+        if self._sent is None or now - self._last_key >= self.keyframe_sec:
+            self._last_key = now
+            msg = {"t": "telemetry", "seq": seq, "ts": ts, "full": True, "d": snap}
+        else:
+            sent = self._sent
+            delta = {k: v for k, v in snap.items() if sent.get(k) != v}
+            msg = {"t": "telemetry", "seq": seq, "ts": ts, "full": False, "d": delta}
+        self._sent = snap
+        self.delivered += 1
+        return msg
+
+
+class TelemetryPublisher:
+    """
+    Single producer of telemetry snapshots for every subscribed client.
+
+    sample() is called once per period (config.TELEMETRY_HZ) while at least
+    one client is subscribed, and must return a flat dict of JSON-able values.
+    It runs in a worker thread, so a slow source (the control-process socket)
+    never holds up the event loop.
+    """
+
+    def __init__(self, sample, hz: float = None, keyframe_sec: float = None):
+        self.sample = sample
+        self.hz = hz or config.TELEMETRY_HZ
+        self.keyframe_sec = keyframe_sec or config.TELEMETRY_KEYFRAME_SEC
+        self._subs = set()
+        self._task = None
+        self.seq = 0
+
+    def subscribe(self) -> TelemetrySubscriber:
+        sub = TelemetrySubscriber(self.keyframe_sec)
+        self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: TelemetrySubscriber):
+        self._subs.discard(sub)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        period = 1.0 / max(0.1, self.hz)
+        deadline = time.monotonic()
+        while True:
+            deadline = max(deadline + period, time.monotonic())
+            if self._subs:
+                try:
+                    snap = await loop.run_in_executor(None, self.sample)
+                except Exception as e:
+                    log.warning("sample failed: %s", e)
+                else:
+                    self.seq += 1
+                    item = (self.seq, round(time.time(), 3), snap)
+                    for sub in list(self._subs):
+                        sub.offer(item)
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> dict:
+        return {
+            "hz": self.hz,
+            "seq": self.seq,
+            "subscribers": [
+                {"delivered": s.delivered, "dropped": s.dropped} for s in self._subs
+            ],
+        }
@@ -0,0 +1,222 @@
+"""
+Vision tracking: steer yaw/tilt toward a target seen by the camera.
+
+A Tracker thread takes the newest frame from the FrameBroadcaster at
+reduced resolution (an MJPG frame is decoded straight to 1/N size), finds
+the target with a color-blob or ArUco detector, converts its offset from
+the image centre into yaw/tilt angle errors and posts corrected setpoints
+into a "track" mailbox slot. The control thread applies them on its next
+tick; a slow detector only ever delays its own corrections, never capture
+or the control loop. Corrections are rate limited (TRACK_MAX_HZ), dead
+banded and step limited.
+
+Stats: detection fps, detector time, and capture-to-setpoint latency
+(camera timestamp to the moment the control thread applied the setpoint).
+"""
+
+import threading
+import time
+import numpy as np
+import config
+from tools.log import get_logger
+from tools.ring_stats import RingStats
+
+log = get_logger("track")
+
+
+class ColorBlobDetector:
+    """Centroid of the pixels inside an HSV range, from row/column projections."""
+
+    def __init__(self, low=None, high=None, min_area=None):
+        import cv2
+
+        self._cv2 = cv2
+        self.low = np.array(low or config.TRACK_HSV_LOW, dtype=np.uint8)
+        self.high = np.array(high or config.TRACK_HSV_HIGH, dtype=np.uint8)
+        self.min_area = config.TRACK_MIN_AREA if min_area is None else min_area
+
+    def detect(self, bgr):
+        """Return (cx, cy, area) in pixels of bgr, or None."""
+        cv2 = self._cv2
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+        if self.low[0] <= self.high[0]:
+            mask = cv2.inRange(hsv, self.low, self.high)
+        else:  # hue range wraps through 0 (reds)
+            hi, lo = self.high.copy(), self.low.copy()
+            hi[0], lo[0] = 179, 0
+            mask = cv2.inRange(hsv, self.low, hi) | cv2.inRange(hsv, lo, self.high)
+        cols = mask.sum(axis=0, dtype=np.int64)
+        area = int(cols.sum()) // 255
+        if area < self.min_area:
+            return None
+        rows = mask.sum(axis=1, dtype=np.int64)
+        total = float(cols.sum())
+        cx = float(cols @ np.arange(cols.size)) / total
+        cy = float(rows @ np.arange(rows.size)) / total
+        return cx, cy, area
+
+
+class ArucoDetector:
+    """Centre of an ArUco marker (a given id, or the largest one)."""
+
+    def __init__(self, dictionary=None, marker_id=None):
+        import cv2
+
+        if not hasattr(cv2, "aruco"):
+            raise RuntimeError("ArUco tracking needs an OpenCV build with cv2.aruco")
+        self._cv2 = cv2
+        d = cv2.aruco.getPredefinedDictionary(
+            getattr(cv2.aruco, dictionary or config.TRACK_ARUCO_DICT)
+        )
+        self._detector = cv2.aruco.ArucoDetector(d, cv2.aruco.DetectorParameters())
+        self.marker_id = config.TRACK_ARUCO_ID if marker_id is None else marker_id
+
+    def detect(self, bgr):
+        gray = self._cv2.cvtColor(bgr, self._cv2.COLOR_BGR2GRAY)
+        corners, ids, _ = self._detector.detectMarkers(gray)
+        if ids is None or not len(ids):
+            return None
+        quads = np.asarray(corners, dtype=np.float64).reshape(-1, 4, 2)
+        ids = ids.reshape(-1)
+        x, y = quads[..., 0], quads[..., 1]
+        # shoelace area of every marker at once
+        areas = 0.5 * np.abs(
+            (x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y).sum(axis=1)
+        )
+        if self.marker_id is not None:
+            areas = np.where(ids == self.marker_id, areas, -1.0)
+        i = int(np.argmax(areas))
+        if areas[i] < 0:
+            return None
+        cx, cy = quads[i].mean(axis=0)
+        return float(cx), float(cy), float(areas[i])
+
+
+DETECTORS = {"color": ColorBlobDetector, "aruco": ArucoDetector}
+
+
+class Tracker:
+    def __init__(self, camera, yaw, tilt, mailbox=None, detector=None):
+        self.camera = camera
+        self.yaw = yaw
+        self.tilt = tilt
+        self.mailbox = mailbox
+        self.detector = detector
+        if mailbox is not None:
+            mailbox.slot("track", self._apply)
+        self._thread = None
+        self._stop = threading.Event()
+        self._last_post = 0.0
+        self._seq = 0
+        # counters
+        self.frames = 0
+        self.detections = 0
+        self.corrections = 0
+        self.rate_limited = 0
+        self.fps = 0.0
+        self.detect_ms = RingStats(256)
+        self.latency_ms = RingStats(256)  # capture -> setpoint applied
+        self.error_deg = (0.0, 0.0)
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        if self.detector is None:
+            self.detector = DETECTORS[config.TRACK_DETECTOR]()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tracker", daemon=True)
+        self._thread.start()
+        log.info("Tracking started (%s)", type(self.detector).__name__)
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None
+        log.info("Tracking stopped")
+
+    def _run(self):
+        reduce = config.TRACK_REDUCE
+        last = None
+        while not self._stop.is_set():
+            got = self.camera.next_frame(self._seq, 0.5, reduce)
+            if got is None:
+                continue
+            self._seq, stamp, frame = got
+            t0 = time.monotonic()
+            try:
+                hit = self.detector.detect(frame)
+            except Exception as e:
+                log.warning("detector error: %s", e)
+                continue
+            t1 = time.monotonic()
+            self.detect_ms.add((t1 - t0) * 1000.0)
+            self.frames += 1
+            if last is not None:
+                inst = 1.0 / max(1e-6, t1 - last)
+                self.fps = inst if not self.fps else 0.9 * self.fps + 0.1 * inst
+            last = t1
+            if hit is not None:
+                self.detections += 1
+                self._correct(hit, frame.shape, stamp, t1)
+
+    def angle_error(self, cx, cy, shape):
+        """Pinhole-model angle (deg) of pixel (cx, cy) from the image centre."""
+        h, w = shape[:2]
+        size = np.array((w, h), dtype=np.float64)
+        fov = np.radians((config.TRACK_HFOV_DEG, config.TRACK_VFOV_DEG))
+        focal = (size / 2.0) / np.tan(fov / 2.0)
+        err = np.degrees(np.arctan((np.array((cx, cy)) - size / 2.0) / focal))
+        return err * (config.TRACK_YAW_SIGN, config.TRACK_TILT_SIGN)
+
+    def _correct(self, hit, shape, stamp, now):
+        err = self.angle_error(hit[0], hit[1], shape)
+        self.error_deg = (round(float(err[0]), 2), round(float(err[1]), 2))
+        if np.all(np.abs(err) < config.TRACK_DEADBAND_DEG):
+            return
+        if now - self._last_post < 1.0 / config.TRACK_MAX_HZ:
+            self.rate_limited += 1
+            return
+        step = np.clip(
+            err * config.TRACK_GAIN, -config.TRACK_MAX_STEP_DEG, config.TRACK_MAX_STEP_DEG
+        )
+        ycfg, tcfg = self.yaw.cfg, self.tilt.cfg
+        yaw = min(
+            ycfg.YAW_MAX_DEG, max(ycfg.YAW_MIN_DEG, self.yaw.current_angle + step[0])
+        )
+        tilt = min(
+            tcfg.PITCH_MAX_DEG,
+            max(tcfg.PITCH_MIN_DEG, self.tilt.current_angle + step[1]),
+        )
+        self._last_post = now
+        self.corrections += 1
+        if self.mailbox is not None:
+            self.mailbox.set("track", (yaw, tilt, stamp))
+        else:
+            self._apply((yaw, tilt, stamp))
+
+    def _apply(self, value):
+        """Control thread: apply a correction and record its latency."""
+        yaw, tilt, stamp = value
+        self.yaw.set_target_angle(yaw)
+        self.tilt.set_target_angle(tilt)
+        self.latency_ms.add((time.monotonic() - stamp) * 1000.0)
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "detector": type(self.detector).__name__ if self.detector else None,
+            "frames": self.frames,
+            "detections": self.detections,
+            "corrections": self.corrections,
+            "rate_limited": self.rate_limited,
+            "fps": round(self.fps, 2),
+            "error_deg": self.error_deg,
+            "detect_ms": self.detect_ms.summary(),
+            "latency_ms": self.latency_ms.summary(),
+        }
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+On-device video recorder: the camera's JPEG frames to disk, never re-encoded.
+
+FrameBroadcaster hands every published frame to write() (capture thread),
+which only appends the already-encoded bytes to a queue: no I/O, no copy.
+A writer thread wakes every VIDEO_RECORD_FLUSH_SEC and writes the queued
+frames with one writev() per batch, followed by their index rows.
+
+Recordings are time-segmented (VIDEO_RECORD_SEGMENT_SEC) in
+VIDEO_RECORD_DIR:
+
+  video-<start>.mjpg   the JPEG frames back to back (plays as raw MJPEG,
+                       e.g. ffplay -f mjpeg video-....mjpg)
+  video-<start>.idx    one INDEX row per frame: wall-clock time, byte
+                       offset and size in the .mjpg
+
+Index rows are written after the frame bytes, so a row never points past
+the data, even in a segment that is still being written. Once the segments
+exceed VIDEO_RECORD_BUDGET_MB the oldest ones are deleted.
+
+Reading goes through mmap: Recording.seek() is a binary search over the
+index, frames are memoryviews into the mapped segment and a clip is one
+contiguous slice per segment, so extraction never decodes a frame.
+
+Offline:
+  python tools/video_recorder.py                     # list segments
+  python tools/video_recorder.py extract START END clip.mjpg
+  rec = Recording(); rec.seek(t); rec.frames(t0, t1); rec.extract(t0, t1, path)
+"""
+
+import glob
+import mmap
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+from tools.log import get_logger
+from tools.ring_stats import RingStats
+
+log = get_logger("video-rec")
+
+INDEX = np.dtype([("t", "<f8"), ("offset", "<u8"), ("size", "<u4")])
+_IOV_MAX = min(1024, os.sysconf("SC_IOV_MAX")) if hasattr(os, "sysconf") else 1024
+
+
+def _writev(fd, bufs):
+    """Write every buffer, in IOV_MAX groups, resuming after partial writes."""
+    bufs = list(bufs)
+    while bufs:
+        n = os.writev(fd, bufs[:_IOV_MAX])
+        while n:
+            size = len(bufs[0])
+            if n >= size:
+                n -= size
+                bufs.pop(0)
+            else:
+                bufs[0] = memoryview(bufs[0])[n:]
+                n = 0
+
+
+def _segment_name(t: float) -> str:
+    ms = int(t * 1000) % 1000
+    return "video-" + time.strftime("%Y%m%d-%H%M%S", time.localtime(t)) + f".{ms:03d}"
+
+
+def _segments(directory):
+    """.mjpg paths in directory, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, "video-*.mjpg")))
+
+
+def _remove_segment(path):
+    for p in (path, path[:-5] + ".idx"):
+        try:
+            os.remove(p)
+        except FileNotFoundError:
+            pass
+
+
+class VideoRecorder:
+    def __init__(self, directory=None, segment_sec=None, budget_mb=None, fps=None):
+        self.directory = directory or config.VIDEO_RECORD_DIR
+        self.segment_sec = segment_sec or config.VIDEO_RECORD_SEGMENT_SEC
+        budget_mb = config.VIDEO_RECORD_BUDGET_MB if budget_mb is None else budget_mb
+        self.budget = int(budget_mb * 1024 * 1024)
+        fps = config.VIDEO_RECORD_FPS if fps is None else fps
+        self._min_dt = 1.0 / fps if fps else 0.0
+        self._queue_cap = int(config.VIDEO_RECORD_QUEUE_MB * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._pending = []  # (monotonic stamp, jpeg bytes), filled by write()
+        self._queued = 0  # bytes in _pending
+        self._last_stamp = -1e9
+        self._stop = threading.Event()
+        self._thread = None
+        self.active = False
+        # writer thread state
+        self._wall_offset = 0.0  # wall clock = capture stamp + offset
+        self._seg = None  # (path, data fd, index fd, first frame time)
+        self._seg_bytes = 0
+        self._closed = []  # [path, bytes] of finished segments, oldest first
+        # counters
+        self.frames = 0
+        self.bytes = 0
+        self.dropped = 0  # queue full: the writer fell behind the camera
+        self.skipped = 0  # thinned out by VIDEO_RECORD_FPS
+        self.segments = 0
+        self.evicted = 0
+        self.errors = 0
+        self.flush_ms = RingStats(64)
+
+    # ----- Lifecycle -----
+    def start(self):
+        if self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._closed = [[p, self._disk_size(p)] for p in _segments(self.directory)]
+        self._wall_offset = time.time() - time.monotonic()
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="video-recorder", daemon=True
+        )
+        self._thread.start()
+        self.active = True
+        log.info(
+            "Recording video to %s (%gs segments, budget %d MB)",
+            self.directory,
+            self.segment_sec,
+            self.budget // (1024 * 1024),
+        )
+
+    def stop(self):
+        """Stop recording; frames already queued are written first."""
+        self.active = False
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
+            log.info("Video recording stopped (%d frames)", self.frames)
+
+    # ----- Capture thread -----
+    def write(self, stamp: float, jpeg: bytes):
+        """Queue one encoded frame (monotonic capture stamp); never blocks on I/O."""
+        if not self.active:
+            return
+        if stamp - self._last_stamp < self._min_dt:
+            self.skipped += 1
+            return
+        with self._lock:
+            if self._queued + len(jpeg) > self._queue_cap:
+                self.dropped += 1
+                return
+            self._pending.append((stamp, jpeg))
+            self._queued += len(jpeg)
+        self._last_stamp = stamp
+
+    # ----- Writer thread -----
+    def _run(self):
+        while True:
+            stopping = self._stop.wait(config.VIDEO_RECORD_FLUSH_SEC)
+            with self._lock:
+                batch, self._pending, self._queued = self._pending, [], 0
+            if batch:
+                t0 = time.perf_counter()
+                try:
+                    self._flush(batch)
+                except OSError as e:
+                    self.errors += 1
+                    log.warning("write failed, %d frames lost: %s", len(batch), e)
+                    self._close_segment()
+                self.flush_ms.add((time.perf_counter() - t0) * 1000.0)
+            if stopping:
+                break
+        self._close_segment()
+        self._evict()
+
+    def _flush(self, batch):
+        """Write batch into the current segment(s): one writev per segment touched."""
+        bufs, rows = [], []
+        for stamp, jpeg in batch:
+            t = stamp + self._wall_offset
+            if self._seg is None or t - self._seg[3] >= self.segment_sec:
+                self._write_out(bufs, rows)
+                bufs, rows = [], []
+                self._close_segment()
+                self._open_segment(t)
+            rows.append((t, self._seg_bytes, len(jpeg)))
+            bufs.append(jpeg)
+            self._seg_bytes += len(jpeg)
+        self._write_out(bufs, rows)
+        self._evict()
+
+    def _write_out(self, bufs, rows):
+        if not bufs:
+            return
+        _, data_fd, index_fd, _ = self._seg
+        _writev(data_fd, bufs)
+        _writev(index_fd, [np.array(rows, dtype=INDEX).tobytes()])
+        self.frames += len(rows)
+        self.bytes += sum(r[2] for r in rows)
+
+    def _open_segment(self, t):
+        path = os.path.join(self.directory, _segment_name(t) + ".mjpg")
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND
+        data_fd = os.open(path, flags, 0o644)
+        index_fd = os.open(path[:-5] + ".idx", flags, 0o644)
+        self._seg = (path, data_fd, index_fd, t)
+        self._seg_bytes = 0
+        self.segments += 1
+
+    def _close_segment(self):
+        if self._seg is None:
+            return
+        path, data_fd, index_fd, _ = self._seg
+        os.close(data_fd)
+        os.close(index_fd)
+        self._closed.append([path, self._disk_size(path)])
+        self._seg = None
+        self._seg_bytes = 0
+
+    @staticmethod
+    def _disk_size(path) -> int:
+        total = 0
+        for p in (path, path[:-5] + ".idx"):
+            try:
+                total += os.path.getsize(p)
+            except OSError:
+                pass
+        return total
+
+    def _evict(self):
+        """Delete the oldest finished segments while over the disk budget."""
+        total = sum(size for _, size in self._closed) + self._seg_bytes
+        while self._closed and total > self.budget:
+            path, size = self._closed.pop(0)
+            _remove_segment(path)
+            total -= size
+            self.evicted += 1
+            log.info("Evicted %s (disk budget)", os.path.basename(path))
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "dir": self.directory,
+            "segment": os.path.basename(self._seg[0]) if self._seg else None,
+            "segments": len(self._closed) + (self._seg is not None),
+            "disk_mb": round(
+                (sum(s for _, s in self._closed) + self._seg_bytes) / 1048576, 1
+            ),
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "queued_bytes": self._queued,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "evicted": self.evicted,
+            "errors": self.errors,
+            "flush_ms": self.flush_ms.summary(),
+        }
+
+
+class Segment:
+    """One .mjpg segment, memory-mapped, with its index."""
+
+    def __init__(self, path):
+        self.path = path
+        index = np.fromfile(path[:-5] + ".idx", dtype=INDEX)
+        size = os.path.getsize(path)
+        # a segment being written may have a partial row or rows ahead of the data
+        index = index[index["offset"] + index["size"] <= size]
+        self.index = index
+        self.t = index["t"]
+        self._file = open(path, "rb")
+        fd = self._file.fileno()
+        self._map = mmap.mmap(fd, size, access=mmap.ACCESS_READ) if size else b""
+        self._view = memoryview(self._map)
+
+    def __len__(self):
+        return len(self.index)
+
+    def find(self, t: float) -> int:
+        """Index of the first frame at or after t."""
+        return int(np.searchsorted(self.t, t, side="left"))
+
+    def frame(self, i: int) -> memoryview:
+        """JPEG bytes of frame i, a view into the mapping (no copy)."""
+        row = self.index[i]
+        return self._view[row["offset"] : row["offset"] + row["size"]]
+
+    def span(self, i: int, j: int) -> memoryview:
+        """Frames i..j-1 as one contiguous slice (concatenated JPEGs)."""
+        if i >= j:
+            return self._view[0:0]
+        start = self.index[i]["offset"]
+        last = self.index[j - 1]
+        return self._view[start : last["offset"] + last["size"]]
+
+    def close(self):
+        self._view.release()
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # frames still referenced: unmapped once they are dropped
+        self._file.close()
+
+
+class Recording:
+    """Every segment in a recording directory, oldest first."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.VIDEO_RECORD_DIR
+        self.segments = []
+        for path in _segments(self.directory):
+            try:
+                seg = Segment(path)
+            except (OSError, ValueError):
+                continue  # evicted or unreadable while scanning
+            if len(seg):
+                self.segments.append(seg)
+            else:
+                seg.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for seg in self.segments:
+            seg.close()
+        self.segments = []
+
+    @property
+    def start(self):
+        return float(self.segments[0].t[0]) if self.segments else None
+
+    @property
+    def end(self):
+        return float(self.segments[-1].t[-1]) if self.segments else None
+
+    def seek(self, t: float):
+        """(segment, frame index) of the first frame at or after t, or None."""
+        for seg in self.segments:
+            if seg.t[-1] >= t:
+                return seg, seg.find(t)
+        return None
+
+    def spans(self, start: float, end: float):
+        """(segment, i, j) per segment overlapping [start, end)."""
+        for seg in self.segments:
+            if seg.t[-1] < start or seg.t[0] >= end:
+                continue
+            i, j = seg.find(start), seg.find(end)
+            if i < j:
+                yield seg, i, j
+
+    def frames(self, start: float, end: float):
+        """Yield (t, JPEG memoryview) for every frame in [start, end)."""
+        for seg, i, j in self.spans(start, end):
+            for k in range(i, j):
+                yield float(seg.t[k]), seg.frame(k)
+
+    def extract(self, start: float, end: float, path) -> int:
+        """Write [start, end) as a new .mjpg + .idx pair; returns the frame count."""
+        count, offset = 0, 0
+        index_path = os.path.splitext(path)[0] + ".idx"
+        with open(path, "wb") as data, open(index_path, "wb") as idx:
+            for seg, i, j in self.spans(start, end):
+                span = seg.span(i, j)
+                data.write(span)
+                rows = seg.index[i:j].copy()
+                rows["offset"] -= rows["offset"][0]
+                rows["offset"] += offset
+                idx.write(rows.tobytes())
+                offset += len(span)
+                count += j - i
+        return count
+
+    def summary(self) -> dict:
+        return {
+            "dir": self.directory,
+            "start": self.start,
+            "end": self.end,
+            "segments": [
+                {
+                    "name": os.path.basename(seg.path),
+                    "frames": len(seg),
+                    "start": round(float(seg.t[0]), 3),
+                    "duration_s": round(float(seg.t[-1] - seg.t[0]), 3),
+                    "mb": round(os.path.getsize(seg.path) / 1048576, 2),
+                }
+                for seg in self.segments
+            ],
+        }
+
+
+def parse_time(text: str, base=None) -> float:
+    """Epoch seconds, an ISO date/time, or +/-seconds relative to base."""
+    if text[0] in "+-" and base is not None:
+        return base + float(text)
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def main(argv=None):
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="List recorded video or extract a clip")
+    ap.add_argument("--dir", default=None, help="recording directory")
+    sub = ap.add_subparsers(dest="cmd")
+    ex = sub.add_parser("extract", help="copy [start, end) into a new .mjpg")
+    ex.add_argument("start", help="epoch s, ISO time, or +s from the first frame")
+    ex.add_argument("end", help="epoch s, ISO time, or +s from the first frame")
+    ex.add_argument("out", help="output .mjpg (the .idx is written next to it)")
+    args = ap.parse_args(argv)
+    with Recording(args.dir) as rec:
+        if args.cmd != "extract":
+            print(json.dumps(rec.summary()))
+            return
+        if rec.start is None:
+            ap.error(f"no recordings in {rec.directory}")
+        start = parse_time(args.start, rec.start)
+        end = parse_time(args.end, rec.start)
+        t0 = time.perf_counter()
+        n = rec.extract(start, end, args.out)
+        ms = (time.perf_counter() - t0) * 1000.0
+        print(json.dumps({"out": args.out, "frames": n, "ms": round(ms, 2)}))
+
+
+if __name__ == "__main__":
+    main()
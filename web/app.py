@@ -1,122 +1,318 @@
-import json, time, threading
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import asyncio
+import json
+from logging import DEBUG
+from typing import Optional
+from fastapi import FastAPI, Query, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from starlette.concurrency import run_in_threadpool
+import socket
 import sys
-import cv2
-import numpy as np
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import config
 from tools.command_handler import CommandHandler
+from tools import binary_protocol as proto
+from tools.idle import CameraIdle
+from tools import startup
+from tools.log import get_logger, setup_logging
+from tools.telemetry import TelemetryPublisher
+from tools.video_recorder import Recording, VideoRecorder, parse_time
+from web.camera import FrameBroadcaster
+from web.stream_adapt import AdaptiveStream
 
 
-def _ts():
-    return time.strftime("%H:%M:%S")
+log = get_logger("ws")
 
+_static_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 
 app = FastAPI()
-app.mount("/static", StaticFiles(directory="web/static"), name="static")
+app.mount("/static", StaticFiles(directory=_static_dir), name="static")
 
 handler = None  # injected in main.py
 
-_cam = None
-_cam_lock = threading.Lock()
 _cam_index = 0  # change if your webcam isn't index 0
 _cam_width = 640
 _cam_height = 480
 _cam_fps = 30
+camera = video_recorder = camera_idle = None
+
+
+def use_camera(source_camera, recorder=None):
+    """Serve source_camera, with the recorder and the idle watcher bound to it."""
+    global camera, video_recorder, camera_idle
+    camera = source_camera
+    camera.recorder = video_recorder = recorder or VideoRecorder()  # idle until started
+    camera_idle = (
+        CameraIdle(camera, lambda: handler)
+        if config.IDLE_AFTER_SEC is not None and config.IDLE_CAMERA
+        else None
+    )
+
+
+use_camera(FrameBroadcaster(_cam_index, _cam_width, _cam_height, _cam_fps))
+telemetry = TelemetryPublisher(lambda: handler.snapshot())
 
 
 @app.on_event("startup")
 def _start_camera():
-    global _cam
-    with _cam_lock:
-        cap = cv2.VideoCapture(_cam_index)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, _cam_width)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, _cam_height)
-        cap.set(cv2.CAP_PROP_FPS, _cam_fps)
-        if not cap.isOpened():
-            print(f"[{_ts()}] [CAM] Failed to open webcam index={_cam_index}")
-        else:
-            print(
-                f"[{_ts()}] [CAM] Webcam opened index={_cam_index} size={_cam_width}x{_cam_height} fps~{_cam_fps}"
-            )
-        _cam = cap
+    setup_logging()
+    camera.start()
+    if config.VIDEO_RECORD:
+        video_recorder.start()
+    if camera_idle is not None:
+        camera_idle.start()
+
+
+@app.on_event("startup")
+async def _start_telemetry():
+    telemetry.start()
+    startup.ready("web server")
+    startup.log_report(get_logger("boot"))
 
 
 @app.on_event("shutdown")
 def _stop_camera():
-    global _cam
-    with _cam_lock:
-        if _cam is not None:
-            try:
-                _cam.release()
-                print(f"[{_ts()}] [CAM] Webcam released")
-            except Exception:
-                pass
-            _cam = None
+    if camera_idle is not None:
+        camera_idle.stop()
+    camera.stop()
+    video_recorder.stop()  # after the camera: writes what is still queued
+
+
+@app.on_event("shutdown")
+async def _stop_telemetry():
+    await telemetry.stop()
 
 
 @app.get("/")
 async def index():
-    with open("web/static/index.html", "r", encoding="utf-8") as f:
+    with open(os.path.join(_static_dir, "index.html"), "r", encoding="utf-8") as f:
         return HTMLResponse(f.read())
 
 
+def listen_socket(host: str = "0.0.0.0", port: int = 8000):
+    """
+    Listening socket for uvicorn with a bounded send buffer
+    (config.WEB_SEND_BUFFER, inherited by every accepted connection), so a
+    slow link pushes back on /video within a frame or two instead of after
+    megabytes of autotuned kernel buffer.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if config.WEB_SEND_BUFFER:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, config.WEB_SEND_BUFFER)
+    sock.bind((host, port))
+    sock.listen(128)
+    return sock
+
+
+_WS_CONTROLS = {
+    "proto": (proto.PROTO_BINARY, proto.PROTO_TEXT),
+    "telemetry": ("on", "off"),
+    "recording": ("on", "off"),
+}
+
+
+def _ws_control(msg: str):
+    """
+    Parse per-connection control commands handled by the WebSocket layer
+    itself ('proto binary|text', 'telemetry on|off', 'recording on|off').
+    Returns (name, value) or None for ordinary commands.
+    """
+    if "proto" not in msg and "telemetry" not in msg and "recording" not in msg:
+        return None
+    try:
+        if msg.lstrip().startswith("{"):
+            obj = json.loads(msg)
+            name = str(obj.get("cmd", "")).lower()
+            value = str(obj.get("value", "")).lower()
+        else:
+            parts = msg.lower().split()
+            if len(parts) < 2:
+                return None
+            name, value = parts[0], parts[1]
+    except ValueError:
+        return None
+    if value not in _WS_CONTROLS.get(name, ()):
+        return None
+    return name, value
+
+
+async def _push_telemetry(ws: WebSocket, sub):
+    while True:
+        msg = await sub.next_message()
+        await ws.send_text(json.dumps(msg))
+
+
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
     await ws.accept()
     client = f"{ws.client.host}:{ws.client.port}" if ws.client else "unknown"
-    print(f"[{_ts()}] [WS] open from {client}")
+    log.info("open from %s", client)
+    binary = False  # switched per connection by a "proto" command
+    sub, pusher = None, None  # telemetry subscription of this connection
     try:
         while True:
-            msg = await ws.receive_text()
-            print(f"[{_ts()}] [WS] recv {msg}")
+            event = await ws.receive()
+            if event["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(event.get("code", 1000))
+            if camera_idle is not None:
+                camera_idle.touch()
+            data = event.get("bytes")
+            if data is not None:
+                # compact binary frame: no logging, no JSON on this path
+                if handler is None or not binary:
+                    await ws.send_bytes(proto.ack(data[0] if data else 0, False))
+                    continue
+                if handler.is_inline_binary(data):
+                    resp = handler.handle_binary(data)
+                else:
+                    resp = await run_in_threadpool(handler.handle_binary, data)
+                if isinstance(resp, bytes):
+                    await ws.send_bytes(resp)
+                else:
+                    await ws.send_text(resp)
+                continue
+            msg = event.get("text") or ""
+            if log.isEnabledFor(DEBUG):
+                log.debug("recv %s", msg, extra={"sample": "ws.recv", "client": client})
+            control = _ws_control(msg)
+            if control is not None:
+                name, value = control
+                if name == "proto":
+                    binary = value == proto.PROTO_BINARY
+                    log.info("%s switched to %s protocol", client, value)
+                elif name == "telemetry":
+                    if value == "on" and sub is None and handler is not None:
+                        sub = telemetry.subscribe()
+                        pusher = asyncio.create_task(_push_telemetry(ws, sub))
+                    elif value == "off" and sub is not None:
+                        telemetry.unsubscribe(sub)
+                        pusher.cancel()
+                        sub, pusher = None, None
+                elif name == "recording":
+                    # server-wide: the recorder taps the shared capture
+                    if value == "on":
+                        video_recorder.start()
+                    else:
+                        await run_in_threadpool(video_recorder.stop)
+                await ws.send_text(json.dumps({"ok": True, name: value}))
+                continue
             if handler is None:
                 out = json.dumps({"ok": False, "error": "handler not ready"})
                 await ws.send_text(out)
-                print(f"[{_ts()}] [WS] sent {out}")
+                log.warning("command before handler ready from %s", client)
                 continue
-            resp = await run_in_threadpool(handler.handle_command, msg)
+            if handler.is_inline(msg):
+                # the command only enqueues into the control mailbox: no thread hop
+                resp = handler.handle_command(msg)
+            else:
+                resp = await run_in_threadpool(handler.handle_command, msg)
             try:
                 if isinstance(resp, str) and resp.startswith("{"):
                     await ws.send_text(resp)
-                    print(f"[{_ts()}] [WS] sent JSON {resp}")
+                    if log.isEnabledFor(DEBUG):
+                        log.debug("sent JSON %s", resp, extra={"sample": "ws.send"})
                 else:
                     out = json.dumps({"ok": True, "msg": resp})
                     await ws.send_text(out)
-                    print(f"[{_ts()}] [WS] sent {out}")
+                    if log.isEnabledFor(DEBUG):
+                        log.debug("sent %s", out, extra={"sample": "ws.send"})
             except Exception as e:
                 err = json.dumps({"ok": False, "error": str(e)})
                 await ws.send_text(err)
-                print(f"[{_ts()}] [WS] sent ERROR {err}")
+                log.warning("sent ERROR %s", err)
     except WebSocketDisconnect:
-        print(f"[{_ts()}] [WS] closed {client}")
+        log.info("closed %s", client)
     except Exception as e:
-        print(f"[{_ts()}] [WS] error {client}: {e}")
+        log.error("error %s: %s", client, e)
+    finally:
+        if sub is not None:
+            telemetry.unsubscribe(sub)
+            pusher.cancel()
 
 
-def mjpeg_generator():
-    global _cam
-    while True:
-        with _cam_lock:
-            cap = _cam
-        if cap is None or not cap.isOpened():
-            frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        else:
-            ok, frame = cap.read()
-            if not ok or frame is None:
-                frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        ret, jpg = cv2.imencode(".jpg", frame)
-        chunk = jpg.tobytes() if ret else b""
-        yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + chunk + b"\r\n")
-        time.sleep(0.001)
+def mjpeg_generator(stream=None):
+    if camera_idle is not None:
+        camera_idle.acquire()  # runs in a worker thread: may wait for the webcam
+    try:
+        for chunk in camera.frames(stream=stream):
+            yield (b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + chunk + b"\r\n")
+    finally:
+        if camera_idle is not None:
+            camera_idle.release()
 
 
 @app.get("/video")
-async def video():
+async def video(
+    fps: Optional[int] = Query(None, ge=1, le=60),
+    q: Optional[int] = Query(None, ge=10, le=95),
+    w: Optional[int] = Query(None, ge=80, le=1920),
+):
+    # adaptive per client; fps/q/w pin frame rate, JPEG quality and width
+    stream = AdaptiveStream(fps=fps, quality=q, width=w)
+    return StreamingResponse(
+        mjpeg_generator(stream), media_type="multipart/x-mixed-replace; boundary=frame"
+    )
+
+
+@app.get("/stats")
+def stats():  # threadpool: with a RemoteHandler every figure is a socket round trip
+    if handler is None:
+        return {"ok": False, "error": "handler not ready"}
+    return {
+        "ok": True,
+        "timing": handler.timing_stats(),
+        "outputs": handler.output_stats(),
+        "telemetry": telemetry.stats(),
+        "startup": startup.report(),
+        "tracking": handler.tracker.stats() if handler.tracker is not None else None,
+        "camera_idle": camera_idle.stats() if camera_idle is not None else None,
+    }
+
+
+@app.get("/video/stats")
+async def video_stats():
+    return camera.stats()
+
+
+@app.get("/video/recordings")
+def video_recordings():
+    with Recording(video_recorder.directory) as rec:
+        return {"recorder": video_recorder.stats(), **rec.summary()}
+
+
+_CLIP_CHUNK = 256 * 1024
+
+
+def _clip_generator(rec, start, end):
+    """Stream the clip's spans in _CLIP_CHUNK slices of the mapped segments."""
+    try:
+        for seg, i, j in rec.spans(start, end):
+            span = seg.span(i, j)
+            for k in range(0, len(span), _CLIP_CHUNK):
+                yield bytes(span[k : k + _CLIP_CHUNK])
+            span.release()
+    finally:
+        rec.close()
+
+
+@app.get("/video/clip")
+def video_clip(start: str = Query(...), end: str = Query(...)):
+    """
+    Recorded frames in [start, end) as raw MJPEG, straight from the segments.
+    Times are epoch seconds, ISO date/times or +seconds from the first frame.
+    """
+    rec = Recording(video_recorder.directory)
+    try:
+        t0, t1 = parse_time(start, rec.start), parse_time(end, rec.start)
+    except (TypeError, ValueError) as e:
+        rec.close()
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=400)
+    name = f"clip-{int(t0)}-{int(t1)}.mjpg"
     return StreamingResponse(
-        mjpeg_generator(), media_type="multipart/x-mixed-replace; boundary=frame"
+        _clip_generator(rec, t0, t1),
+        media_type="video/x-motion-jpeg",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'},
     )
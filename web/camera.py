@@ -0,0 +1,461 @@
+import threading
+import time
+import config
+from tools import startup
+from tools.log import get_logger
+
+log = get_logger("cam")
+
+cv2 = None  # OpenCV is imported by the first camera.start(), not at import time
+
+
+def _load_cv2():
+    global cv2
+    if cv2 is None:
+        with startup.phase("import cv2", "import"):
+            import cv2 as _cv2
+        cv2 = _cv2
+    return cv2
+
+
+def _jpeg_bytes(buf):
+    """JPEG bytes of a raw MJPG capture buffer, or None if it is not one."""
+    if buf is None or buf.ndim > 2 or (buf.ndim == 2 and buf.shape[0] != 1):
+        return None
+    data = buf.tobytes()
+    return data if data[:2] == b"\xff\xd8" else None
+
+
+class _Subscriber:
+    """Per-client view of the broadcaster: last delivered frame and counters."""
+
+    def __init__(self, sid):
+        self.id = sid
+        self.last_seq = 0
+        self.frames = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.fps = 0.0
+        self.latency_ms = 0.0
+        self.opened = time.monotonic()
+        self._last_sent = None
+        self.stream = None  # AdaptiveStream, if the client adapts
+
+    def _account(self, seq, stamp, size):
+        t = time.monotonic()
+        if self.last_seq:
+            self.dropped += max(0, seq - self.last_seq - 1)
+        if self._last_sent is not None:
+            inst = 1.0 / max(1e-6, t - self._last_sent)
+            self.fps = inst if not self.fps else 0.9 * self.fps + 0.1 * inst
+        lat = (t - stamp) * 1000.0
+        self.latency_ms = lat if not self.frames else 0.9 * self.latency_ms + 0.1 * lat
+        self._last_sent = t
+        self.last_seq = seq
+        self.frames += 1
+        self.bytes += size
+
+    def stats(self):
+        return {
+            "id": self.id,
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "fps": round(self.fps, 2),
+            "latency_ms": round(self.latency_ms, 2),
+            "age_s": round(time.monotonic() - self.opened, 1),
+            "stream": self.stream.stats() if self.stream is not None else None,
+        }
+
+
+class FrameBroadcaster:
+    """
+    Owns the webcam: one capture thread reads and JPEG-encodes each frame once
+    into a small ring, and every /video subscriber is served the same bytes.
+
+    Subscribers always jump to the newest frame, so a slow client drops frames
+    instead of holding back the capture thread or the other clients.
+
+    Clients that pass an AdaptiveStream get smaller / lower-quality variants of
+    the same frame; each variant is encoded at most once per frame and shared
+    by every client on the same ladder rung.
+
+    With config.CAMERA_CAPTURE "auto" or "mjpg" the webcam is asked for MJPG
+    and its JPEG bytes are passed straight through: no decode, no encode.
+    Pixels are only decoded when someone asks for them (latest_frame(), or a
+    downscaled variant), at most once per frame. If the camera does not
+    deliver MJPG, capture falls back to BGR frames and encodes them.
+
+    With config.FRAME_BUS set, every frame is also written to a shared-memory
+    ring (tools/frame_bus.py) for consumers in other processes.
+
+    With a recorder attached, every frame's JPEG bytes are also queued for
+    tools/video_recorder.py, which writes them to disk on its own thread.
+
+    source, if given, replaces the webcam: a callable returning a BGR frame,
+    JPEG bytes (passed through) or None, paced at fps. Used for benchmarks and
+    camera-less testing.
+    """
+
+    def __init__(
+        self, index=0, width=640, height=480, fps=30, ring_size=4, source=None
+    ):
+        self.index = index
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self._ring = [None] * max(2, ring_size)  # (seq, stamp, jpeg bytes, frame)
+        self._variants = {}  # (seq, width, quality) -> jpeg bytes
+        self._variant_lock = threading.Lock()
+        self._decoded = (0, None)  # (seq, BGR frame) of the last lazy decode
+        self.passthrough = False
+        self.bus = None  # FrameBus when config.FRAME_BUS is set
+        self.recorder = None  # VideoRecorder, attached by web/app.py
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._subs = {}
+        self._next_sid = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._cap = None
+        # global counters
+        self._captured = 0
+        self._failed = 0
+        self._encodes = 0
+        self._encode_s = 0.0
+        self._variant_encodes = 0
+        self._decodes = 0
+        self._decode_s = 0.0
+        self._fps = 0.0
+        self._last_capture = None
+        self._started = None
+
+    # ----- Lifecycle -----
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._started = time.monotonic()
+        _load_cv2()
+        if config.FRAME_BUS and self.bus is None:
+            from tools.frame_bus import FrameBus
+
+            self.bus = FrameBus(config.FRAME_BUS, self.width, self.height)
+            log.info("Frame bus %s (%d slots)", self.bus.name, config.FRAME_BUS_SLOTS)
+        if self.source is not None:
+            log.info("Synthetic frame source size=%sx%s fps~%s", self.width, self.height, self.fps)
+            self._thread = threading.Thread(
+                target=self._run_source, name="camera-capture", daemon=True
+            )
+            self._thread.start()
+            return
+        cap = cv2.VideoCapture(self.index)
+        mode = config.CAMERA_CAPTURE
+        if mode != "bgr":
+            # the fourcc has to be set before the size for V4L2 to honour it
+            cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        cap.set(cv2.CAP_PROP_FPS, self.fps)
+        if not cap.isOpened():
+            log.warning("Failed to open webcam index=%s", self.index)
+        else:
+            fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+            if mode != "bgr" and fourcc == cv2.VideoWriter_fourcc(*"MJPG"):
+                # hand out the raw MJPG buffer instead of a decoded frame
+                self.passthrough = bool(cap.set(cv2.CAP_PROP_CONVERT_RGB, 0))
+            if mode == "mjpg" and not self.passthrough:
+                log.warning("MJPG passthrough unavailable, encoding BGR frames")
+            log.info(
+                "Webcam opened index=%s size=%sx%s fps~%s capture=%s",
+                self.index,
+                self.width,
+                self.height,
+                self.fps,
+                "mjpg-passthrough" if self.passthrough else "bgr-encode",
+            )
+        self._cap = cap
+        self._thread = threading.Thread(
+            target=self._run, name="camera-capture", daemon=True
+        )
+        self._thread.start()
+
+    def pause(self):
+        """Stop capturing and release the webcam; start() resumes. The bus stays."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._cap is not None:
+            try:
+                self._cap.release()
+                log.info("Webcam released")
+            except Exception:
+                pass
+            self._cap = None
+
+    def stop(self):
+        self.pause()
+        if self.bus is not None:
+            self.bus.close()
+            self.bus = None
+
+    # ----- Capture thread -----
+    def _run(self):
+        blank = None
+        period = 1.0 / max(1.0, float(self.fps))
+        while not self._stop.is_set():
+            cap = self._cap
+            frame = None
+            if cap is not None and cap.isOpened():
+                ok, frame = cap.read()
+                if not ok:
+                    frame = None
+            if frame is None:
+                # No camera: publish a cached black frame at the nominal rate
+                self._failed += 1
+                if blank is None:
+                    import numpy as np
+
+                    black = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+                    blank = self._encode(black)
+                self._stop.wait(period)
+                stamp = time.monotonic()
+                chunk, frame = blank, black
+            elif self.passthrough:
+                stamp = time.monotonic()
+                chunk = _jpeg_bytes(frame)
+                if chunk is None:
+                    self._fall_back(cap)
+                    continue
+                frame = None  # decoded on demand
+            else:
+                stamp = time.monotonic()
+                chunk = self._encode(frame)
+            if chunk:
+                self._publish(stamp, chunk, frame)
+
+    def _run_source(self):
+        period = 1.0 / max(1.0, float(self.fps))
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            frame = self.source()
+            stamp = time.monotonic()
+            if frame is None:
+                self._failed += 1
+            elif isinstance(frame, (bytes, bytearray)):
+                self.passthrough = True
+                self._publish(stamp, bytes(frame))
+            else:
+                chunk = self._encode(frame)
+                if chunk:
+                    self._publish(stamp, chunk, frame)
+            deadline = max(deadline + period, time.monotonic())
+            self._stop.wait(deadline - time.monotonic())
+
+    def _fall_back(self, cap):
+        """Camera stopped delivering JPEG buffers: switch to decode + encode."""
+        log.warning("MJPG passthrough got a non-JPEG buffer, falling back to BGR encode")
+        self.passthrough = False
+        try:
+            cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        except Exception:
+            pass
+
+    def _decode(self, chunk):
+        import numpy as np
+
+        t0 = time.perf_counter()
+        frame = cv2.imdecode(np.frombuffer(chunk, np.uint8), cv2.IMREAD_COLOR)
+        self._decode_s += time.perf_counter() - t0
+        self._decodes += 1
+        return frame
+
+    def _pixels(self, entry, reduce=1):
+        """
+        BGR frame of a ring entry, decoding a passthrough JPEG once. reduce
+        (1, 2, 4 or 8) returns 1/reduce size: a subsampled BGR frame, or a
+        JPEG decoded directly at reduced scale (much cheaper than full size).
+        """
+        import numpy as np
+
+        seq, _, chunk, frame = entry
+        if frame is not None:
+            if reduce > 1:
+                return np.ascontiguousarray(frame[::reduce, ::reduce])
+            return frame
+        if reduce > 1:
+            flag = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4}.get(
+                reduce, cv2.IMREAD_REDUCED_COLOR_8
+            )
+            t0 = time.perf_counter()
+            small = cv2.imdecode(np.frombuffer(chunk, np.uint8), flag)
+            self._decode_s += time.perf_counter() - t0
+            self._decodes += 1
+            return small
+        with self._variant_lock:
+            if self._decoded[0] == seq:
+                return self._decoded[1]
+        frame = self._decode(chunk)
+        with self._variant_lock:
+            if seq > self._decoded[0]:
+                self._decoded = (seq, frame)
+        return frame
+
+    def _encode(self, frame, quality=None):
+        q = quality or config.VIDEO_JPEG_QUALITY
+        t0 = time.perf_counter()
+        ret, jpg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(q)])
+        self._encode_s += time.perf_counter() - t0
+        self._encodes += 1
+        return jpg.tobytes() if ret else b""
+
+    def _publish(self, stamp, chunk, frame=None):
+        if self._last_capture is not None:
+            inst = 1.0 / max(1e-6, stamp - self._last_capture)
+            self._fps = inst if not self._fps else 0.9 * self._fps + 0.1 * inst
+        self._last_capture = stamp
+        self._captured += 1
+        with self._cond:
+            self._seq += 1
+            seq = self._seq
+            self._ring[seq % len(self._ring)] = (seq, stamp, chunk, frame)
+            self._cond.notify_all()
+        if self.bus is not None:
+            self.bus.publish(seq, stamp, chunk, frame)
+        if self.recorder is not None:
+            self.recorder.write(stamp, chunk)
+
+    def _variant(self, entry, width, quality):
+        """JPEG of entry scaled to width at quality; encoded once, then shared."""
+        seq, _, chunk, frame = entry
+        full = frame.shape[1] if frame is not None else self.width
+        # the camera's own JPEG stands in for VIDEO_JPEG_QUALITY: lower
+        # qualities still need a decode and re-encode to save any bytes
+        top = config.VIDEO_JPEG_QUALITY
+        if width >= full and (quality >= top if self.passthrough else quality == top):
+            return chunk  # full size: the camera's / shared JPEG as is
+        key = (seq, width, quality)
+        with self._variant_lock:
+            cached = self._variants.get(key)
+        if cached is not None:
+            return cached
+        frame = self._pixels(entry)
+        if frame is None:
+            return chunk
+        if width < frame.shape[1]:
+            height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        jpg = self._encode(frame, quality)
+        with self._variant_lock:
+            self._variant_encodes += 1
+            oldest = seq - len(self._ring)
+            for k in [k for k in self._variants if k[0] <= oldest]:
+                del self._variants[k]
+            self._variants[key] = jpg
+        return jpg
+
+    # ----- Subscribers -----
+    def latest(self):
+        """Return the newest (seq, stamp, jpeg) entry, or None before the first frame."""
+        with self._cond:
+            return self._ring[self._seq % len(self._ring)][:3] if self._seq else None
+
+    def latest_seq(self) -> int:
+        with self._cond:
+            return self._seq
+
+    def wait_frame(self, after_seq=0, timeout=1.0) -> bool:
+        """Wait up to timeout for a frame newer than after_seq; no decoding."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._seq <= after_seq:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._cond.wait(left)
+        return True
+
+    def latest_frame(self, reduce=1):
+        """Return (seq, stamp, BGR frame) of the newest frame, decoding lazily."""
+        return self.next_frame(0, 0.0, reduce)
+
+    def next_frame(self, after_seq=0, timeout=1.0, reduce=1):
+        """
+        Wait up to timeout for a frame newer than after_seq and return
+        (seq, stamp, BGR frame) of the newest one, or None. For pixel
+        consumers such as the tracker; see _pixels() for reduce.
+        """
+        with self._cond:
+            if self._seq <= after_seq and timeout > 0:
+                self._cond.wait(timeout)
+            if self._seq <= after_seq:
+                return None
+            entry = self._ring[self._seq % len(self._ring)]
+        frame = self._pixels(entry, reduce)
+        return (entry[0], entry[1], frame) if frame is not None else None
+
+    def frames(self, timeout=1.0, stream=None):
+        """
+        Generator yielding JPEG bytes for one client; always the newest frame.
+        With an AdaptiveStream, frames are paced to its fps and sized to its
+        current rung, and the time each frame takes to go out is fed back.
+        """
+        with self._cond:
+            sub = _Subscriber(self._next_sid)
+            self._next_sid += 1
+            self._subs[sub.id] = sub
+        sub.stream = stream
+        try:
+            while not self._stop.is_set():
+                if stream is not None:
+                    delay = stream.next_due() - time.monotonic()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                with self._cond:
+                    if self._seq <= sub.last_seq:
+                        self._cond.wait(timeout)
+                    if self._seq <= sub.last_seq:
+                        continue
+                    entry = self._ring[self._seq % len(self._ring)]
+                seq, stamp, chunk, _ = entry
+                if stream is not None:
+                    width, quality, _ = stream.settings()
+                    chunk = self._variant(entry, width, quality)
+                sub._account(seq, stamp, len(chunk))
+                t_out = time.monotonic()
+                yield chunk
+                if stream is not None:
+                    # suspended at yield while the frame was written out
+                    now = time.monotonic()
+                    stream.sent(len(chunk), now - t_out, now)
+        finally:
+            with self._cond:
+                self._subs.pop(sub.id, None)
+
+    def stats(self):
+        with self._cond:
+            subs = [s.stats() for s in self._subs.values()]
+        n = max(1, self._encodes)
+        return {
+            "capture": "mjpg-passthrough" if self.passthrough else "bgr-encode",
+            "captured": self._captured,
+            "encodes": self._encodes,
+            "variant_encodes": self._variant_encodes,
+            "failed": self._failed,
+            "fps": round(self._fps, 2),
+            "encode_ms_avg": round(self._encode_s / n * 1000.0, 3),
+            "decodes": self._decodes,
+            "decode_ms_avg": round(self._decode_s / max(1, self._decodes) * 1000.0, 3),
+            "bus": (
+                {"name": self.bus.name, "written": self.bus.written, "oversize": self.bus.oversize}
+                if self.bus is not None
+                else None
+            ),
+            "recorder": self.recorder.stats() if self.recorder is not None else None,
+            "uptime_s": round(time.monotonic() - self._started, 1) if self._started else 0.0,
+            "clients": subs,
+        }
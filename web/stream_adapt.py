@@ -0,0 +1,139 @@
+"""
+Per-client adaptive /video streaming.
+
+Each /video client gets an AdaptiveStream that picks a rung of
+config.VIDEO_LADDER (width, JPEG quality, fps) from the throughput it
+actually achieves. The broadcaster times how long each frame takes to
+leave (the generator is suspended at yield while Starlette writes it and
+waits for the socket to drain). When the stream spends more than
+VIDEO_LINK_SHARE of its time blocked on the link, or exceeds VIDEO_MAX_KBPS,
+it steps down a rung, leaving headroom for the WebSocket control channel;
+it steps back up once it has been mostly idle for a few windows, waiting
+twice as long before each new probe after a step down.
+
+Explicit query parameters pin a dimension; the ladder still adapts the
+others unless all three are pinned.
+"""
+
+import config
+
+
+class AdaptiveStream:
+    _DECAY = 0.5  # weight of older windows in the smoothed link figures
+    _BASE_HOLD = 3  # windows
+    _MAX_HOLD = 32  # windows
+
+    def __init__(self, fps=None, quality=None, width=None, ladder=None):
+        self.ladder = tuple(ladder or config.VIDEO_LADDER)
+        self.pinned = {"width": width, "quality": quality, "fps": fps}
+        self.adaptive = None in self.pinned.values()
+        # start mid-ladder: a weak link is not flooded before the first estimate
+        self.level = len(self.ladder) // 2 if self.adaptive else 0
+        self.max_bps = (
+            config.VIDEO_MAX_KBPS * 125.0 if config.VIDEO_MAX_KBPS else float("inf")
+        )
+        self.changes = 0
+        self._win_start = None
+        self._win = [0, 0.0]  # bytes, send seconds in the current window
+        self._sm = [0.0, 0.0, 0.0]  # decayed bytes, send seconds, wall seconds
+        self._windows = 0  # windows since the last level change
+        self._hold = self._BASE_HOLD  # idle windows needed before probing a better rung
+        self._probing = False  # on a rung reached by an upgrade, not yet proven
+        self._slot = None  # scheduled send time of the last frame
+
+    def settings(self):
+        """Current (width, quality, fps), with pinned values applied."""
+        width, quality, fps = self.ladder[self.level]
+        p = self.pinned
+        return (
+            p["width"] or width,
+            p["quality"] or quality,
+            p["fps"] or fps,
+        )
+
+    def next_due(self) -> float:
+        """Earliest monotonic time the next frame may be sent."""
+        if self._slot is None:
+            return 0.0
+        return self._slot + 1.0 / self.settings()[2]
+
+    @property
+    def busy(self) -> float:
+        """Share of wall time spent blocked writing frames out (0..1)."""
+        return self._sm[1] / self._sm[2] if self._sm[2] else 0.0
+
+    @property
+    def rate_bps(self) -> float:
+        return self._sm[0] / self._sm[2] if self._sm[2] else 0.0
+
+    @property
+    def link_bps(self) -> float:
+        return self._sm[0] / max(self._sm[1], 1e-4) if self._sm[2] else 0.0
+
+    def sent(self, nbytes: int, send_s: float, now: float):
+        """Account one delivered frame that took send_s to write out."""
+        # pace on a fixed grid so camera-frame jitter does not cost frames;
+        # resynchronise after falling more than one period behind
+        start = now - send_s
+        slot = self.next_due()
+        on_grid = self._slot is not None and start - slot < 1.0 / self.settings()[2]
+        self._slot = slot if on_grid else start
+        if self._win_start is None:
+            self._win_start = now
+        self._win[0] += nbytes
+        self._win[1] += send_s
+        elapsed = now - self._win_start
+        if elapsed < config.VIDEO_ADAPT_SEC:
+            return
+        # socket buffers make sends bursty (a long stall, then several instant
+        # writes), so decisions use figures smoothed over several windows
+        d = self._DECAY
+        self._sm = [
+            d * self._sm[0] + self._win[0],
+            d * self._sm[1] + self._win[1],
+            d * self._sm[2] + elapsed,
+        ]
+        self._win_start, self._win = now, [0, 0.0]
+        self._windows += 1
+        if not self.adaptive:
+            return
+        if self._probing and self._windows >= self._BASE_HOLD:
+            # the upgrade held: later probes start from the base back-off again
+            self._probing = False
+            self._hold = self._BASE_HOLD
+        share = config.VIDEO_LINK_SHARE
+        if (
+            self.busy > share or self.rate_bps > self.max_bps
+        ) and self.level < len(self.ladder) - 1:
+            self._step(+1)
+        elif (
+            self.busy < share / 3
+            and self.rate_bps < 0.5 * self.max_bps
+            and self.level > 0
+            and self._windows >= self._hold
+        ):
+            self._step(-1)
+
+    def _step(self, delta: int):
+        if delta > 0:
+            # a probe that had to be undone is retried less and less often
+            self._hold = min(self._MAX_HOLD, self._hold * 2)
+        self._probing = delta < 0
+        self.level += delta
+        self.changes += 1
+        self._windows = 0
+        self._sm = [0.0, 0.0, 0.0]  # figures from the old rung no longer apply
+
+    def stats(self) -> dict:
+        width, quality, fps = self.settings()
+        return {
+            "adaptive": self.adaptive,
+            "level": self.level,
+            "width": width,
+            "quality": quality,
+            "target_fps": fps,
+            "rate_kbps": round(self.rate_bps / 125.0, 1),
+            "link_kbps": round(self.link_bps / 125.0, 1),
+            "busy": round(self.busy, 2),
+            "changes": self.changes,
+        }